@@ -3,39 +3,87 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt, ExpiredSignatureError  # Importez ExpiredSignatureError
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy import inspect as sa_inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+import hashlib
+import os
 import sys # Importez sys pour le print
+import time
 
 # Importe vos propres modules
-from database import SessionLocal
+from database import get_db, get_async_db
 from models import Utilisateur
 from utils.token import SECRET_KEY, ALGORITHM # Depuis votre fichier token.py
-
-# Dépendance pour obtenir la session de BDD
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+from utils.cache import TTLCache
+from utils.data_version import data_versions
 
 http_bearer_scheme = HTTPBearer()
 
-async def get_current_user(
-    creds: HTTPAuthorizationCredentials = Depends(http_bearer_scheme), 
-    db: Session = Depends(get_db)
-):
+# =============================================================================
+# CACHE DES UTILISATEURS AUTHENTIFIÉS (évite 1 SELECT Utilisateur par requête)
+# =============================================================================
+# Clé : sha256 du token. Valeur : (id_utilisateur, snapshot des colonnes).
+# L'entrée expire au plus tard à l'expiration du JWT.
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_SIZE = int(os.getenv("AUTH_CACHE_MAX_SIZE", "2048"))
+
+_principal_cache = TTLCache(max_size=AUTH_CACHE_MAX_SIZE, ttl=AUTH_CACHE_TTL)
+
+# Colonnes sensibles jamais gardées en mémoire
+_EXCLUDED_COLUMNS = {"mot_de_passe", "token_verification"}
+_CACHED_COLUMNS = [
+    attr.key for attr in sa_inspect(Utilisateur).column_attrs
+    if attr.key not in _EXCLUDED_COLUMNS
+]
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _snapshot_user(user: Utilisateur) -> dict:
+    return {key: getattr(user, key) for key in _CACHED_COLUMNS}
+
+
+def _user_from_snapshot(snapshot: dict, db) -> Utilisateur:
     """
-    Décode le token, trouve l'utilisateur et le renvoie.
+    Reconstruit une instance neuve à partir du snapshot (une par requête) et
+    l'attache à la session de la requête sans SELECT : la route peut la modifier
+    directement.
     """
-    credentials_exception = HTTPException(
+    user = Utilisateur(**snapshot)
+    make_transient_to_detached(user)
+    db.add(user)
+    return user
+
+
+def invalidate_user(user_id: int):
+    """À appeler après toute écriture sur la ligne Utilisateur (profil, rôle...)."""
+    data_versions.bump(f"user:{user_id}")
+    return _principal_cache.invalidate_where(lambda entry: entry[0] == user_id)
+
+
+def clear_auth_cache():
+    _principal_cache.clear()
+
+
+def get_auth_cache_stats() -> dict:
+    return _principal_cache.stats()
+
+
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Impossible de valider les identifiants",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+
+def _decode_token(token: str) -> dict:
+    """Vérifie la signature / l'expiration du JWT et renvoie le payload (avec 'sub')."""
+    credentials_exception = _credentials_exception()
     try:
-        token = creds.credentials
         print(f"\n--- DEBUG: TOKEN REÇU ---\n{token}\n---------------------------", file=sys.stderr)
         
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -55,15 +103,63 @@ async def get_current_user(
         # Attrape toutes les autres erreurs JWT (signature invalide, etc.)
         print(f"--- ERREUR: LE DÉCODAGE A ÉCHOUÉ (JWTError) --- \n{e}\n-----------------------------------", file=sys.stderr)
         raise credentials_exception
-    
-    # Si le décodage a réussi, on cherche l'utilisateur
-    user = db.query(Utilisateur).filter(Utilisateur.email == email).first()
-    
+    return payload
+
+
+def _remember_user(cache_key: str, user: Utilisateur, payload: dict):
     if user is None:
-        print(f"--- ERREUR: Utilisateur non trouvé en BDD pour l'email: {email} ---", file=sys.stderr)
-        raise credentials_exception
+        print(f"--- ERREUR: Utilisateur non trouvé en BDD pour l'email: {payload.get('sub')} ---", file=sys.stderr)
+        raise _credentials_exception()
     
     print(f"--- DEBUG: UTILISATEUR TROUVÉ --- \n{user.email} (Rôle: {user.type_utilisateur})\n---------------------------", file=sys.stderr)
+
+    # Le cache ne doit jamais survivre au token lui-même
+    ttl = AUTH_CACHE_TTL
+    exp = payload.get("exp")
+    if exp is not None:
+        ttl = min(ttl, float(exp) - time.time())
+    _principal_cache.set(cache_key, (user.id_utilisateur, _snapshot_user(user)), ttl=ttl)
+
+
+def get_current_user(
+    creds: HTTPAuthorizationCredentials = Depends(http_bearer_scheme), 
+    db: Session = Depends(get_db)
+):
+    """
+    Décode le token, trouve l'utilisateur et le renvoie.
+    Fonction synchrone : FastAPI l'exécute dans le threadpool, le SELECT ne bloque pas la boucle asyncio.
+    """
+    token = creds.credentials
+    cache_key = _token_key(token)
+    cached = _principal_cache.get(cache_key)
+    if cached is not None:
+        return _user_from_snapshot(cached[1], db)
+
+    payload = _decode_token(token)
+    user = db.query(Utilisateur).filter(Utilisateur.email == payload["sub"]).first()
+    _remember_user(cache_key, user, payload)
+    return user
+
+
+async def get_current_user_async(
+    creds: HTTPAuthorizationCredentials = Depends(http_bearer_scheme),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Variante asyncio de get_current_user, pour les routes `async def` (session partagée avec la route).
+    La transaction du SELECT est terminée avant de rendre la main : /chat ne garde pas de
+    connexion pendant l'attente et l'appel au modèle (expire_on_commit=False, l'objet reste lisible).
+    """
+    token = creds.credentials
+    cache_key = _token_key(token)
+    cached = _principal_cache.get(cache_key)
+    if cached is not None:
+        return _user_from_snapshot(cached[1], db)
+
+    payload = _decode_token(token)
+    user = (await db.scalars(select(Utilisateur).where(Utilisateur.email == payload["sub"]))).first()
+    await db.commit()
+    _remember_user(cache_key, user, payload)
     return user
 
 async def get_current_admin_user(current_user: Utilisateur = Depends(get_current_user)):
@@ -0,0 +1,202 @@
+"""
+Test de charge du coach (/chat) avec le faux modèle scripté : ni Gemini, ni réseau.
+
+    python -m benchmarks.chat_load                          # 20 sessions x 5 messages, SQLite temporaire
+    python -m benchmarks.chat_load --sessions 100 --concurrency 8 --latency 0.2
+    python -m benchmarks.chat_load --db-url mysql+pymysql://...   # base de test dédiée (données ajoutées)
+
+Chaque session est un utilisateur qui envoie ses messages l'un après l'autre, via le même
+chemin que la route (handle_chat_interaction_async : ordonnanceur LLM, outils, mémoire).
+Rapporte la latence p50/p99 par message, le nombre de requêtes SQL par message et le
+temps passé dans chaque outil.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+
+SCRIPT = [
+    [("get_health_profile", {}), ("get_week_planning", {})],
+    [("search_recipes", {"query": ""})],
+    [("get_catalog_exercises", {})],
+    "💪 **Séance : Full body** (30 min) 1. **Pompes** : 3 x 12 2. **Squats** : 3 x 15",
+]
+MESSAGES = ["J'ai faim, une idée de repas ?", "Quel est mon programme ?", "Une séance rapide ?"]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def setup_database(url: str):
+    # Les modules de l'application lisent DATABASE_URL à l'import
+    os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("DB_PORT", "3306")
+    if url.startswith("sqlite"):
+        from sqlalchemy.dialects.mysql import TINYINT
+        from sqlalchemy.ext.compiler import compiles
+
+        @compiles(TINYINT, "sqlite")
+        def _tinyint(type_, compiler, **kw):
+            return "INTEGER"
+
+    import database
+    import models
+    models.Base.metadata.create_all(bind=database.get_engine())
+    return database.get_engine()
+
+
+def seed(engine, sessions: int, recettes: int, exercices: int, seed_value: int = 42) -> list:
+    """Ajoute le catalogue et les utilisateurs du test. Retourne les ids des utilisateurs."""
+    from sqlalchemy import insert, select
+    from models import Exercice, ExerciceMuscle, Muscle, Recette, RecetteIngredient, Utilisateur
+
+    rng = random.Random(seed_value)
+    run_id = int(time.time())
+    with engine.begin() as conn:
+        start = conn.execute(select(Recette.id_recette).order_by(Recette.id_recette.desc()).limit(1)).scalar() or 0
+        conn.execute(insert(Recette), [
+            {"nom_recette": f"Recette test {start + i}", "categorie": rng.choice(["plat", "entree", "dessert"]),
+             "calories": rng.randint(150, 900), "proteines": rng.uniform(5, 60),
+             "glucides": rng.uniform(5, 100), "lipides": rng.uniform(2, 40), "tags": "Facile, Rapide"}
+            for i in range(1, recettes + 1)
+        ])
+        conn.execute(insert(RecetteIngredient), [
+            {"id_recette": start + i, "position": p, "food": food, "text": f"100 g de {food}"}
+            for i in range(1, recettes + 1)
+            for p, food in enumerate(rng.sample(["poulet", "riz", "tomate", "oignon", "lentilles", "tofu"], 3))
+        ])
+        muscles = ["jambes", "pectoraux", "dos", "abdominaux"]
+        start = conn.execute(select(Exercice.id_exercice).order_by(Exercice.id_exercice.desc()).limit(1)).scalar() or 0
+        cibles = [rng.choice(muscles) for _ in range(exercices)]
+        conn.execute(insert(Exercice), [
+            {"nom_exercice": f"Exercice test {start + i}", "type_exercice": rng.choice(["force", "cardio"]),
+             "muscle_cible": cible, "materiel": "poids_du_corps"}
+            for i, cible in enumerate(cibles, start=1)
+        ])
+        muscle_ids = dict(conn.execute(select(Muscle.nom, Muscle.id_muscle)).all())
+        if any(m not in muscle_ids for m in muscles):
+            conn.execute(insert(Muscle), [{"nom": m} for m in muscles if m not in muscle_ids])
+            muscle_ids = dict(conn.execute(select(Muscle.nom, Muscle.id_muscle)).all())
+        conn.execute(insert(ExerciceMuscle), [
+            {"id_exercice": start + i, "id_muscle": muscle_ids[cible]} for i, cible in enumerate(cibles, start=1)
+        ])
+        conn.execute(insert(Utilisateur), [
+            {"nom": "Charge", "prenom": f"Session{i}", "email": f"bench-{run_id}-{i}@nutrifit.local",
+             "email_verifie": True, "sexe": rng.choice(["masculin", "feminin"]), "age": rng.randint(18, 65),
+             "poids_kg": rng.uniform(50, 110), "taille_cm": rng.randint(150, 195), "objectif": "maintien"}
+            for i in range(sessions)
+        ])
+        ids = conn.execute(
+            select(Utilisateur.id_utilisateur).where(Utilisateur.email.like(f"bench-{run_id}-%"))
+        ).scalars().all()
+    return ids
+
+
+def load_users(ids: list) -> list:
+    """Utilisateurs détachés, comme ceux fournis par le cache d'authentification."""
+    from database import SessionLocal
+    from models import Utilisateur
+
+    db = SessionLocal()
+    try:
+        return db.query(Utilisateur).filter(Utilisateur.id_utilisateur.in_(ids)).all()
+    finally:
+        db.close()
+
+
+async def run_load(cc, users: list, turns: int, expected: str) -> dict:
+    from utils.llm_limiter import LLMBusy, LLMTimeout
+
+    latencies, outcomes = [], Counter()
+
+    async def session(user, offset):
+        for turn in range(turns):
+            message = MESSAGES[(offset + turn) % len(MESSAGES)]
+            start = time.perf_counter()
+            try:
+                response = await cc.handle_chat_interaction_async(message, user)
+            except LLMBusy:
+                outcomes["refusé (429)"] += 1
+                continue
+            except LLMTimeout:
+                outcomes["timeout (504)"] += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+            outcomes["ok" if response == expected else "réponse inattendue"] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(user, i) for i, user in enumerate(users)))
+    return {"latencies": latencies, "outcomes": outcomes, "elapsed": time.perf_counter() - start}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=20, help="utilisateurs simultanés")
+    parser.add_argument("--turns", type=int, default=5, help="messages par session")
+    parser.add_argument("--concurrency", type=int, default=4, help="appels LLM simultanés (LLM_MAX_CONCURRENCY)")
+    parser.add_argument("--latency", type=float, default=0.05, help="durée simulée (s) d'un tour du modèle")
+    parser.add_argument("--recettes", type=int, default=500)
+    parser.add_argument("--exercices", type=int, default=60)
+    parser.add_argument("--db-url", help="base de test (défaut : fichier SQLite temporaire)")
+    parser.add_argument("--verbose", action="store_true", help="garder les logs du chat")
+    args = parser.parse_args(argv)
+
+    db_url = args.db_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'chat_load.db')}?check_same_thread=false"
+    engine = setup_database(db_url)
+    user_ids = seed(engine, args.sessions, args.recettes, args.exercices)
+    users = load_users(user_ids)
+
+    from sqlalchemy import event
+    from controllers import chat_controller as cc
+    from utils.llm_backend import ScriptedBackend
+
+    backend = ScriptedBackend(SCRIPT, latency=args.latency)
+    cc.set_backend(backend)
+    cc.llm_limiter.max_concurrency = args.concurrency
+    cc.llm_limiter.max_queue = args.sessions
+
+    queries = Counter()
+    lock = threading.Lock()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        with lock:
+            queries[threading.current_thread().name.split("_")[0]] += 1
+
+    logs = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with logs:
+        result = asyncio.run(run_load(cc, users, args.turns, SCRIPT[-1]))
+    cc.shutdown()
+
+    latencies, outcomes = result["latencies"], result["outcomes"]
+    done = len(latencies)
+    total_queries = sum(queries.values())
+    print(f"{args.sessions} sessions x {args.turns} messages | {args.concurrency} appels LLM simultanés | "
+          f"tour du modèle : {args.latency * 1000:.0f} ms | {len(SCRIPT) - 1} tours d'outils par message")
+    print(f"résultats         : {dict(outcomes)}")
+    if done:
+        print(f"débit             : {done / result['elapsed']:.1f} messages/s ({result['elapsed']:.2f} s)")
+        print(f"latence (ms)      : p50 {statistics.median(latencies):.1f} | p99 {percentile(latencies, 99):.1f} "
+              f"| max {max(latencies):.1f}")
+        print(f"requêtes SQL      : {total_queries / done:.1f} par message "
+              f"({', '.join(f'{k} {v}' for k, v in sorted(queries.items()))})")
+        print(f"tours du modèle   : {backend.rounds / done:.1f} par message, {backend.summaries} résumé(s) d'historique")
+
+    tool_stats = cc.get_tool_stats()
+    print(f"\n{'outil':<24} | {'appels':>6} | {'hit':>5} | {'moy. (ms)':>9} | {'max (ms)':>8} | {'total (ms)':>10}")
+    for name, st in sorted(tool_stats["tools"].items(), key=lambda item: -item[1]["calls"] * item[1]["avg_ms"]):
+        print(f"{name:<24} | {st['calls']:>6} | {st['hit_rate']:>5.0%} | {st['avg_ms']:>9.2f} | "
+              f"{st['max_ms']:>8.2f} | {st['calls'] * st['avg_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Coût SQL de la génération du planning hebdomadaire (generate_weekly_plan).
+
+    python -m benchmarks.planning_bench                    # 50 plannings, SQLite temporaire
+    python -m benchmarks.planning_bench --users 200 --freq 5
+    python -m benchmarks.planning_bench --db-url mysql+pymysql://...   # base de test dédiée
+    python -m benchmarks.planning_bench --batch --users 5000 --workers 4
+
+Compte les requêtes SQL émises par planning (repas + sport) et mesure la durée par planning.
+--batch : génère ensuite les mêmes plannings en un lot (generate_weekly_plans_batch) et
+compare les débits.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+from benchmarks.chat_load import percentile, seed, setup_database
+
+
+def _count_rows(engine, model) -> int:
+    from sqlalchemy import func, select
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(model)).scalar()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--freq", type=int, default=3, help="jours d'entraînement par semaine")
+    parser.add_argument("--recettes", type=int, default=2000)
+    parser.add_argument("--exercices", type=int, default=200)
+    parser.add_argument("--db-url", help="base de test (défaut : fichier SQLite temporaire)")
+    parser.add_argument("--batch", action="store_true", help="comparer avec la génération en lot")
+    parser.add_argument("--workers", type=int, default=1, help="--batch : processus de génération")
+    parser.add_argument("--chunk-size", type=int, default=500, help="--batch : utilisateurs par transaction")
+    args = parser.parse_args(argv)
+
+    db_url = args.db_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'planning_bench.db')}"
+    engine = setup_database(db_url)
+    user_ids = seed(engine, args.users, args.recettes, args.exercices)
+
+    from sqlalchemy import event, update
+    from database import SessionLocal
+    from models import Seance, SeanceExercice, Utilisateur
+    from controllers import planning_controller as pc
+
+    with engine.begin() as conn:
+        conn.execute(update(Utilisateur).where(Utilisateur.id_utilisateur.in_(user_ids)).values(nb_jours_entrainement=args.freq))
+
+    statements, kinds = [], Counter()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+        kinds[statement.lstrip().split(" ", 1)[0].upper()] += 1
+
+    per_plan, timings = [], []
+    start_date = datetime.now()
+    loop_started = time.perf_counter()
+    for user_id in user_ids:
+        db = SessionLocal()
+        try:
+            before = len(statements)
+            start = time.perf_counter()
+            result = pc.generate_weekly_plan(db, user_id, start_date)
+            timings.append((time.perf_counter() - start) * 1000)
+            per_plan.append(len(statements) - before)
+            if result.get("status") != "succes":
+                print(f"⚠️ user {user_id} : {result}")
+        finally:
+            db.close()
+
+    print(f"{len(user_ids)} plannings (14 repas + {args.freq} séances chacun)")
+    print(f"requêtes / planning : p50 {statistics.median(per_plan):.0f} | max {max(per_plan)} "
+          f"({', '.join(f'{k} {v / len(user_ids):.1f}' for k, v in kinds.most_common())})")
+    print(f"durée (ms)          : p50 {statistics.median(timings):.1f} | p99 {percentile(timings, 99):.1f}")
+    print(f"débit               : {len(user_ids) / (time.perf_counter() - loop_started):.1f} utilisateurs/s")
+    print(f"séances en base     : {_count_rows(engine, Seance)} ({_count_rows(engine, SeanceExercice)} SeanceExercice)")
+
+    if args.batch:
+        before = len(statements)
+        db = SessionLocal()
+        try:
+            stats = pc.generate_weekly_plans_batch(
+                db, start_date=start_date.date(), user_ids=user_ids,
+                chunk_size=args.chunk_size, workers=args.workers,
+            )
+        finally:
+            db.close()
+        print(f"\nlot ({stats['chunks']} lot(s), {stats['workers']} processus) : {stats['users_per_second']} utilisateurs/s "
+              f"| chargement {stats['load_s']} s, calcul {stats['compute_s']} s, écriture {stats['write_s']} s")
+        if stats["workers"] == 1:
+            print(f"requêtes            : {len(statements) - before} pour {stats['users']} plannings")
+        print(f"séances en base     : {_count_rows(engine, Seance)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark de la recherche de recettes (sans BDD, corpus synthétique).
+
+    python -m benchmarks.search_bench                 # 10k et 100k recettes
+    python -m benchmarks.search_bench --sizes 50000
+
+Compare l'index inversé (utils.search_index) à un scan linéaire
+équivalent au ILIKE '%terme%' sur nom / description / ingrédients / tags.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from controllers.recette_controller import RECETTE_SEARCH_FIELDS, _index_fields, _ingredients_text
+from utils.search_index import SearchIndex, fold
+
+PLATS = ["Poulet", "Saumon", "Boeuf", "Tofu", "Crevettes", "Lentilles", "Pâtes", "Riz", "Quinoa", "Omelette"]
+STYLES = ["rôti", "grillé", "au curry", "à la crème", "provençal", "au four", "sauté", "en salade", "mijoté", "épicé"]
+INGREDIENTS = ["tomate", "oignon", "ail", "crème fraîche", "courgette", "poivron", "épinards", "citron",
+               "fromage", "basilic", "champignon", "carotte", "pomme de terre", "lait de coco", "gingembre"]
+TAGS = ["Vegan", "Végétarien", "Sans gluten", "Facile", "Rapide", "Hyperprotéiné", "Léger", "Dessert"]
+QUERIES = ["poulet", "creme", "saumon grillé", "végétarien rapide", "lait de coco", "poul", "épinards citron", "xyz"]
+
+
+def make_corpus(n: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    # Vocabulaire libre des descriptions (loi de Zipf approximative)
+    vocabulary = ["".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(4, 9))) for _ in range(5000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    corpus = []
+    for i in range(1, n + 1):
+        ingr = rng.sample(INGREDIENTS, 5)
+        corpus.append((
+            i,
+            f"{rng.choice(PLATS)} {rng.choice(STYLES)} n°{i}",
+            " ".join(rng.choices(vocabulary, weights=weights, k=25) + rng.sample(INGREDIENTS, 3)),
+            [(f, f"100 g de {f}") for f in ingr],
+            ", ".join(rng.sample(TAGS, 2)),
+        ))
+    return corpus
+
+
+def linear_scan(corpus, query, limit=20):
+    term = fold(query)
+    out = []
+    for row in corpus:
+        _, nom, description, ingredients, tags = row
+        if any(term in fold(col or "") for col in (nom, description, _ingredients_text(ingredients), tags)):
+            out.append(row[0])
+            if len(out) >= limit:
+                break
+    return out
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def bench(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        for q in QUERIES:
+            start = time.perf_counter()
+            fn(q)
+            timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), percentile(timings, 99)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'recettes':>9} | {'build (s)':>9} | {'index p50/p99 (ms)':>19} | {'scan p50/p99 (ms)':>18}")
+    for size in args.sizes:
+        corpus = make_corpus(size)
+
+        start = time.perf_counter()
+        index = SearchIndex(RECETTE_SEARCH_FIELDS)
+        for id_recette, nom, description, ingredients, tags in corpus:
+            index.add(id_recette, _index_fields(nom, description, ingredients, tags))
+        build = time.perf_counter() - start
+
+        idx_p50, idx_p99 = bench(lambda q: index.search(q, limit=20), args.repeat)
+        scan_p50, scan_p99 = bench(lambda q: linear_scan(corpus, q), max(1, args.repeat // 5))
+        print(f"{size:>9} | {build:>9.2f} | {idx_p50:>8.2f} / {idx_p99:>8.2f} | {scan_p50:>7.2f} / {scan_p99:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,171 @@
-from sqlalchemy.orm import Session
-from datetime import datetime, date
-from models import PlanningRepas, PlanningSeance
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, true
+from datetime import datetime, date, timedelta
+from collections import namedtuple
+import os
+from models import PlanningRepas, PlanningSeance, Seance, SeanceExercice
 from schemas import PlanningRepasCreate, PlanningSeanceCreate
+import schemas
+from controllers import recette_controller as rc
+from utils.data_version import data_versions
 
-def get_user_calendar(db: Session, user_id: int):
-    """Récupère le calendrier complet d'un utilisateur"""
-    planning_repas = db.query(PlanningRepas).filter(
-        PlanningRepas.id_utilisateur == user_id
-    ).all()
-    
-    planning_seances = db.query(PlanningSeance).filter(
-        PlanningSeance.id_utilisateur == user_id
-    ).all()
-    
+# Lignes rendues au plus par GET /calendar, par table ; au-delà : ?from= pour la suite, ou ?stream=true
+CALENDAR_MAX_ROWS = int(os.getenv("CALENDAR_MAX_ROWS", "1000"))
+CALENDAR_STREAM_BATCH = 500
+
+
+# ?expand= : détails joints à chaque entrée du calendrier
+CALENDAR_EXPANSIONS = ("recette", "seance")
+
+
+def parse_expand(value: str) -> frozenset:
+    """"recette,seance" -> frozenset ; ValueError si un nom est inconnu."""
+    names = frozenset(n.strip() for n in (value or "").split(",") if n.strip())
+    unknown = names - set(CALENDAR_EXPANSIONS)
+    if unknown:
+        raise ValueError(f"expand inconnu : {', '.join(sorted(unknown))} (valeurs : {', '.join(CALENDAR_EXPANSIONS)})")
+    return names
+
+
+def _calendar_stmts(user_id: int, start: date = None, end: date = None, expand: frozenset = frozenset()):
+    """Repas et séances de l'utilisateur du `start` au `end` inclus (bornes facultatives), par jour."""
+    stmts = []
+    for model, id_column in (
+        (PlanningRepas, PlanningRepas.id_planning_repas),
+        (PlanningSeance, PlanningSeance.id_planning_seance),
+    ):
+        # Index (id_utilisateur, jour) : seule la plage demandée est lue, déjà triée
+        stmt = select(model).where(model.id_utilisateur == user_id)
+        if start is not None:
+            stmt = stmt.where(model.jour >= start)
+        if end is not None:
+            stmt = stmt.where(model.jour <= end)
+        stmts.append(stmt.order_by(model.jour, id_column))
+    repas_stmt, seances_stmt = stmts
+    if "seance" in expand:
+        # Une requête IN (...) par niveau, quel que soit le nombre d'entrées
+        seances_stmt = seances_stmt.options(
+            selectinload(PlanningSeance.seance).selectinload(Seance.exercices).selectinload(SeanceExercice.exercice)
+        )
+    return repas_stmt, seances_stmt
+
+
+CalendarVersion = namedtuple("CalendarVersion", "nb_repas repas_modifie nb_seances seance_modifiee")
+
+
+def _calendar_version_stmt(user_id: int, start: date = None, end: date = None):
+    # Une requête, sur l'index (id_utilisateur, jour) : un ajout ou une modification change
+    # le max de updated_at, une suppression change le nombre de lignes
+    def version(model):
+        stmt = select(func.count().label("nb"), func.max(model.updated_at).label("modifie")).where(model.id_utilisateur == user_id)
+        if start is not None:
+            stmt = stmt.where(model.jour >= start)
+        if end is not None:
+            stmt = stmt.where(model.jour <= end)
+        return stmt.subquery()
+
+    # Deux agrégats d'une ligne chacun, joints explicitement (pas de produit cartésien implicite)
+    repas, seances = version(PlanningRepas), version(PlanningSeance)
+    return select(repas.c.nb, repas.c.modifie, seances.c.nb, seances.c.modifie).select_from(repas.join(seances, true()))
+
+
+async def get_calendar_version_async(db: AsyncSession, user_id: int, start: date = None, end: date = None) -> CalendarVersion:
+    """Version du calendrier : nombre de repas / séances et dernière modification de chacun."""
+    return CalendarVersion(*(await db.execute(_calendar_version_stmt(user_id, start, end))).one())
+
+
+def _cap(repas: list, seances: list, limit: int) -> dict:
+    """
+    Listes lues avec `limit` + 1 lignes. Si l'une dépasse `limit`, les deux sont coupées avant
+    le premier jour incomplet (un jour n'est jamais rendu à moitié) : next_from est ce jour,
+    à repasser en ?from= pour la suite.
+    """
+    cuts = [rows[limit].jour for rows in (repas, seances) if len(rows) > limit]
+    if not cuts:
+        return {"repas": repas, "seances": seances, "next_from": None}
+    next_from = min(cuts)
+    kept_repas = [r for r in repas if r.jour < next_from]
+    kept_seances = [s for s in seances if s.jour < next_from]
+    if not kept_repas and not kept_seances:
+        # Plus de `limit` lignes le même jour : ce jour est tronqué, la suite reprend au lendemain
+        return {"repas": repas[:limit], "seances": seances[:limit], "next_from": next_from + timedelta(days=1)}
+    return {"repas": kept_repas, "seances": kept_seances, "next_from": next_from}
+
+
+def _detail(calendar: dict, recettes: list, expand: frozenset) -> dict:
+    """Entrées -> schémas détaillés ; les recettes viennent du cache du catalogue."""
+    by_id = {r.id_recette: r for r in recettes}
+    calendar["repas"] = [
+        schemas.PlanningRepasDetail(**schemas.PlanningRepas.model_validate(r).model_dump(), recette=by_id.get(r.id_recette))
+        for r in calendar["repas"]
+    ]
+    if "seance" in expand:
+        # Séances et exercices déjà chargés par selectinload (_calendar_stmts)
+        calendar["seances"] = [schemas.PlanningSeanceDetail.model_validate(s) for s in calendar["seances"]]
+    else:
+        calendar["seances"] = [
+            schemas.PlanningSeanceDetail(**schemas.PlanningSeance.model_validate(s).model_dump())
+            for s in calendar["seances"]
+        ]
+    return calendar
+
+
+async def expand_calendar_async(db: AsyncSession, calendar: dict, expand: frozenset) -> dict:
+    """Remplace les entrées de `calendar` (lues avec le même `expand`) par leur version détaillée."""
+    recettes = []
+    if "recette" in expand:
+        recettes = await rc.get_recettes_cached_async(db, list(dict.fromkeys(r.id_recette for r in calendar["repas"])))
+    return _detail(calendar, recettes, expand)
+
+
+def get_user_calendar(db: Session, user_id: int, start: date = None, end: date = None, limit: int = CALENDAR_MAX_ROWS):
+    """Calendrier (repas + séances) d'un utilisateur, du `start` au `end` inclus : {repas, seances, next_from}."""
+    repas_stmt, seances_stmt = _calendar_stmts(user_id, start, end)
+    return _cap(
+        db.scalars(repas_stmt.limit(limit + 1)).all(),
+        db.scalars(seances_stmt.limit(limit + 1)).all(),
+        limit,
+    )
+
+
+async def get_user_calendar_async(db: AsyncSession, user_id: int, start: date = None, end: date = None,
+                                  limit: int = CALENDAR_MAX_ROWS, expand: frozenset = frozenset()):
+    repas_stmt, seances_stmt = _calendar_stmts(user_id, start, end, expand)
+    return _cap(
+        (await db.scalars(repas_stmt.limit(limit + 1))).all(),
+        (await db.scalars(seances_stmt.limit(limit + 1))).all(),
+        limit,
+    )
+
+
+async def stream_user_calendar(db: AsyncSession, user_id: int, start: date = None, end: date = None):
+    """
+    Produit ("repas" | "seance", ligne) pour toute la plage, sans limite : les lignes sont lues
+    par paquets de CALENDAR_STREAM_BATCH (curseur côté serveur), jamais toutes en mémoire.
+    """
+    for kind, stmt in zip(("repas", "seance"), _calendar_stmts(user_id, start, end)):
+        result = await db.stream_scalars(stmt.execution_options(yield_per=CALENDAR_STREAM_BATCH))
+        async for row in result:
+            yield kind, row
+
+
+def get_calendar_by_day(db: Session, user_id: int, jour: date):
+    """Récupère toutes les planifications pour un jour spécifique"""
+    repas_stmt, seances_stmt = _calendar_stmts(user_id, jour, jour)
     return {
-        "repas": planning_repas,
-        "seances": planning_seances
+        "jour": jour,
+        "repas": db.scalars(repas_stmt).all(),
+        "seances": db.scalars(seances_stmt).all()
     }
 
 
-def get_calendar_by_day(db: Session, user_id: int, jour: str):
-    """Récupère toutes les planifications pour un jour spécifique"""
-    
-    repas = db.query(PlanningRepas).filter(
-        PlanningRepas.id_utilisateur == user_id,
-        PlanningRepas.jour == jour
-    ).all()
-    
-    seances = db.query(PlanningSeance).filter(
-        PlanningSeance.id_utilisateur == user_id,
-        PlanningSeance.jour == jour
-    ).all()
-    
+async def get_calendar_by_day_async(db: AsyncSession, user_id: int, jour: date, expand: frozenset = frozenset()):
+    repas_stmt, seances_stmt = _calendar_stmts(user_id, jour, jour, expand)
     return {
         "jour": jour,
-        "repas": repas,
-        "seances": seances
+        "repas": (await db.scalars(repas_stmt)).all(),
+        "seances": (await db.scalars(seances_stmt)).all()
     }
 
 
@@ -57,6 +187,7 @@ def add_meal_to_calendar(db: Session, user_id: int, planning_repas: PlanningRepa
     
     db.add(db_planning)
     db.commit()
+    data_versions.bump(f"planning:{user_id}")
     db.refresh(db_planning)
     
     print(f"[DEBUG] Repas inséré: id={db_planning.id_planning_repas}", file=sys.stderr)
@@ -74,6 +205,43 @@ def add_workout_to_calendar(db: Session, user_id: int, planning_seance: Planning
     )
     db.add(db_planning)
     db.commit()
+    data_versions.bump(f"planning:{user_id}")
+    db.refresh(db_planning)
+    return db_planning
+
+
+def update_meal_in_calendar(db: Session, user_id: int, planning_id: int, meal_update: PlanningRepasCreate):
+    """Met à jour un repas du calendrier de l'utilisateur ; None s'il n'existe pas."""
+    db_planning = db.query(PlanningRepas).filter(
+        PlanningRepas.id_planning_repas == planning_id,
+        PlanningRepas.id_utilisateur == user_id
+    ).first()
+    if not db_planning:
+        return None
+    db_planning.id_recette = meal_update.id_recette
+    db_planning.jour = meal_update.jour
+    db_planning.repas = meal_update.repas
+    db_planning.notes = meal_update.notes
+    db.commit()
+    data_versions.bump(f"planning:{user_id}")
+    db.refresh(db_planning)
+    return db_planning
+
+
+def update_workout_in_calendar(db: Session, user_id: int, planning_id: int, workout_update: PlanningSeanceCreate):
+    """Met à jour une séance du calendrier de l'utilisateur ; None si elle n'existe pas."""
+    db_planning = db.query(PlanningSeance).filter(
+        PlanningSeance.id_planning_seance == planning_id,
+        PlanningSeance.id_utilisateur == user_id
+    ).first()
+    if not db_planning:
+        return None
+    db_planning.id_seance = workout_update.id_seance
+    db_planning.jour = workout_update.jour
+    db_planning.notes = workout_update.notes
+    db_planning.est_realise = workout_update.est_realise
+    db.commit()
+    data_versions.bump(f"planning:{user_id}")
     db.refresh(db_planning)
     return db_planning
 
@@ -84,8 +252,10 @@ def remove_meal_from_calendar(db: Session, planning_id: int):
         PlanningRepas.id_planning_repas == planning_id
     ).first()
     if db_planning:
+        user_id = db_planning.id_utilisateur
         db.delete(db_planning)
         db.commit()
+        data_versions.bump(f"planning:{user_id}")
         return True
     return False
 
@@ -96,7 +266,9 @@ def remove_workout_from_calendar(db: Session, planning_id: int):
         PlanningSeance.id_planning_seance == planning_id
     ).first()
     if db_planning:
+        user_id = db_planning.id_utilisateur
         db.delete(db_planning)
         db.commit()
+        data_versions.bump(f"planning:{user_id}")
         return True
     return False
@@ -1,76 +1,278 @@
-import google.generativeai as genai
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
+import asyncio
+import functools
 import os
 import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from models import Utilisateur, Exercice, PlanningRepas, PlanningSeance
+from models import Utilisateur, PlanningRepas, PlanningSeance, Seance
+import auth
+from schemas import RecetteFilters
 from controllers import recette_controller as rc
 from controllers import exercice_controller as ec
 from controllers import planning_controller as pc 
+from controllers import calendar_controller as cal_c
+from controllers import chat_history_controller as hc
 from utils.health_formulas import calculate_bmr, calculate_tdee, calculate_target_calories
+from utils.llm_backend import GeminiBackend, LLMBackend, ScriptedBackend
+from utils.llm_limiter import LLMBusy, LLMLimiter
+from utils.cache import TTLCache
+from utils.data_version import data_versions
+from database import SessionLocal
+
+# =========================================================================
+# SYSTEM PROMPT
+# =========================================================================
+
+SYSTEM_PROMPT = """
+Tu es FitBot, le coach sportif et nutritionnel expert de l'application NutriFit.
+
+===========================================================================
+📋 **CONTEXTE UTILISATEUR (PRIORITÉ ABSOLUE)**
+===========================================================================
+La "Carte d'Identité" de l'utilisateur actuel t'est transmise en début de conversation. Utilise ces infos pour adapter tes réponses SANS poser de questions.
+
+*Règles d'interprétation du profil :*
+- Si l'objectif est "Perte de poids" -> Propose automatiquement des recettes hypocaloriques et des séances brûle-graisse.
+- Si "Matériel" est vide -> Considère "Poids du corps". Sinon, utilise le matériel listé.
+- Si "Régime" est précisé (ex: Vegan) -> Vérifie STRICTEMENT que les recettes respectent ce régime.
+
+===========================================================================
+⛔ **RÈGLES TECHNIQUES & COMPORTEMENTALES (ANTI-BUG)**
+===========================================================================
+1. **INTERDICTION FORMELLE DE CODER** : Ne renvoie JAMAIS de code Python, de `print()`, de `tool_code` ou de JSON brut. Tu n'es pas un interpréteur, tu es un coach.
+2. **UTILISATION DES OUTILS** : Pour toute demande (Recette, Sport, Planning), tu DOIS appeler la fonction native correspondante (`function_call`). Ne décris pas l'action, FAIS-LA.
+3. **SILENCE RADIO** : Ne dis JAMAIS "Je cherche...", "Un instant...", "Laisse-moi regarder". Agis silencieusement et n'affiche QUE le résultat final utile.
+
+===========================================================================
+🥗 **INTELLIGENCE NUTRITION (RECETTES & CONSEILS)**
+===========================================================================
+1. **CONSEILS & ANALYSE (Priorité si question)** :
+   - Si l'utilisateur demande un avis ("C'est trop 700kcal ?", "Je mange quoi avant le sport ?"), **NE CHERCHE PAS DE RECETTE**.
+   - Réponds en utilisant ton expertise et les données de la "Carte d'Identité" (Cible journalière, Objectif).
+   - Ex: "700 kcal c'est environ 35%% de votre cible (2000), c'est un gros repas mais acceptable si..."
+
+2. **RECHERCHE DE RECETTES (Seulement si demandé)** :
+   - Si demande explicite de plat/repas ("J'ai faim", "Idée repas", "recette poulet") -> Appelle `search_recipes`.
+   - **Demande vague** -> Appelle `search_recipes(query="")`.
+   - **Demande précise** -> Appelle `search_recipes(query="anglais")`.
+
+**FORMAT DE RÉPONSE RECETTES (Uniquement pour search_recipes) :**
+"🍽️ **[Nom de la recette en Français]** (~[Calories] kcal)
+[Une phrase courte et appétissante qui décrit le plat]. [Mention spéciale SI régime spécifique, ex: "100% Vegan"]."
+*(Ne liste PAS les tags techniques type "sans arachide, sans soja" sauf si c'est pertinent pour le profil).*
+
+===========================================================================
+🏋️‍♂️ **INTELLIGENCE SPORTIVE (SÉANCES & PLANNING)**
+===========================================================================
+- **Création de séance** :
+  - Analyse l'état de l'utilisateur : "Je suis fatigué" -> `intensity="low"`. "J'ai peu de temps" -> `duration_min=20`.
+  - Vérifie le matériel dispo dans le profil pour remplir l'argument `material`.
+
+- **Consultation Planning** :
+  - Si l'utilisateur demande "C'est quoi mon programme ?", appelle `get_week_planning`.
+  - Si l'utilisateur demande une séance alors qu'il a déjà fait les jambes hier (visible dans le planning), propose le haut du corps.
+
+**FORMAT DE RÉPONSE OBLIGATOIRE :**
+"💪 **Séance : [Nom/Focus]** ([Durée])
+1. **[Exercice 1]** : [Courte instruction ou répétitions]
+2. **[Exercice 2]** : ..."
+
+*Adaptation :* Si un exercice semble dur, tu peux ajouter : "Si c'est trop difficile, fais [Variante simple, ex: sur les genoux]." (Mais n'invente pas d'exercices qui n'existent pas).
+
+===========================================================================
+Ton objectif : Être un coach efficace, direct et motivant. Pas de blabla technique, juste des résultats.
+"""
+
+TOOLS_SCHEMA = [
+    {"name": "get_health_profile", "description": "Profil utilisateur.", "parameters": {"type": "OBJECT", "properties": {}}},
+    {"name": "update_profile", "description": "Maj Profil.", "parameters": {"type": "OBJECT", "properties": {"age": {"type": "INTEGER"}, "sexe": {"type": "STRING"}, "poids": {"type": "NUMBER"}, "taille": {"type": "INTEGER"}, "objectif": {"type": "STRING"}}}},
+    {
+        "name": "generate_planning", 
+        "description": "Génère un planning hebdo. Paramètre 'focus' pour choisir.", 
+        "parameters": {
+            "type": "OBJECT", 
+            "properties": {
+                "focus": {
+                    "type": "STRING", 
+                    "description": "Ce qu'il faut générer : 'complet', 'alimentation' ou 'sport'."
+                }
+            }
+        }
+    },
+    {"name": "get_week_planning", "description": "Lit planning.", "parameters": {"type": "OBJECT", "properties": {}}},
+    {"name": "update_planning_entry", "description": "Modifie repas.", "parameters": {"type": "OBJECT", "properties": {"id_planning": {"type": "INTEGER"}, "new_recette_id": {"type": "INTEGER"}}, "required": ["id_planning", "new_recette_id"]}},
+    {"name": "update_planning_seance", "description": "Modifie seance.", "parameters": {"type": "OBJECT", "properties": {"id_planning": {"type": "INTEGER"}, "new_seance_id": {"type": "INTEGER"}}, "required": ["id_planning", "new_seance_id"]}},
+    {"name": "search_recipes", "description": "Cherche recette. Laisser query VIDE pour une suggestion automatique.", "parameters": {"type": "OBJECT", "properties": {"query": {"type": "STRING"}}}},
+    {"name": "get_catalog_exercises", "description": "Catalogue exos.", "parameters": {"type": "OBJECT", "properties": {}}},
+    {"name": "get_exercises", "description": "Liste exos.", "parameters": {"type": "OBJECT", "properties": {}}},
+    {"name": "create_custom_workout","description": "Génère une séance de sport unique et immédiate.","parameters": {"type": "OBJECT","properties": {"duration_min": {"type": "INTEGER", "description": "Durée en minutes (ex: 30, 60)."},"intensity": {"type": "STRING", "description": "'low' (fatigué), 'medium', 'high' (en forme)."},"focus": {"type": "STRING", "description": "'full_body', 'legs', 'upper', 'abs', 'cardio'."},"material": {"type": "STRING", "description": "'poids_du_corps', 'materiel_maison', 'salle_de_sport'."}}}}
+]
+
+# Configuration de la sécurité pour éviter les blocages injustifiés
+SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+]
+
+
+# =========================================================================
+# BACKEND LLM (construit une fois par worker)
+# =========================================================================
+# LLM_BACKEND=gemini (défaut) : modèle Gemini, cf. utils.llm_backend.GeminiBackend.
+# LLM_BACKEND=scripted : faux modèle déterministe (CI, benchmarks), sans réseau ni clé API.
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "models/gemini-2.5-flash")
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "0") == "1"
+GEMINI_CONTEXT_CACHE_TTL = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL_SECONDS", "3600"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+
+# Script par défaut du faux modèle : outils en lecture (en parallèle), recherche, puis réponse
+DEFAULT_SCRIPT = [
+    [("get_health_profile", {}), ("get_week_planning", {})],
+    [("search_recipes", {"query": ""})],
+    "🍽️ **Suggestion du coach** (~500 kcal) Un repas équilibré adapté à votre objectif.",
+]
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def _build_backend() -> LLMBackend:
+    if LLM_BACKEND == "scripted":
+        return ScriptedBackend(DEFAULT_SCRIPT, latency=float(os.getenv("LLM_SCRIPTED_LATENCY_SECONDS", "0")))
+    if LLM_BACKEND != "gemini":
+        raise ValueError(f"LLM_BACKEND inconnu : {LLM_BACKEND} (valeurs possibles : gemini, scripted)")
+    return GeminiBackend(
+        model_name=GEMINI_MODEL,
+        system_prompt=SYSTEM_PROMPT,
+        tools=TOOLS_SCHEMA,
+        safety_settings=SAFETY_SETTINGS,
+        context_cache=GEMINI_CONTEXT_CACHE,
+        context_cache_ttl=GEMINI_CONTEXT_CACHE_TTL,
+        timeout=LLM_TIMEOUT,
+    )
 
-# --- CONFIGURATION ---
-API_KEY = os.getenv("GEMINI_API_KEY") 
-if not API_KEY:
-    raise ValueError("La clé API Gemini est manquante dans le fichier .env")
 
-genai.configure(api_key=API_KEY)
+def get_backend() -> LLMBackend:
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _build_backend()
+    return _backend
 
-def handle_chat_interaction(user_message: str, db: Session, current_user: Utilisateur):
-    
-    poids = float(current_user.poids_kg) if current_user.poids_kg else None
-    taille = float(current_user.taille_cm) if current_user.taille_cm else 175.0 # Valeur par défaut pour éviter crash
-    age = current_user.age
-    sexe = current_user.sexe
-    objectif = current_user.objectif or "maintien"
 
-    # B. Calcul automatique des besoins (BMR / TDEE / Cible)
-    info_calorique = "Données insuffisantes pour calculer les besoins."
-    if poids and age and sexe:
-        try:
-            bmr = calculate_bmr(poids, taille, age, sexe)
-            tdee = calculate_tdee(bmr, "sedentaire") # On part sur sédentaire par défaut pour sécuriser
-            cible_journaliere = calculate_target_calories(tdee, objectif)
-            
-            info_calorique = (
-                f"Métabolisme de base (BMR): {int(bmr)} kcal | "
-                f"Dépense totale (TDEE): {int(tdee)} kcal | "
-                f"🎯 CIBLE JOURNALIÈRE À VISER: {int(cible_journaliere)} kcal"
-            )
-        except Exception as e:
-            print(f"Erreur calcul: {e}")
+def set_backend(backend: LLMBackend):
+    """Remplace le backend du worker (tests, benchmarks)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
 
-    # C. Construction de la liste
-    profile_parts = [
-        f"Prénom: {current_user.prenom or 'Athlète'}",
-        f"Age: {age} ans" if age else None,
-        f"Poids: {poids} kg" if poids else None,
-        f"Sexe: {sexe or 'Non précisé'}",
-        f"OBJECTIF: {objectif}",
-        f"📊 ANALYSE CALORIQUE PRÉ-CALCULÉE : [{info_calorique}]" # <--- C'est ça qui change tout !
-    ]
 
-    if hasattr(current_user, 'regime_alimentaire') and current_user.regime_alimentaire:
-        profile_parts.append(f"Régime Alimentaire: {current_user.regime_alimentaire}")
-    
-    if hasattr(current_user, 'equipements') and current_user.equipements:
-        profile_parts.append(f"Matériel disponible: {current_user.equipements}")
-    else:
-        profile_parts.append("Matériel: Poids du corps uniquement (par défaut)")
+def get_chat_model_stats() -> dict:
+    return get_backend().stats()
 
-    if hasattr(current_user, 'nb_jours_entrainement') and current_user.nb_jours_entrainement:
-        profile_parts.append(f"Fréquence entraînement: {current_user.nb_jours_entrainement} jours/semaine")
 
-    user_info_str = " | ".join([p for p in profile_parts if p is not None])
+def _profile_history(user_info_str: str, resume: str = None, messages: list = ()) -> list:
+    """Suffixe propre à l'utilisateur, hors du préfixe mis en cache : profil, résumé, derniers échanges."""
+    intro = f"📋 Carte d'Identité de l'utilisateur : [{user_info_str}]"
+    if resume:
+        intro += f"\n🧠 Résumé de nos échanges précédents : {resume}"
+    return [
+        {"role": "user", "parts": [intro]},
+        {"role": "model", "parts": ["Profil pris en compte."]},
+    ] + [{"role": m.role, "parts": [m.contenu]} for m in messages]
 
-    available_tags = rc.get_available_tags(db)
-    tags_context_str = ", ".join(available_tags[:50])
-    
-    # =========================================================================
-    # OUTILS
-    # =========================================================================
-    
+
+# =========================================================================
+# MÉMOIRE : RÉSUMÉ GLISSANT (hors du tour de l'utilisateur)
+# =========================================================================
+
+SUMMARY_PROMPT = """Tu résumes une conversation entre un utilisateur et FitBot, son coach sportif et nutritionnel.
+Garde uniquement ce qui sera utile pour la suite : objectifs, préférences, contraintes, recettes ou séances
+proposées et acceptées/refusées, décisions prises. 120 mots maximum, en français, sans introduction.
+
+Résumé précédent : {previous}
+
+Nouveaux échanges :
+{transcript}"""
+
+_compacting = set()
+_compacting_lock = threading.Lock()
+
+
+def _summarize(previous: str, messages: list) -> str:
+    transcript = "\n".join(f"{'Utilisateur' if m.role == 'user' else 'Coach'} : {m.contenu}" for m in messages)
+    return get_backend().summarize(SUMMARY_PROMPT.format(previous=previous or "(aucun)", transcript=transcript))
+
+
+def _compact_in_thread(user_id: int):
+    """Lecture (session courte), résumé hors transaction, puis écriture dans une nouvelle transaction."""
+    try:
+        with SessionLocal(expire_on_commit=False) as db:
+            plan = hc.prepare_compaction(db, user_id)
+        if plan is None:
+            return
+        previous, old, after_id = plan
+        resume = _summarize(previous, old)
+        if resume:
+            with SessionLocal() as db:
+                hc.apply_compaction(db, user_id, after_id, old[-1].id, resume)
+    except Exception as e:
+        # Sans résumé, load_history tronque simplement aux messages les plus récents
+        print(f"⚠️ Résumé de l'historique impossible (user {user_id}) : {e}")
+    finally:
+        with _compacting_lock:
+            _compacting.discard(user_id)
+
+
+def _compaction_refused(user_id: int, fut):
+    # LLMBusy : _compact_in_thread n'a pas démarré, c'est ici que le drapeau est rendu
+    if fut.cancelled() or isinstance(fut.exception(), LLMBusy):
+        with _compacting_lock:
+            _compacting.discard(user_id)
+
+
+def _schedule_compaction(user_id: int):
+    """Résumé en tâche de fond, dans le pool LLM (même limite de concurrence que les réponses)."""
+    with _compacting_lock:
+        if user_id in _compacting:
+            return
+        _compacting.add(user_id)
+    fut = llm_limiter.submit_threadsafe(("compaction", user_id), _compact_in_thread, user_id)
+    if fut is None:
+        # Pas encore de boucle (appel hors API) : le prochain tour au-delà du budget réessaiera
+        with _compacting_lock:
+            _compacting.discard(user_id)
+        return
+    fut.add_done_callback(functools.partial(_compaction_refused, user_id))
+
+
+# =========================================================================
+# OUTILS
+# =========================================================================
+
+# Outils sans écriture : exécutables en parallèle, chacun avec sa propre session
+READ_ONLY_TOOLS = {
+    "get_health_profile", "get_week_planning", "search_recipes",
+    "get_catalog_exercises", "get_exercises", "create_custom_workout",
+}
+
+CHAT_TOOL_WORKERS = int(os.getenv("CHAT_TOOL_WORKERS", "8"))
+
+_tool_executor = None
+_tool_executor_lock = threading.Lock()
+
+
+def _build_tools(db: Session, current_user: Utilisateur) -> dict:
+    """Outils exposés au modèle, liés à une session et à l'utilisateur courant."""
     def TOOL_get_health_profile():
         missing = []
         if not current_user.poids_kg: missing.append("poids")
@@ -101,15 +303,9 @@ def handle_chat_interaction(user_message: str, db: Session, current_user: Utilis
         - material: 'poids_du_corps', 'materiel_maison', 'salle_de_sport'
         """
         
-        allowed_materials = ["poids_du_corps"]
-        if material == "materiel_maison":
-            allowed_materials.append("materiel_maison")
-        elif material == "salle_de_sport":
-            allowed_materials.extend(["materiel_maison", "salle_de_sport"])
-            
-        
-        all_exos = db.query(Exercice).filter(Exercice.materiel.in_(allowed_materials)).all()
-        candidates = []
+        # Catalogue indexé du worker : seuls les exercices des muscles / types demandés sont parcourus
+        catalog = ec.get_catalog(db)
+        materials = ec.allowed_materials(material)
 
         keywords_map = {
             "legs": ["quadriceps", "ischios", "mollets", "fessiers", "jambes"],
@@ -117,19 +313,14 @@ def handle_chat_interaction(user_message: str, db: Session, current_user: Utilis
             "abs": ["abdominaux", "obliques", "core"],
             "cardio": ["cardio", "full_body"]
         }
-        
-        target_muscles = keywords_map.get(focus, [])
-        
-        for exo in all_exos:
-            
-            if focus == "full_body":
-                if exo.type_exercice in ["force", "cardio", "gainage"]:
-                    candidates.append(exo)
-            
-            else:
-                
-                if any(m in target_muscles for m in exo.muscle_cible):
-                    candidates.append(exo)
+
+        if focus == "full_body":
+            candidates = catalog.select(materials, types=["force", "cardio", "gainage"])
+        else:
+            # Le cardio est un type d'exercice plus qu'un muscle
+            candidates = catalog.select(
+                materials, muscles=keywords_map.get(focus, []), types=["cardio"] if focus == "cardio" else []
+            )
 
         if not candidates:
             return {"erreur": f"Pas assez d'exercices trouvés pour {focus} avec {material}."}
@@ -140,14 +331,13 @@ def handle_chat_interaction(user_message: str, db: Session, current_user: Utilis
         if intensity == "low": nb_exos = max(3, nb_exos - 2)
         if intensity == "high": nb_exos += 2
 
-        random.shuffle(candidates)
-        selected_exos = candidates[:nb_exos]
+        selected_exos = random.sample(candidates, min(nb_exos, len(candidates)))
 
         return {
             "seance_generee": {
                 "objectif": f"{focus.upper()} ({duration_min} min - {intensity})",
                 "exercices": [
-                    {"nom": e.nom_exercice, "type": e.type_exercice, "muscles": e.muscle_cible, "materiel": e.materiel}
+                    {"nom": e.nom_exercice, "type": e.type_exercice, "muscles": ", ".join(e.muscles), "materiel": e.materiel}
                     for e in selected_exos
                 ],
                 "conseil_coach": f"Fais 3 à 4 séries de chaque. {'Temps de repos longs (2min)' if intensity == 'high' else 'Repos courts (45s)'}."
@@ -155,7 +345,8 @@ def handle_chat_interaction(user_message: str, db: Session, current_user: Utilis
         }
 
     def TOOL_update_profile(age: int = None, sexe: str = None, poids: float = None, taille: int = None, objectif: str = None):
-        user = db.query(Utilisateur).filter(Utilisateur.id_utilisateur == current_user.id_utilisateur).first()
+        # Même session que la requête : renvoie current_user sans SELECT
+        user = db.get(Utilisateur, current_user.id_utilisateur)
         if not user: return {"erreur": "Utilisateur introuvable."}
 
         if sexe:
@@ -181,6 +372,7 @@ def handle_chat_interaction(user_message: str, db: Session, current_user: Utilis
         
         db.commit()
         db.refresh(user)
+        auth.invalidate_user(user.id_utilisateur)
         
         current_user.age = user.age
         current_user.sexe = user.sexe
@@ -212,24 +404,20 @@ def handle_chat_interaction(user_message: str, db: Session, current_user: Utilis
         )
 
     def TOOL_get_week_planning():
-        today = datetime.now()
-        end = today + timedelta(days=7)
-        entries_repas = pc.get_user_planning(db, current_user.id_utilisateur, today, end)
+        today = datetime.now().date()
+        semaine = cal_c.get_user_calendar(db, current_user.id_utilisateur, today, today + timedelta(days=7))
+        recettes = {r.id_recette: r for r in rc.get_recettes_cached(db, list({e.id_recette for e in semaine["repas"]}))}
+        seance_ids = list({e.id_seance for e in semaine["seances"]})
+        seances = dict(db.query(Seance.id_seance, Seance.nom).filter(Seance.id_seance.in_(seance_ids)).all()) if seance_ids else {}
+
         planning_data = []
-        if entries_repas:
-            for entry in entries_repas:
-                recette = rc.get_recette_by_id(db, entry.id_recette)
-                if recette:
-                    date_str = entry.date.strftime("%A %d")
-                    planning_data.append(f"[REPAS] {date_str} ({entry.type_repas}) : {recette.nom_recette} (ID: {entry.id_planning})")
-
-        entries_sport = db.query(PlanningSeance).filter(PlanningSeance.id_utilisateur == current_user.id_utilisateur, PlanningSeance.date >= today, PlanningSeance.date <= end).all()
-        if entries_sport:
-            for entry in entries_sport:
-                seance = db.query(ec.models.Seance).filter(ec.models.Seance.id_seance == entry.id_seance).first()
-                if seance:
-                    date_str = entry.date.strftime("%A %d")
-                    planning_data.append(f"[SPORT] {date_str} : {seance.nom} (ID: {entry.id_planning_seance})")
+        for entry in semaine["repas"]:
+            recette = recettes.get(entry.id_recette)
+            if recette:
+                planning_data.append(f"[REPAS] {entry.jour.strftime('%A %d')} ({entry.repas}) : {recette.nom_recette} (ID: {entry.id_planning_repas})")
+        for entry in semaine["seances"]:
+            if entry.id_seance in seances:
+                planning_data.append(f"[SPORT] {entry.jour.strftime('%A %d')} : {seances[entry.id_seance]} (ID: {entry.id_planning_seance})")
 
         return {"agenda_semaine": planning_data if planning_data else "Planning vide."}
 
@@ -254,25 +442,18 @@ def handle_chat_interaction(user_message: str, db: Session, current_user: Utilis
              except: pass
 
         
-        candidates = rc.get_all_recettes(db, limit=100, search=query if query else None)
-        
-        if not candidates: 
+        # Filtrage calorique et tirage faits en base ; le mot clé restreint aux 100 meilleurs résultats de l'index
+        among = None
+        if query:
+            among = [doc_id for doc_id, _ in rc.get_search_index(db).search(query, limit=100)]
+            if not among:
+                return {"resultat": "Aucune recette trouvée."}
+
+        window = RecetteFilters(cal_min=int(target_meal_calories - 200), cal_max=int(target_meal_calories + 200))
+        selected = rc.sample_recettes(db, 3, window, among=among) or rc.sample_recettes(db, 3, among=among)
+        if not selected:
             return {"resultat": "Aucune recette trouvée."}
 
-        suitable = []
-        min_cal = target_meal_calories - 200
-        max_cal = target_meal_calories + 200
-
-        for r in candidates:
-            cal = r.calories or 0
-            if min_cal <= cal <= max_cal:
-                suitable.append(r)
-        
-        if not suitable: suitable = candidates
-
-        random.shuffle(suitable)
-        selected = suitable[:3] 
-
         return {
             "info_context": user_context,
             "recettes_trouvees": [
@@ -291,12 +472,12 @@ def handle_chat_interaction(user_message: str, db: Session, current_user: Utilis
     def TOOL_update_planning_entry(id_planning: int, new_recette_id: int):
         success = pc.update_meal_planning(db, id_planning, new_recette_id)
         if success:
-            recette = rc.get_recette_by_id(db, new_recette_id)
+            recette = rc.get_recette_cached(db, new_recette_id)
             return {"status": "succes", "message": f"Repas modifié par : {recette.nom_recette}"}
         return {"erreur": "Impossible de modifier."}
 
     def TOOL_get_catalog_exercises():
-        exos = db.query(Exercice).all()
+        exos = ec.get_catalog(db).all()  # catalogue en mémoire du worker : pas de lecture de la table
         return {"catalogue": [{"nom": e.nom_exercice, "categorie": e.type_exercice} for e in exos]}
 
     def TOOL_update_planning_seance(id_planning: int, new_seance_id: int):
@@ -323,161 +504,319 @@ def handle_chat_interaction(user_message: str, db: Session, current_user: Utilis
         "create_custom_workout": TOOL_create_custom_workout
     }
 
-    # =========================================================================
-    # SYSTEM PROMPT
-    # =========================================================================
-    
-    system_instruction = f"""
-    Tu es FitBot, le coach sportif et nutritionnel expert de l'application NutriFit.
-    
-    ===========================================================================
-    📋 **CONTEXTE UTILISATEUR (PRIORITÉ ABSOLUE)**
-    ===========================================================================
-    Voici la "Carte d'Identité" de l'utilisateur actuel. Utilise ces infos pour adapter tes réponses SANS poser de questions :
-    [{user_info_str}]
-    
-    *Règles d'interprétation du profil :*
-    - Si l'objectif est "Perte de poids" -> Propose automatiquement des recettes hypocaloriques et des séances brûle-graisse.
-    - Si "Matériel" est vide -> Considère "Poids du corps". Sinon, utilise le matériel listé.
-    - Si "Régime" est précisé (ex: Vegan) -> Vérifie STRICTEMENT que les recettes respectent ce régime.
-
-    ===========================================================================
-    ⛔ **RÈGLES TECHNIQUES & COMPORTEMENTALES (ANTI-BUG)**
-    ===========================================================================
-    1. **INTERDICTION FORMELLE DE CODER** : Ne renvoie JAMAIS de code Python, de `print()`, de `tool_code` ou de JSON brut. Tu n'es pas un interpréteur, tu es un coach.
-    2. **UTILISATION DES OUTILS** : Pour toute demande (Recette, Sport, Planning), tu DOIS appeler la fonction native correspondante (`function_call`). Ne décris pas l'action, FAIS-LA.
-    3. **SILENCE RADIO** : Ne dis JAMAIS "Je cherche...", "Un instant...", "Laisse-moi regarder". Agis silencieusement et n'affiche QUE le résultat final utile.
-
-    ===========================================================================
-    🥗 **INTELLIGENCE NUTRITION (RECETTES & CONSEILS)**
-    ===========================================================================
-    1. **CONSEILS & ANALYSE (Priorité si question)** :
-       - Si l'utilisateur demande un avis ("C'est trop 700kcal ?", "Je mange quoi avant le sport ?"), **NE CHERCHE PAS DE RECETTE**.
-       - Réponds en utilisant ton expertise et les données de la "Carte d'Identité" (Cible journalière, Objectif).
-       - Ex: "700 kcal c'est environ 35%% de votre cible (2000), c'est un gros repas mais acceptable si..."
-    
-    2. **RECHERCHE DE RECETTES (Seulement si demandé)** :
-       - Si demande explicite de plat/repas ("J'ai faim", "Idée repas", "recette poulet") -> Appelle `search_recipes`.
-       - **Demande vague** -> Appelle `search_recipes(query="")`.
-       - **Demande précise** -> Appelle `search_recipes(query="anglais")`.
-
-    **FORMAT DE RÉPONSE RECETTES (Uniquement pour search_recipes) :**
-    "🍽️ **[Nom de la recette en Français]** (~[Calories] kcal)
-    [Une phrase courte et appétissante qui décrit le plat]. [Mention spéciale SI régime spécifique, ex: "100% Vegan"]."
-    *(Ne liste PAS les tags techniques type "sans arachide, sans soja" sauf si c'est pertinent pour le profil).*
-
-    ===========================================================================
-    🏋️‍♂️ **INTELLIGENCE SPORTIVE (SÉANCES & PLANNING)**
-    ===========================================================================
-    - **Création de séance** :
-      - Analyse l'état de l'utilisateur : "Je suis fatigué" -> `intensity="low"`. "J'ai peu de temps" -> `duration_min=20`.
-      - Vérifie le matériel dispo dans le profil pour remplir l'argument `material`.
-    
-    - **Consultation Planning** :
-      - Si l'utilisateur demande "C'est quoi mon programme ?", appelle `get_week_planning`.
-      - Si l'utilisateur demande une séance alors qu'il a déjà fait les jambes hier (visible dans le planning), propose le haut du corps.
-
-    **FORMAT DE RÉPONSE OBLIGATOIRE :**
-    "💪 **Séance : [Nom/Focus]** ([Durée])
-    1. **[Exercice 1]** : [Courte instruction ou répétitions]
-    2. **[Exercice 2]** : ..."
-    
-    *Adaptation :* Si un exercice semble dur, tu peux ajouter : "Si c'est trop difficile, fais [Variante simple, ex: sur les genoux]." (Mais n'invente pas d'exercices qui n'existent pas).
+    return tools_map
 
-    ===========================================================================
-    Ton objectif : Être un coach efficace, direct et motivant. Pas de blabla technique, juste des résultats.
-    """
 
-    tools_schema = [
-        {"name": "get_health_profile", "description": "Profil utilisateur.", "parameters": {"type": "OBJECT", "properties": {}}},
-        {"name": "update_profile", "description": "Maj Profil.", "parameters": {"type": "OBJECT", "properties": {"age": {"type": "INTEGER"}, "sexe": {"type": "STRING"}, "poids": {"type": "NUMBER"}, "taille": {"type": "INTEGER"}, "objectif": {"type": "STRING"}}}},
-        {
-            "name": "generate_planning", 
-            "description": "Génère un planning hebdo. Paramètre 'focus' pour choisir.", 
-            "parameters": {
-                "type": "OBJECT", 
-                "properties": {
-                    "focus": {
-                        "type": "STRING", 
-                        "description": "Ce qu'il faut générer : 'complet', 'alimentation' ou 'sport'."
-                    }
-                }
-            }
-        },
-        {"name": "get_week_planning", "description": "Lit planning.", "parameters": {"type": "OBJECT", "properties": {}}},
-        {"name": "update_planning_entry", "description": "Modifie repas.", "parameters": {"type": "OBJECT", "properties": {"id_planning": {"type": "INTEGER"}, "new_recette_id": {"type": "INTEGER"}}, "required": ["id_planning", "new_recette_id"]}},
-        {"name": "update_planning_seance", "description": "Modifie seance.", "parameters": {"type": "OBJECT", "properties": {"id_planning": {"type": "INTEGER"}, "new_seance_id": {"type": "INTEGER"}}, "required": ["id_planning", "new_seance_id"]}},
-        {"name": "search_recipes", "description": "Cherche recette. Laisser query VIDE pour une suggestion automatique.", "parameters": {"type": "OBJECT", "properties": {"query": {"type": "STRING"}}}},
-        {"name": "get_catalog_exercises", "description": "Catalogue exos.", "parameters": {"type": "OBJECT", "properties": {}}},
-        {"name": "get_exercises", "description": "Liste exos.", "parameters": {"type": "OBJECT", "properties": {}}},
-        {"name": "create_custom_workout","description": "Génère une séance de sport unique et immédiate.","parameters": {"type": "OBJECT","properties": {"duration_min": {"type": "INTEGER", "description": "Durée en minutes (ex: 30, 60)."},"intensity": {"type": "STRING", "description": "'low' (fatigué), 'medium', 'high' (en forme)."},"focus": {"type": "STRING", "description": "'full_body', 'legs', 'upper', 'abs', 'cardio'."},"material": {"type": "STRING", "description": "'poids_du_corps', 'materiel_maison', 'salle_de_sport'."}}}}
-    ]
+def _get_tool_executor() -> ThreadPoolExecutor:
+    global _tool_executor
+    if _tool_executor is None:
+        with _tool_executor_lock:
+            if _tool_executor is None:
+                _tool_executor = ThreadPoolExecutor(max_workers=CHAT_TOOL_WORKERS, thread_name_prefix="chat-tool")
+    return _tool_executor
 
 
+# --- Cache des résultats d'outils déterministes ---
+# Clé : outil + arguments + versions des données lues (cf. utils.data_version) ; une écriture
+# sur ces données change la clé. La TTL borne l'obsolescence vis-à-vis des autres workers.
+# Les outils à tirage aléatoire (search_recipes, create_custom_workout) ne sont pas mis en cache.
 
+TOOL_CACHE_TTL = float(os.getenv("TOOL_CACHE_TTL_SECONDS", "300"))
 
+# outil -> domaines lus ; "planning" est propre à l'utilisateur (clé par utilisateur).
+# get_health_profile n'en fait pas partie : calculé sans requête depuis l'utilisateur courant,
+# qu'une version en cache pourrait contredire.
+CACHEABLE_TOOLS = {
+    "get_catalog_exercises": ("exercices",),
+    "get_exercises": ("exercices",),
+    "get_week_planning": ("planning", "recettes"),
+}
+_PER_USER_DOMAINS = {"planning"}
+
+_tool_cache = TTLCache(max_size=int(os.getenv("TOOL_CACHE_MAX_SIZE", "512")), ttl=TOOL_CACHE_TTL)
+_tool_stats = {}
+_tool_stats_lock = threading.Lock()
 
-    # Configuration de la sécurité pour éviter les blocages injustifiés
-    safety_settings = [
-        {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-        {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-        {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-        {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
-    ]
 
-    model = genai.GenerativeModel(
-        model_name="models/gemini-2.5-flash", 
-        tools=tools_schema, 
-        system_instruction=system_instruction,
-        safety_settings=safety_settings
+def _tool_cache_key(name: str, args: dict, user_id: int):
+    domains = CACHEABLE_TOOLS[name]
+    per_user = any(d in _PER_USER_DOMAINS for d in domains)
+    versions = tuple(
+        data_versions.get(f"{d}:{user_id}" if d in _PER_USER_DOMAINS else d) for d in domains
     )
-    chat = model.start_chat(enable_automatic_function_calling=False)
+    # get_week_planning couvre "aujourd'hui + 7 jours" : la date fait partie de la clé
+    day = datetime.now().date().isoformat() if "planning" in domains else None
+    return (name, tuple(sorted((k, str(v)) for k, v in args.items())), user_id if per_user else None, versions, day)
+
+
+def _record_tool(name: str, elapsed_ms: float, hit: bool):
+    with _tool_stats_lock:
+        st = _tool_stats.setdefault(name, {"calls": 0, "hits": 0, "total_ms": 0.0, "max_ms": 0.0})
+        st["calls"] += 1
+        st["hits"] += hit
+        st["total_ms"] += elapsed_ms
+        st["max_ms"] = max(st["max_ms"], elapsed_ms)
+
+
+def get_tool_stats() -> dict:
+    with _tool_stats_lock:
+        tools = {
+            name: {
+                "calls": st["calls"],
+                "hit_rate": round(st["hits"] / st["calls"], 4),
+                "avg_ms": round(st["total_ms"] / st["calls"], 2),
+                "max_ms": round(st["max_ms"], 2),
+            }
+            for name, st in _tool_stats.items()
+        }
+    return {"cache": _tool_cache.stats(), "tools": tools}
+
+
+def _run_tool(tools_map: dict, name: str, args: dict, user_id: int):
+    if name not in tools_map:
+        return {"erreur": "Outil inconnu"}
+    started = time.perf_counter()
+    key = _tool_cache_key(name, args, user_id) if name in CACHEABLE_TOOLS else None
+    if key is not None:
+        res = _tool_cache.get(key)
+        if res is not None:
+            _record_tool(name, (time.perf_counter() - started) * 1000, hit=True)
+            return res
+    try:
+        res = tools_map[name](**args)
+    except Exception as tool_err:
+        res = {"erreur_interne": str(tool_err)}
+    is_error = isinstance(res, dict) and any(k.startswith("erreur") for k in res)
+    if key is not None and not is_error:
+        _tool_cache.set(key, res)
+    _record_tool(name, (time.perf_counter() - started) * 1000, hit=False)
+    return res
+
+
+def _run_tool_isolated(name: str, args: dict, current_user: Utilisateur):
+    db = SessionLocal()
+    try:
+        user = db.merge(current_user, load=False)
+        return _run_tool(_build_tools(db, user), name, args, user.id_utilisateur)
+    finally:
+        db.close()
+
 
+def _run_tool_calls(calls: list, tools_map: dict, current_user: Utilisateur) -> list:
+    """
+    Exécute les appels [(nom, args)] d'un même tour du modèle ; résultats dans le même ordre.
+    Tous en lecture seule -> en parallèle (une session chacun). Sinon -> en séquence, dans
+    l'ordre demandé, sur la session de la requête (une écriture peut précéder une lecture).
+    """
+    if len(calls) > 1 and all(name in READ_ONLY_TOOLS for name, _ in calls):
+        futures = [_get_tool_executor().submit(_run_tool_isolated, name, args, current_user) for name, args in calls]
+        return [f.result() for f in futures]
+    user_id = current_user.id_utilisateur
+    return [_run_tool(tools_map, name, args, user_id) for name, args in calls]
+
+
+# =========================================================================
+# ORDONNANCEMENT DES APPELS (pool dédié, isolé des routes CRUD)
+# =========================================================================
+
+llm_limiter = LLMLimiter(
+    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "4")),
+    max_queue=int(os.getenv("LLM_MAX_QUEUE", "32")),
+    max_per_user=int(os.getenv("LLM_MAX_PER_USER", "1")),
+    queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "10")),
+    timeout=LLM_TIMEOUT,
+)
+
+
+def _chat_in_thread(user_message: str, current_user: Utilisateur) -> str:
+    # Session ouverte une fois la place obtenue ; chat_events termine la transaction avant chaque
+    # appel au modèle : la connexion n'est tenue que pendant les requêtes. expire_on_commit=False :
+    # ces commits ne font pas relire l'utilisateur.
+    db = SessionLocal(expire_on_commit=False)
     try:
-        response = chat.send_message(user_message)
-        
-        for _ in range(5):
-            if not response.candidates: return "Erreur API."
-            
-            # Protection contre les réponses vides (bug connu Gemini ou Filtre de sécurité)
-            if not response.candidates[0].content.parts:
-                print(f"⚠️ [IA] Réponse vide reçue. Debug Candidate: {response.candidates[0]}")
-                
-                # Si bloqué par la sécurité, on le dit
-                if response.candidates[0].finish_reason == 3: # 3 = SAFETY
-                    return "Je ne peux pas répondre pour des raisons de sécurité (filtre déclenché)."
-                
-                return "Je n'ai pas réussi à formuler une réponse (Réponse vide du modèle)."
+        user = db.merge(current_user, load=False)
+        return handle_chat_interaction(user_message, db, user)
+    finally:
+        db.close()
+
 
-            part = response.candidates[0].content.parts[0]
+def shutdown():
+    """Arrêt du worker : libère les pools de threads du chat."""
+    global _tool_executor
+    llm_limiter.shutdown()
+    if _tool_executor is not None:
+        _tool_executor.shutdown(wait=False, cancel_futures=True)
+        _tool_executor = None
+
+
+async def handle_chat_interaction_async(user_message: str, current_user: Utilisateur) -> str:
+    """Lève LLMBusy (file pleine / demande déjà en cours) ou LLMTimeout."""
+    return await llm_limiter.run(current_user.id_utilisateur, _chat_in_thread, user_message, current_user)
+
+
+async def stream_chat_interaction(user_message: str, current_user: Utilisateur):
+    """
+    Générateur asynchrone des événements de chat_events, produits dans le pool LLM.
+    Le premier événement ("start") arrive dès qu'une place est obtenue ; LLMBusy est levée
+    avant lui, LLMTimeout peut l'être en cours de flux.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def produce():
+        db = SessionLocal(expire_on_commit=False)  # voir _chat_in_thread
+        try:
+            user = db.merge(current_user, load=False)
+            loop.call_soon_threadsafe(queue.put_nowait, {"type": "start"})
+            for event in chat_events(user_message, db, user):
+                if stop.is_set():  # client déconnecté : on n'enchaîne pas d'autre appel
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+        finally:
+            db.close()
+
+    run = asyncio.ensure_future(llm_limiter.run(current_user.id_utilisateur, produce))
+    try:
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait({getter, run}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                yield getter.result()
+                continue
+            getter.cancel()
+            # Les événements sont déposés avant la fin de `run` (même file de callbacks) : on vide la file
+            while not queue.empty():
+                yield queue.get_nowait()
+            run.result()  # propage LLMBusy / LLMTimeout
+            return
+    finally:
+        stop.set()
+        if not run.done():
+            run.cancel()  # n'interrompt que l'attente : la place est rendue à la fin du thread
+
+
+def handle_chat_interaction(user_message: str, db: Session, current_user: Utilisateur) -> str:
+    """Réponse complète du coach (consomme le flux d'événements de chat_events)."""
+    for event in chat_events(user_message, db, current_user):
+        if event["type"] == "done":
+            return event["response"]
+    return "Une erreur technique est survenue."
+
+
+def chat_events(user_message: str, db: Session, current_user: Utilisateur):
+    """
+    Boucle d'outils du coach, sous forme de générateur d'événements :
+    {"type": "token", "text"}, {"type": "tool_call", "name", "args"},
+    {"type": "tool_result", "name", "ok"}, puis toujours un {"type": "done", "response"} final.
+    """
+    
+    poids = float(current_user.poids_kg) if current_user.poids_kg else None
+    taille = float(current_user.taille_cm) if current_user.taille_cm else 175.0 # Valeur par défaut pour éviter crash
+    age = current_user.age
+    sexe = current_user.sexe
+    objectif = current_user.objectif or "maintien"
+
+    # B. Calcul automatique des besoins (BMR / TDEE / Cible)
+    info_calorique = "Données insuffisantes pour calculer les besoins."
+    if poids and age and sexe:
+        try:
+            bmr = calculate_bmr(poids, taille, age, sexe)
+            tdee = calculate_tdee(bmr, "sedentaire") # On part sur sédentaire par défaut pour sécuriser
+            cible_journaliere = calculate_target_calories(tdee, objectif)
             
-            if part.function_call:
-                fc = part.function_call
-                name = fc.name
-                args = {k: v for k, v in fc.args.items()}
-                
-                print(f"🤖 [IA] Appel outil : {name} {args}")
-                
-                if name in tools_map:
-                    try:
-                        res = tools_map[name](**args)
-                    except Exception as tool_err:
-                        res = {"erreur_interne": str(tool_err)}
-                else:
-                    res = {"erreur": "Outil inconnu"}
-                
-                print(f"✅ [API] Résultat : {str(res)}") 
+            info_calorique = (
+                f"Métabolisme de base (BMR): {int(bmr)} kcal | "
+                f"Dépense totale (TDEE): {int(tdee)} kcal | "
+                f"🎯 CIBLE JOURNALIÈRE À VISER: {int(cible_journaliere)} kcal"
+            )
+        except Exception as e:
+            print(f"Erreur calcul: {e}")
+
+    # C. Construction de la liste
+    profile_parts = [
+        f"Prénom: {current_user.prenom or 'Athlète'}",
+        f"Age: {age} ans" if age else None,
+        f"Poids: {poids} kg" if poids else None,
+        f"Sexe: {sexe or 'Non précisé'}",
+        f"OBJECTIF: {objectif}",
+        f"📊 ANALYSE CALORIQUE PRÉ-CALCULÉE : [{info_calorique}]" # <--- C'est ça qui change tout !
+    ]
+
+    if hasattr(current_user, 'regime_alimentaire') and current_user.regime_alimentaire:
+        profile_parts.append(f"Régime Alimentaire: {current_user.regime_alimentaire}")
+    
+    if hasattr(current_user, 'equipements') and current_user.equipements:
+        profile_parts.append(f"Matériel disponible: {current_user.equipements}")
+    else:
+        profile_parts.append("Matériel: Poids du corps uniquement (par défaut)")
+
+    if hasattr(current_user, 'nb_jours_entrainement') and current_user.nb_jours_entrainement:
+        profile_parts.append(f"Fréquence entraînement: {current_user.nb_jours_entrainement} jours/semaine")
+
+    user_info_str = " | ".join([p for p in profile_parts if p is not None])
+    
+    tools_map = _build_tools(db, current_user)
+
+    backend = get_backend()
+    # Mémoire : résumé + derniers échanges (2 requêtes), pour ne pas refaire les outils à chaque tour
+    user_id = current_user.id_utilisateur
+    resume, past_messages, pending_tokens = hc.load_history(db, user_id)
+    chat = backend.start_chat(_profile_history(user_info_str, resume, past_messages))
+
+    try:
+        content = user_message
+
+        for _ in range(5):
+            # Fin de la transaction (historique, outils) : connexion rendue au pool pendant l'appel
+            db.commit()
+            reply = chat.send(content)
+            text_parts = []
+            for text in reply.stream():
+                text_parts.append(text)
+                yield {"type": "token", "text": text}
+
+            if reply.status == "error":
+                yield {"type": "done", "response": "Erreur API."}
+                return
+            if reply.status == "blocked":
+                yield {"type": "done", "response": "Je ne peux pas répondre pour des raisons de sécurité (filtre déclenché)."}
+                return
+            if reply.status == "empty":
+                yield {"type": "done", "response": "Je n'ai pas réussi à formuler une réponse (Réponse vide du modèle)."}
+                return
+
+            # Un tour peut contenir plusieurs appels d'outils : tous exécutés, réponses renvoyées ensemble
+            calls = reply.calls
+            if calls:
+                for name, args in calls:
+                    print(f"🤖 [IA] Appel outil : {name} {args}")
+                    yield {"type": "tool_call", "name": name, "args": args}
+
+                results = _run_tool_calls(calls, tools_map, current_user)
+
+                for (name, _), res in zip(calls, results):
+                    print(f"✅ [API] Résultat : {str(res)}") 
+                    ok = not (isinstance(res, dict) and any(k.startswith("erreur") for k in res))
+                    yield {"type": "tool_result", "name": name, "ok": ok}
                 
-                response = chat.send_message(genai.protos.Part(function_response={"name": name, "response": res}))
+                content = [(name, res) for (name, _), res in zip(calls, results)]
                 continue
             
-            if part.text:
-                return part.text
+            if text_parts:
+                answer = "".join(text_parts)
+                added = hc.save_turn(db, user_id, user_message, answer)
+                if pending_tokens + added > hc.CHAT_HISTORY_TOKEN_BUDGET:
+                    _schedule_compaction(user_id)
+                yield {"type": "done", "response": answer}
+                return
             
-            return "Action effectuée."
+            yield {"type": "done", "response": "Action effectuée."}
+            return
 
-        return "Trop d'actions."
+        yield {"type": "done", "response": "Trop d'actions."}
 
     except Exception as e:
         print(f"❌ Erreur Chat : {e}")
-        return "Une erreur technique est survenue."
\ No newline at end of file
+        backend.on_error(e)
+        yield {"type": "done", "response": "Une erreur technique est survenue."}
\ No newline at end of file
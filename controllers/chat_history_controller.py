@@ -0,0 +1,137 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, insert, select
+from models import ChatMessage, ChatSummary
+import os
+
+# =============================================================================
+# MÉMOIRE DU COACH (historique par utilisateur, borné en tokens)
+# =============================================================================
+# Chaque tour stocke la question et la réponse finale du coach. L'historique renvoyé au
+# modèle = résumé glissant + derniers messages, dans la limite de CHAT_HISTORY_TOKEN_BUDGET.
+# Au-delà, les plus anciens messages sont résumés (prepare_compaction / apply_compaction) puis supprimés.
+
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "2000"))
+CHAT_HISTORY_MAX_MESSAGES = 40
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximation sans appel réseau (~4 caractères par token)."""
+    return len(text or "") // 4 + 1
+
+
+def _summary_stmt(user_id: int):
+    return select(ChatSummary).where(ChatSummary.id_utilisateur == user_id)
+
+
+def _messages_stmt(user_id: int, after_id: int = 0, limit: int = CHAT_HISTORY_MAX_MESSAGES):
+    """Derniers messages non résumés, du plus récent au plus ancien (index (id_utilisateur, id))."""
+    return (
+        select(ChatMessage)
+        .where(ChatMessage.id_utilisateur == user_id, ChatMessage.id > after_id)
+        .order_by(ChatMessage.id.desc())
+        .limit(limit)
+    )
+
+
+def _fit_budget(summary, newest_first: list, budget: int) -> list:
+    """Garde les messages les plus récents tenant dans le budget ; le premier gardé est une question."""
+    used = summary.nb_tokens if summary else 0
+    kept = []
+    for message in newest_first:
+        if used + message.nb_tokens > budget:
+            break
+        used += message.nb_tokens
+        kept.append(message)
+    kept.reverse()
+    while kept and kept[0].role != "user":
+        kept.pop(0)
+    return kept
+
+
+def load_history(db: Session, user_id: int):
+    """
+    Retourne (résumé ou None, messages à rejouer [ChatMessage], tokens en attente de résumé).
+    Deux requêtes par tour, quel que soit l'historique.
+    """
+    summary = db.scalars(_summary_stmt(user_id)).first()
+    newest_first = db.scalars(_messages_stmt(user_id, summary.id_dernier_message if summary else 0)).all()
+    pending = (summary.nb_tokens if summary else 0) + sum(m.nb_tokens for m in newest_first)
+    return (
+        summary.resume if summary else None,
+        _fit_budget(summary, newest_first, CHAT_HISTORY_TOKEN_BUDGET),
+        pending,
+    )
+
+
+def save_turn(db: Session, user_id: int, question: str, reponse: str) -> int:
+    """Enregistre une paire question / réponse. Retourne le nombre de tokens ajoutés."""
+    rows = [
+        {"id_utilisateur": user_id, "role": "user", "contenu": question, "nb_tokens": estimate_tokens(question)},
+        {"id_utilisateur": user_id, "role": "model", "contenu": reponse, "nb_tokens": estimate_tokens(reponse)},
+    ]
+    db.execute(insert(ChatMessage), rows)
+    db.commit()
+    return sum(r["nb_tokens"] for r in rows)
+
+
+def prepare_compaction(db: Session, user_id: int):
+    """
+    Lecture seule : si l'historique non résumé dépasse le budget, retourne
+    (résumé précédent ou None, messages à résumer, id du résumé lu), sinon None.
+    Les plus récents (la moitié du budget) restent intacts.
+    """
+    summary = db.scalars(_summary_stmt(user_id)).first()
+    after_id = summary.id_dernier_message if summary else 0
+    messages = db.scalars(
+        select(ChatMessage)
+        .where(ChatMessage.id_utilisateur == user_id, ChatMessage.id > after_id)
+        .order_by(ChatMessage.id)
+    ).all()
+    total = (summary.nb_tokens if summary else 0) + sum(m.nb_tokens for m in messages)
+    if total <= CHAT_HISTORY_TOKEN_BUDGET:
+        return None
+
+    # Messages récents conservés tels quels, en partant de la fin, par paires entières
+    keep_tokens, cut = 0, len(messages)
+    while cut >= 2 and keep_tokens + messages[cut - 1].nb_tokens + messages[cut - 2].nb_tokens <= CHAT_HISTORY_TOKEN_BUDGET // 2:
+        keep_tokens += messages[cut - 1].nb_tokens + messages[cut - 2].nb_tokens
+        cut -= 2
+    if cut > 0 and messages[cut - 1].role != "model":
+        cut -= 1
+    old = messages[:cut]
+    if not old:
+        return None
+    return (summary.resume if summary else None), old, after_id
+
+
+def apply_compaction(db: Session, user_id: int, after_id: int, last_id: int, resume: str) -> bool:
+    """
+    Remplace le résumé par `resume` (messages jusqu'à `last_id` inclus) et supprime ces messages.
+    Ignoré si le résumé a changé depuis prepare_compaction (`after_id`). Retourne True si compacté.
+    """
+    summary = db.scalars(_summary_stmt(user_id)).first()
+    if (summary.id_dernier_message if summary else 0) != after_id:
+        return False
+    if summary is None:
+        summary = ChatSummary(id_utilisateur=user_id)
+        db.add(summary)
+    summary.resume = resume
+    summary.nb_tokens = estimate_tokens(resume)
+    summary.id_dernier_message = last_id
+    db.execute(delete(ChatMessage).where(ChatMessage.id_utilisateur == user_id, ChatMessage.id <= last_id))
+    db.commit()
+    return True
+
+
+async def get_history_async(db: AsyncSession, user_id: int, limit: int = 50):
+    """(résumé ou None, derniers messages du plus ancien au plus récent)."""
+    summary = (await db.scalars(_summary_stmt(user_id))).first()
+    newest_first = (await db.scalars(_messages_stmt(user_id, summary.id_dernier_message if summary else 0, limit))).all()
+    return (summary.resume if summary else None), list(reversed(newest_first))
+
+
+async def clear_history_async(db: AsyncSession, user_id: int):
+    await db.execute(delete(ChatMessage).where(ChatMessage.id_utilisateur == user_id))
+    await db.execute(delete(ChatSummary).where(ChatSummary.id_utilisateur == user_id))
+    await db.commit()
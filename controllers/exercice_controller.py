@@ -1,75 +1,496 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import case, delete, exists, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from collections import defaultdict, namedtuple
+from datetime import datetime
+import hashlib
+import json
+import os
 import random
-from models import Exercice, Seance, SeanceExercice
+import threading
+import time
+from models import Exercice, ExerciceMuscle, Muscle, PlanningSeance, Seance, SeanceExercice
 from schemas import ExerciceCreate
+from utils.pagination import decode_cursor, keyset, next_cursor, parse_sort
+from utils.bulk import bulk_insert
+from utils.data_version import data_versions
+from utils.catalog_cache import CatalogCache, Record, catalog_changes
+from utils.exercice_catalog import CatalogExercice, ExerciceCatalog, parse_muscles
+
+# Tris autorisés pour la pagination par curseur (préfixe "-" = décroissant)
+EXERCICE_SORTS = {
+    "id": None,
+    "nom": Exercice.nom_exercice,
+}
+
+def _exercices_stmt(skip: int = 0, limit: int = 100, cursor: str = None, sort: str = "id"):
+    """Keyset si `cursor` est fourni, sinon OFFSET `skip` (compatibilité)."""
+    sort_column, descending = parse_sort(sort, EXERCICE_SORTS)
+    after = decode_cursor(cursor, sort) if cursor else None
+    stmt = keyset(select(Exercice), Exercice.id_exercice, sort_column, descending, after)
+    if after is None and skip:
+        stmt = stmt.offset(skip)
+    return stmt.limit(limit), sort_column
 
 def get_all_exercices(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Exercice).offset(skip).limit(limit).all()
+    stmt, _ = _exercices_stmt(skip, limit)
+    return db.scalars(stmt).all()
+
+async def get_exercices_page_async(db: AsyncSession, limit: int = 100, skip: int = 0, cursor: str = None, sort: str = "id"):
+    """Retourne (exercices, curseur_suivant). Lève InvalidCursor si le curseur / tri est invalide."""
+    stmt, sort_column = _exercices_stmt(skip, limit, cursor, sort)
+    rows = (await db.scalars(stmt)).all()
+    return rows, next_cursor(rows, limit, sort, Exercice.id_exercice, sort_column)
 
 def get_exercice_by_id(db: Session, exercice_id: int):
-    return db.query(Exercice).filter(Exercice.id_exercice == exercice_id).first()
+    return db.get(Exercice, exercice_id)
+
+async def get_exercice_by_id_async(db: AsyncSession, exercice_id: int):
+    return await db.get(Exercice, exercice_id)
+
+def create_exercice(db: Session, exercice: ExerciceCreate):
+    db_exercice = Exercice(**exercice.model_dump())
+    db.add(db_exercice)
+    db.flush()
+    sync_muscles(db, db_exercice.id_exercice, db_exercice.muscle_cible)
+    catalog_changes.record(db, "exercices", [db_exercice.id_exercice])
+    db.commit()
+    data_versions.bump("exercices")
+    db.refresh(db_exercice)
+    _index_exercice(db_exercice)
+    return db_exercice
+
+def update_exercice(db: Session, exercice_id: int, exercice_data: ExerciceCreate):
+    db_exercice = get_exercice_by_id(db, exercice_id)
+    if db_exercice:
+        for field, value in exercice_data.model_dump().items():
+            setattr(db_exercice, field, value)
+        sync_muscles(db, exercice_id, db_exercice.muscle_cible)
+        catalog_changes.record(db, "exercices", [exercice_id])
+        db.commit()
+        data_versions.bump("exercices")
+        _exercice_cache.invalidate([exercice_id])
+        db.refresh(db_exercice)
+        _index_exercice(db_exercice)
+        return db_exercice
+    return None
+
+def delete_exercice(db: Session, exercice_id: int):
+    db_exercice = get_exercice_by_id(db, exercice_id)
+    if db_exercice:
+        # Les séances existantes ne doivent plus référencer l'exercice ; les modèles partagés
+        # changent de contenu, donc de signature
+        seance_ids = db.scalars(
+            select(SeanceExercice.id_seance).where(SeanceExercice.id_exercice == exercice_id).distinct()
+        ).all()
+        db.query(SeanceExercice).filter(SeanceExercice.id_exercice == exercice_id).delete()
+        user_ids = _resign_seances(db, seance_ids)
+        db.execute(delete(ExerciceMuscle).where(ExerciceMuscle.id_exercice == exercice_id))
+        db.delete(db_exercice)
+        catalog_changes.record(db, "exercices", [exercice_id])
+        db.commit()
+        data_versions.bump("exercices")
+        for user_id in user_ids:
+            data_versions.bump(f"planning:{user_id}")
+        _exercice_cache.invalidate([exercice_id])
+        if _catalog is not None:
+            _catalog.remove(exercice_id)
+        return True
+    return False
+
+# =============================================================================
+# MUSCLES (tables Muscle / ExerciceMuscle, tenues à jour à chaque écriture d'exercice)
+# =============================================================================
+# Exercice.muscle_cible reste le texte libre exposé par l'API ; ExerciceMuscle en est la
+# forme normalisée (parse_muscles), qui alimente le catalogue en mémoire.
+
+
+def _muscle_ids(db: Session, names: list) -> list:
+    """id des muscles `names` (déjà normalisés), en créant ceux qui n'existent pas encore."""
+    if not names:
+        return []
+    existing = dict(db.execute(select(Muscle.nom, Muscle.id_muscle).where(Muscle.nom.in_(names))).all())
+    missing = [n for n in names if n not in existing]
+    if missing:
+        db.execute(insert(Muscle), [{"nom": n} for n in missing])
+        existing.update(db.execute(select(Muscle.nom, Muscle.id_muscle).where(Muscle.nom.in_(missing))).all())
+    return [existing[n] for n in names if n in existing]
+
+
+def sync_muscles(db: Session, exercice_id: int, muscle_cible):
+    """Remplace les liens ExerciceMuscle de l'exercice (dans la transaction en cours)."""
+    db.execute(delete(ExerciceMuscle).where(ExerciceMuscle.id_exercice == exercice_id))
+    ids = _muscle_ids(db, parse_muscles(muscle_cible))
+    if ids:
+        db.execute(insert(ExerciceMuscle), [{"id_exercice": exercice_id, "id_muscle": i} for i in ids])
+
+# =============================================================================
+# CATALOGUE INDEXÉ (muscle / type / matériel, en mémoire par worker)
+# =============================================================================
+# Cycle de vie commun aux structures du catalogue : voir utils/catalog_cache.py.
+# Construction : deux requêtes ; reconstruit après EXERCICE_CATALOG_TTL_SECONDS.
+
+EXERCICE_CATALOG_TTL = float(os.getenv("EXERCICE_CATALOG_TTL_SECONDS", "300"))
+
+_catalog = None
+_catalog_lock = threading.Lock()
+_catalog_pending = set()  # exercices modifiés par un autre worker, à recharger
+_catalog_pending_lock = threading.Lock()
+
+
+def _catalog_entry(id_exercice, nom_exercice, type_exercice, materiel, muscle_cible, muscles) -> CatalogExercice:
+    return CatalogExercice(id_exercice, nom_exercice, type_exercice, materiel, muscle_cible, tuple(sorted(muscles)))
+
+
+def _index_exercice(db_exercice):
+    if _catalog is not None:
+        _catalog.add(_catalog_entry(
+            db_exercice.id_exercice, db_exercice.nom_exercice, db_exercice.type_exercice,
+            db_exercice.materiel, db_exercice.muscle_cible, parse_muscles(db_exercice.muscle_cible),
+        ))
+
+
+def _catalog_entries(db: Session, ids: list = None) -> list:
+    muscles_stmt = select(ExerciceMuscle.id_exercice, Muscle.nom).join(Muscle, Muscle.id_muscle == ExerciceMuscle.id_muscle)
+    rows_stmt = select(
+        Exercice.id_exercice, Exercice.nom_exercice, Exercice.type_exercice, Exercice.materiel, Exercice.muscle_cible,
+    )
+    if ids is not None:
+        muscles_stmt = muscles_stmt.where(ExerciceMuscle.id_exercice.in_(ids))
+        rows_stmt = rows_stmt.where(Exercice.id_exercice.in_(ids))
+    muscles = {}
+    for id_exercice, nom in db.execute(muscles_stmt):
+        muscles.setdefault(id_exercice, []).append(nom)
+    return [_catalog_entry(*row, muscles.get(row.id_exercice, ())) for row in db.execute(rows_stmt)]
+
+
+def _take_catalog_pending() -> list:
+    with _catalog_pending_lock:
+        ids = list(_catalog_pending)
+        _catalog_pending.clear()
+    return ids
+
+
+def _catalog_is_stale() -> bool:
+    return _catalog is None or time.monotonic() - _catalog.built_at > EXERCICE_CATALOG_TTL
+
+
+def get_catalog(db: Session, refresh: bool = False) -> ExerciceCatalog:
+    """Catalogue du worker ; refresh=True le recharge depuis la base (ex. génération en lot)."""
+    global _catalog
+    catalog_changes.sync(db)
+    if refresh or _catalog_is_stale() or _catalog_pending:
+        with _catalog_lock:
+            if refresh or _catalog_is_stale():
+                _take_catalog_pending()  # la reconstruction lit l'état courant
+                _catalog = ExerciceCatalog(_catalog_entries(db))
+            else:
+                ids = _take_catalog_pending()
+                entries = _catalog_entries(db, ids) if ids else []
+                for entry in entries:
+                    _catalog.add(entry)
+                for id_exercice in set(ids) - {e.id_exercice for e in entries}:
+                    _catalog.remove(id_exercice)
+    return _catalog
+
+
+def get_catalog_stats() -> dict:
+    if _catalog is None:
+        return {"loaded": False}
+    return {
+        "loaded": True,
+        "exercices": len(_catalog),
+        "muscles": len(_catalog.muscles()),
+        "age_seconds": round(time.monotonic() - _catalog.built_at, 1),
+        "ttl_seconds": EXERCICE_CATALOG_TTL,
+    }
+
+# =============================================================================
+# CACHE DU CATALOGUE (exercices en lecture seule, par worker)
+# =============================================================================
+# GET /exercices/{id} servi depuis la mémoire ; invalidé par le journal CatalogChange.
+
+class ExerciceRecord(Record):
+    __slots__ = (
+        "id_exercice", "nom_exercice", "description_exercice", "type_exercice",
+        "image_path", "muscle_cible", "materiel", "updated_at",
+    )
+
+
+_exercice_cache = CatalogCache("exercices")
+
+
+def _exercice_records_stmt(ids: list):
+    return select(Exercice).where(Exercice.id_exercice.in_(ids))
+
+
+def get_exercices_cached(db: Session, ids: list) -> list:
+    """Exercices `ids` dans l'ordre (les inexistants sont ignorés), en lecture seule."""
+    catalog_changes.sync(db)
+    found, missing, token = _exercice_cache.lookup(ids)
+    if missing:
+        loaded = {e.id_exercice: ExerciceRecord.from_row(e) for e in db.scalars(_exercice_records_stmt(missing))}
+        _exercice_cache.put(loaded, token)
+        found.update(loaded)
+    return [found[i] for i in ids if i in found]
+
+
+async def get_exercice_cached_async(db: AsyncSession, exercice_id: int):
+    await catalog_changes.sync_async(db)
+    found, missing, token = _exercice_cache.lookup([exercice_id])
+    if missing:
+        loaded = {e.id_exercice: ExerciceRecord.from_row(e) for e in (await db.scalars(_exercice_records_stmt(missing)))}
+        _exercice_cache.put(loaded, token)
+        found.update(loaded)
+    return found.get(exercice_id)
+
+
+def get_exercice_cache_stats() -> dict:
+    return _exercice_cache.stats()
+
+
+def _on_exercices_changed(ids):
+    """Exercices modifiés par un autre worker (ids=None : tous)."""
+    global _catalog
+    _exercice_cache.invalidate(ids)
+    data_versions.bump("exercices")
+    if ids is None:
+        _catalog = None
+    else:
+        with _catalog_pending_lock:
+            _catalog_pending.update(ids)
+
+
+catalog_changes.subscribe("exercices", _on_exercices_changed)
 
 # =============================================================================
 # GÉNÉRATEUR SÉANCE (Aligné sur vos colonnes BDD)
 # =============================================================================
-def generate_seance_relational(db: Session, nom_seance: str, focus: str, materiel_user: str):
-    
-    # 1. Sélection Matériel & Exercices ( inchangé )
-    allowed_materials = ["poids_du_corps"]
+SEANCE_FOCUS_KEYWORDS = {
+    "full_body": ["force", "cardio", "polyarticulaire"],
+    "upper": ["pectoraux", "dos", "epaules", "bras", "biceps", "triceps"],
+    "lower": ["jambes", "quadriceps", "ischios", "fessiers", "mollets"],
+    "push": ["pectoraux", "epaules", "triceps", "pompes"],
+    "pull": ["dos", "biceps", "tractions"],
+    "cardio": ["cardio"]
+}
+SEANCE_NB_EXERCICES = 5
+SEANCE_DUREE = 45
+
+
+def allowed_materials(materiel_user: str) -> list:
+    allowed = ["poids_du_corps"]
     mat_str = str(materiel_user).lower() if materiel_user else ""
-    if "haltere" in mat_str or "maison" in mat_str: allowed_materials.append("materiel_maison")
-    if "salle" in mat_str or "gym" in mat_str: allowed_materials.extend(["materiel_maison", "salle_de_sport"])
-
-    all_exos = db.query(Exercice).filter(Exercice.materiel.in_(allowed_materials)).all()
-    
-    candidates = []
-    keywords = {
-        "full_body": ["force", "cardio", "polyarticulaire"],
-        "upper": ["pectoraux", "dos", "epaules", "bras", "biceps", "triceps"],
-        "lower": ["jambes", "quadriceps", "ischios", "fessiers", "mollets"],
-        "push": ["pectoraux", "epaules", "triceps", "pompes"],
-        "pull": ["dos", "biceps", "tractions"],
-        "cardio": ["cardio"]
-    }
-    target_tags = keywords.get(focus, ["force"])
-
-    for exo in all_exos:
-        if focus == "full_body":
-            candidates.append(exo)
-        else:
-            if exo.muscle_cible and any(tag in str(exo.muscle_cible).lower() for tag in target_tags):
-                candidates.append(exo)
-    
-    if not candidates: candidates = all_exos
-
-    selected = []
-    if candidates:
-        random.shuffle(candidates)
-        selected = candidates[:5]
-
-    # 2. CRÉATION SÉANCE (Uniquement : nom, duree, id_calendrier)
-    new_seance = Seance(
-        nom=nom_seance,     
-        duree=45,           
-        id_calendrier=None  
+    if "haltere" in mat_str or "maison" in mat_str: allowed.append("materiel_maison")
+    if "salle" in mat_str or "gym" in mat_str: allowed.extend(["materiel_maison", "salle_de_sport"])
+    return allowed
+
+
+def focus_candidates(catalog: ExerciceCatalog, focus: str, materials) -> tuple:
+    """Exercices d'un focus réalisables avec `materials`, triés par id (tout le matériel si aucun ne cible le focus)."""
+    if focus == "full_body":
+        return catalog.select(materials)
+    return catalog.select(materials, muscles=SEANCE_FOCUS_KEYWORDS.get(focus, ["force"])) or catalog.select(materials)
+
+
+def pick_exercices(catalog: ExerciceCatalog, focus: str, materials, rng=random) -> list:
+    """Choix des exercices d'une séance, en mémoire (aucune requête)."""
+    candidates = focus_candidates(catalog, focus, materials)
+    # Même tirage qu'un mélange complet suivi des 5 premiers, sans mélanger tout le catalogue
+    return rng.sample(candidates, min(SEANCE_NB_EXERCICES, len(candidates)))
+
+
+# =============================================================================
+# MODÈLES DE SÉANCE (adressés par leur contenu)
+# =============================================================================
+# Une séance générée est entièrement définie par son contenu (nom, durée, exercices) :
+# Seance.signature = sha256 de ce contenu, unique. Même contenu -> même ligne Seance,
+# partagée par tous les plannings qui la programment. Par (focus, matériel), au plus
+# SEANCE_VARIANTS variantes déterministes : la table ne grandit plus avec
+# utilisateurs x semaines x jours, seulement avec le catalogue.
+
+SEANCE_VARIANTS = int(os.getenv("SEANCE_VARIANTS", "8"))
+SEANCE_SERIES, SEANCE_REPETITIONS, SEANCE_RECUPERATION = 4, 12, 60
+
+SeanceTemplate = namedtuple("SeanceTemplate", "signature nom duree exercices")
+
+
+def seance_signature(nom: str, duree, exercices) -> str:
+    """exercices : [(id_exercice, series, repetitions, temps_recuperation)] ; l'ordre n'entre pas en compte."""
+    # Les anciennes lignes peuvent contenir des NULL : tri sans comparer None à un entier
+    rows = sorted((list(e) for e in exercices), key=lambda e: [(v is None, v or 0) for v in e])
+    canonical = json.dumps([nom, duree, rows], separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def build_template(nom: str, selected: list) -> SeanceTemplate:
+    exercices = tuple(sorted(
+        (exo.id_exercice, SEANCE_SERIES, SEANCE_REPETITIONS, SEANCE_RECUPERATION) for exo in selected
+    ))
+    return SeanceTemplate(seance_signature(nom, SEANCE_DUREE, exercices), nom, SEANCE_DUREE, exercices)
+
+
+def pick_variant(catalog: ExerciceCatalog, focus: str, materials, variant: int) -> list:
+    """
+    Variante n° `variant` des séances `focus` pour ce matériel : tirage déterministe (même
+    catalogue -> même séance).
+    """
+    return pick_exercices(catalog, focus, materials, random.Random(f"{focus}|{','.join(materials)}|{variant}"))
+
+
+def _template_rows(id_seance: int, template: SeanceTemplate) -> list:
+    return [
+        {
+            "id_seance": id_seance,
+            "id_exercice": id_exercice,
+            "ordre": ordre,
+            "series": series,
+            "repetitions": repetitions,
+            "temps_recuperation": recuperation,
+        }
+        for ordre, (id_exercice, series, repetitions, recuperation) in enumerate(template.exercices, start=1)
+    ]
+
+
+def _seance_ids_by_signature(db: Session, signatures) -> dict:
+    return dict(db.execute(
+        select(Seance.signature, Seance.id_seance).where(Seance.signature.in_(signatures))
+    ).all())
+
+
+def get_or_create_seances(db: Session, templates: list) -> list:
+    """
+    Ids des séances correspondant aux modèles, dans l'ordre : une requête si toutes existent,
+    sinon un INSERT par table pour celles qui manquent et une relecture de leurs ids (sans commit).
+    Une séance créée au même moment par un autre worker (index unique) est relue au lieu d'être
+    dupliquée.
+    """
+    if not templates:
+        return []
+    signatures = {t.signature for t in templates}
+    for attempt in range(3):
+        ids = _seance_ids_by_signature(db, signatures)
+        missing = list({t.signature: t for t in templates if t.signature not in ids}.values())
+        if not missing:
+            break
+        try:
+            with db.begin_nested():
+                bulk_insert(db, Seance, [
+                    {"nom": t.nom, "duree": t.duree, "id_calendrier": None, "signature": t.signature}
+                    for t in missing
+                ])
+                # Ids relus par signature (index unique) : rien ne garantit qu'ils soient consécutifs
+                new_ids = _seance_ids_by_signature(db, [t.signature for t in missing])
+                bulk_insert(db, SeanceExercice, [
+                    row for t in missing for row in _template_rows(new_ids[t.signature], t)
+                ])
+            ids.update(new_ids)
+            break
+        except IntegrityError:
+            if attempt == 2:
+                raise
+    return [ids[t.signature] for t in templates]
+
+
+def generate_seance_relational(db: Session, nom_seance: str, focus: str, materiel_user: str):
+    """
+    Séance `focus` adaptée au matériel (une variante au hasard), réutilisée si elle existe déjà.
+    Ne valide pas la transaction : c'est à l'appelant de faire db.commit().
+    """
+    materials = allowed_materials(materiel_user)
+    selected = pick_variant(get_catalog(db), focus, materials, random.randrange(SEANCE_VARIANTS))
+    id_seance, = get_or_create_seances(db, [build_template(nom_seance, selected)])
+    return db.get(Seance, id_seance)
+
+
+async def get_seance_detail_async(db: AsyncSession, seance_id: int):
+    """Séance avec ses exercices dans l'ordre (SeanceExercice + Exercice) : 3 requêtes IN (...)."""
+    stmt = (
+        select(Seance)
+        .where(Seance.id_seance == seance_id)
+        .options(selectinload(Seance.exercices).selectinload(SeanceExercice.exercice))
+    )
+    return (await db.scalars(stmt)).first()
+
+
+def _resign_seances(db: Session, seance_ids: list) -> list:
+    """
+    Recalcule la signature des modèles `seance_ids` dont le contenu vient de changer (sans commit).
+    Un modèle devenu identique à un autre est fusionné sur celui-ci : ses plannings sont redirigés,
+    lui-même supprimé. Retourne les utilisateurs dont un planning référence ces séances.
+    """
+    if not seance_ids:
+        return []
+    plannings = PlanningSeance.id_seance.in_(seance_ids)
+    user_ids = db.scalars(select(PlanningSeance.id_utilisateur).where(plannings).distinct()).all()
+    seances = db.execute(
+        select(Seance.id_seance, Seance.nom, Seance.duree)
+        .where(Seance.id_seance.in_(seance_ids), Seance.signature.isnot(None))
+        .order_by(Seance.id_seance)
+    ).all()
+    if seances:
+        signed = [s.id_seance for s in seances]
+        # Anciennes signatures libérées d'abord : deux modèles peuvent échanger leur contenu
+        db.execute(update(Seance).where(Seance.id_seance.in_(signed)).values(signature=None))
+        exercices = defaultdict(list)
+        for row in db.execute(
+            select(
+                SeanceExercice.id_seance, SeanceExercice.id_exercice, SeanceExercice.series,
+                SeanceExercice.repetitions, SeanceExercice.temps_recuperation,
+            ).where(SeanceExercice.id_seance.in_(signed))
+        ):
+            exercices[row.id_seance].append((row.id_exercice, row.series, row.repetitions, row.temps_recuperation))
+
+        signatures = {s.id_seance: seance_signature(s.nom, s.duree, exercices[s.id_seance]) for s in seances}
+        by_signature = _seance_ids_by_signature(db, set(signatures.values()))
+        canonical, duplicates = {}, {}
+        for id_seance, signature in signatures.items():
+            if signature in by_signature:
+                duplicates[id_seance] = by_signature[signature]
+            else:
+                by_signature[signature] = id_seance
+                canonical[id_seance] = signature
+        if duplicates:
+            db.execute(
+                update(PlanningSeance)
+                .where(PlanningSeance.id_seance.in_(list(duplicates)))
+                .values(id_seance=case(duplicates, value=PlanningSeance.id_seance))
+            )
+            db.execute(delete(SeanceExercice).where(SeanceExercice.id_seance.in_(list(duplicates))))
+            db.execute(delete(Seance).where(Seance.id_seance.in_(list(duplicates))))
+        if canonical:
+            db.execute(
+                update(Seance)
+                .where(Seance.id_seance.in_(list(canonical)))
+                .values(signature=case(canonical, value=Seance.id_seance))
+            )
+        seance_ids = list(canonical) + list(set(duplicates.values())) + [i for i in seance_ids if i not in signatures]
+    # Contenu des séances modifié : version (ETag, ?expand=seance) des plannings qui les programment
+    db.execute(
+        update(PlanningSeance)
+        .where(PlanningSeance.id_seance.in_(seance_ids))
+        .values(updated_at=datetime.utcnow())
+    )
+    return user_ids
+
+
+def gc_orphan_seances(db: Session, batch_size: int = 1000) -> int:
+    """
+    Supprime les modèles de séance (signés) que plus aucun planning ne référence, avec leurs
+    exercices. À lancer hors des heures de génération (manage_db.py gc-seances). Retourne le nombre supprimé.
+    """
+    orphans = (
+        select(Seance.id_seance)
+        .where(Seance.signature.isnot(None), ~exists().where(PlanningSeance.id_seance == Seance.id_seance))
+        .limit(batch_size)
     )
-    db.add(new_seance)
-    db.commit()      
-    db.refresh(new_seance)
-
-    # 3. CRÉATION LIENS
-    ordre = 1
-    for exo in selected:
-        liaison = SeanceExercice(
-            id_seance=new_seance.id_seance,
-            id_exercice=exo.id_exercice,
-            ordre=ordre,
-            series=4,
-            repetitions=12,
-            temps_recuperation=60
-        )
-        db.add(liaison)
-        ordre += 1
-
-    db.commit() 
-    return new_seance
\ No newline at end of file
+    total = 0
+    while True:
+        ids = db.scalars(orphans).all()
+        if not ids:
+            return total
+        db.execute(delete(SeanceExercice).where(SeanceExercice.id_seance.in_(ids)))
+        db.execute(delete(Seance).where(Seance.id_seance.in_(ids)))
+        db.commit()
+        total += len(ids)
@@ -1,7 +1,9 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from models import Favoris, Recette
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, select
+from models import Favoris
 from schemas import FavoriteCreate
+from controllers import recette_controller as rc
 
 def add_favorite(db: Session, user_id: int, recette_id: int):
     """Ajoute une recette aux favoris de l'utilisateur."""
@@ -17,8 +19,7 @@ def add_favorite(db: Session, user_id: int, recette_id: int):
         return existing
         
     # Vérifier si la recette existe
-    recette = db.query(Recette).filter(Recette.id_recette == recette_id).first()
-    if not recette:
+    if rc.get_recette_cached(db, recette_id) is None:
         return None
 
     new_fav = Favoris(id_utilisateur=user_id, id_recette=recette_id)
@@ -42,7 +43,13 @@ def remove_favorite(db: Session, user_id: int, recette_id: int):
         return True
     return False
 
+def _favorites_stmt(user_id: int):
+    # Seuls les id sont lus : les recettes viennent du cache du catalogue
+    return select(Favoris.id_recette).where(Favoris.id_utilisateur == user_id)
+
 def get_user_favorites(db: Session, user_id: int):
     """Récupère la liste des recettes favorites d'un utilisateur."""
-    # On fait une jointure pour récupérer directement les objets Recette
-    return db.query(Recette).join(Favoris).filter(Favoris.id_utilisateur == user_id).all()
+    return rc.get_recettes_cached(db, db.scalars(_favorites_stmt(user_id)).all())
+
+async def get_user_favorites_async(db: AsyncSession, user_id: int):
+    return await rc.get_recettes_cached_async(db, (await db.scalars(_favorites_stmt(user_id))).all())
@@ -1,11 +1,22 @@
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta, time
+from sqlalchemy import select
+from datetime import date, datetime, timedelta, time
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from time import perf_counter
+import os
 import random
 
-from models import Utilisateur, PlanningRepas, PlanningSeance, Recette, Seance
+from database import SessionLocal, get_engine
+from models import Utilisateur, Recette, PlanningRepas, PlanningSeance
+from schemas import RecetteFilters
+from controllers import recette_controller as rc
+from controllers import exercice_controller as ec
+from utils.bulk import bulk_insert
+from utils.data_version import data_versions
 from utils.health_formulas import calculate_bmr, calculate_tdee, calculate_target_calories
-# Import du générateur de séance corrigé
-from controllers.exercice_controller import generate_seance_relational
 
 # --- LOGIQUE DU SPLIT (Pattern d'entraînement) ---
 def determine_split(freq_entrainement: int):
@@ -29,24 +40,82 @@ def determine_split(freq_entrainement: int):
 # GÉNÉRATION DU PLANNING HEBDOMADAIRE
 # =============================================================================
 
+# Créneaux fixes : le nettoyage de la semaine libère toujours midi avant l'insertion
+HORAIRES_REPAS = {"Dejeuner": time(12, 0, 0), "Diner": time(19, 0, 0)}
+
+
+def training_days(freq: int) -> list:
+    """Indices des jours d'entraînement dans la semaine (0 = premier jour)."""
+    if freq == 1: return [2] # Mercredi
+    if freq == 2: return [1, 4] # Mardi, Vendredi
+    if freq == 3: return [0, 2, 4] # Lundi, Mercredi, Vendredi
+    if freq == 4: return [0, 1, 3, 4] # Lun, Mar, Jeu, Ven
+    if freq >= 5: return [0, 1, 2, 3, 4] # Lun -> Ven
+    return []
+
+
+def compute_meal_rows(user_id: int, start_date_only, recette_ids: list) -> list:
+    """Lignes PlanningRepas de la semaine (2 repas par jour), calculées en mémoire."""
+    tirage = iter(recette_ids)
+    return [
+        {
+            "id_utilisateur": user_id,
+            "id_recette": next(tirage),
+            "jour": start_date_only + timedelta(days=i),
+            "repas": type_repas,
+            "heure_debut": heure,
+            "notes": "",
+        }
+        for i in range(7)
+        for type_repas, heure in HORAIRES_REPAS.items()
+    ]
+
+
+def compute_seances(start_date_only, freq: int, catalog, materials, rng=random) -> list:
+    """
+    [(jour, focus, modèle de séance)] de la semaine, calculés en mémoire. Chaque jour reçoit
+    une variante différente (deux séances "upper" de la même semaine ne sont pas identiques).
+    """
+    pattern = determine_split(freq) # ex: ['push', 'pull', 'lower']
+    days = training_days(freq)
+    if len(days) <= ec.SEANCE_VARIANTS:
+        variants = rng.sample(range(ec.SEANCE_VARIANTS), len(days))
+    else:
+        variants = [rng.randrange(ec.SEANCE_VARIANTS) for _ in days]
+    seances = []
+    for pattern_index, (i, variant) in enumerate(zip(days, variants)):
+        # Choix du focus du jour dans le pattern cyclique
+        current_focus = pattern[pattern_index] if pattern_index < len(pattern) else "full_body"
+        selected = ec.pick_variant(catalog, current_focus, materials, variant)
+        template = ec.build_template(f"Séance {current_focus.capitalize()}", selected)
+        seances.append((start_date_only + timedelta(days=i), current_focus, template))
+    return seances
+
+
+def meal_target_calories(poids_kg, taille_cm, age, sexe, objectif) -> float:
+    """Cible d'un repas principal (35 % de la cible journalière) ; 600 kcal si le calcul échoue."""
+    try:
+        poids = float(poids_kg) if poids_kg else 70.0
+        taille = float(taille_cm) if taille_cm else 175.0
+        bmr = calculate_bmr(poids, taille, age or 30, sexe or "masculin")
+        tdee = calculate_tdee(bmr, "sedentaire")
+        daily = calculate_target_calories(tdee, objectif or "maintien")
+        return daily * 0.35 # 35% pour un repas principal
+    except Exception:
+        return 600
+
+
 def generate_weekly_plan(db: Session, user_id: int, start_date: datetime, include_meals: bool = True, include_sport: bool = True):
-    print(f"🔧 DEBUG: Démarrage génération pour User {user_id}")
-    
-    # 1. Vérification Utilisateur
-    user = db.query(Utilisateur).filter(Utilisateur.id_utilisateur == user_id).first()
+    """
+    Tout est calculé en mémoire, puis écrit en une transaction : un DELETE par table
+    nettoyée et un INSERT à valeurs multiples par table remplie.
+    """
+    # 1. Vérification Utilisateur (déjà dans la session quand il vient de l'authentification)
+    user = db.get(Utilisateur, user_id)
     if not user: return {"erreur": "Utilisateur introuvable"}
 
     # 2. Calculs Caloriques (Pour les repas)
-    target_meal_cal = 600
-    try:
-        if include_meals:
-            poids = float(user.poids_kg) if user.poids_kg else 70.0
-            taille = float(user.taille_cm) if user.taille_cm else 175.0
-            bmr = calculate_bmr(poids, taille, user.age or 30, user.sexe or "masculin")
-            tdee = calculate_tdee(bmr, "sedentaire")
-            daily = calculate_target_calories(tdee, user.objectif or "maintien")
-            target_meal_cal = daily * 0.35 # 35% pour un repas principal
-    except: pass
+    target_meal_cal = meal_target_calories(user.poids_kg, user.taille_cm, user.age, user.sexe, user.objectif)
 
     # Gestion des dates (Conversion en date simple pour SQL)
     start_date_only = start_date.date()
@@ -54,126 +123,59 @@ def generate_weekly_plan(db: Session, user_id: int, start_date: datetime, includ
     
     plan_summary = []
 
-    # =========================================================================
-    # A. GESTION DES REPAS (INTELLIGENTE 12h / 19h)
-    # =========================================================================
-    if include_meals:
-        # Nettoyage préalable des repas sur la période
-        db.query(PlanningRepas).filter(
-            PlanningRepas.id_utilisateur == user_id, 
-            PlanningRepas.jour >= start_date_only, 
-            PlanningRepas.jour < end_date_only
-        ).delete()
-        db.flush() 
-
-        # Récupération Recettes
-        all_recipes = db.query(Recette).all()
-        
-        if all_recipes:
-            # Filtrage par calories (+/- 300kcal)
-            suitable = [r for r in all_recipes if r.calories and (target_meal_cal - 300 <= float(r.calories) <= target_meal_cal + 300)]
-            if not suitable: suitable = all_recipes
-            
-            for i in range(7):
-                current_day_date = start_date_only + timedelta(days=i)
-
-                for type_repas in ["Dejeuner", "Diner"]:
-                    recette = random.choice(suitable)
-                    if recette.id_recette is None: continue
-                    
-                    # --- LOGIQUE HORAIRE ---
-                    heure_cible = time(12, 0, 0) # Midi par défaut
-                    
-                    # On vérifie si midi est déjà pris ce jour-là
-                    existe_midi = db.query(PlanningRepas).filter(
-                        PlanningRepas.id_utilisateur == user_id,
-                        PlanningRepas.jour == current_day_date, 
-                        PlanningRepas.heure_debut == time(12, 0, 0)
-                    ).first()
-
-                    # Si midi est pris OU si c'est explicitement le Diner -> 19h
-                    if existe_midi or type_repas == "Diner":
-                        heure_cible = time(19, 0, 0)
-                    
-                    new_meal = PlanningRepas(
-                        id_utilisateur=user_id,
-                        id_recette=recette.id_recette,
-                        jour=current_day_date, 
-                        repas=type_repas, 
-                        heure_debut=heure_cible,
-                        notes=""
-                    )
-                    db.add(new_meal)
-                    db.flush() # Important pour que la boucle suivante voie ce repas
-            
-            plan_summary.append("Repas générés avec horaires (12h/19h).")
-        else:
-            plan_summary.append("Aucune recette en base.")
-
-    # =========================================================================
-    # B. GESTION DU SPORT (LOGIQUE INTELLIGENTE SPLIT/PATTERN)
-    # =========================================================================
-    if include_sport:
-        # 1. Nettoyage des séances sur la période
-        db.query(PlanningSeance).filter(
-            PlanningSeance.id_utilisateur == user_id, 
-            PlanningSeance.jour >= start_date_only, 
-            PlanningSeance.jour < end_date_only
-        ).delete()
-        
-        # 2. Définition du Pattern selon la fréquence
-        freq = getattr(user, 'nb_jours_entrainement', 3) or 3
-        pattern = determine_split(freq) # ex: ['push', 'pull', 'lower']
-        
-        materiel_user = getattr(user, 'equipements', "poids_du_corps")
-        
-        # Calcul des jours d'entraînement (Répartition)
-        jours_indices = []
-        if freq == 1: jours_indices = [2] # Mercredi
-        elif freq == 2: jours_indices = [1, 4] # Mardi, Vendredi
-        elif freq == 3: jours_indices = [0, 2, 4] # Lundi, Mercredi, Vendredi
-        elif freq == 4: jours_indices = [0, 1, 3, 4] # Lun, Mar, Jeu, Ven
-        elif freq >= 5: jours_indices = [0, 1, 2, 3, 4] # Lun -> Ven
-        
-        pattern_index = 0
-
-        for i in range(7):
-            if i in jours_indices:
-                current_day_date = start_date_only + timedelta(days=i)
-                
-                # Choix du focus du jour dans le pattern cyclique
-                if pattern_index < len(pattern):
-                    current_focus = pattern[pattern_index]
-                    pattern_index += 1
-                else:
-                    current_focus = "full_body" # Sécurité
-
-                nom_seance = f"Séance {current_focus.capitalize()}"
-                
-                # 3. CRÉATION DE LA SÉANCE (Appel 4 arguments : db, nom, focus, materiel)
-                # Note: On ne passe PLUS user_id ici car la séance est générique
-                nouvelle_seance = generate_seance_relational(
-                    db, 
-                    nom_seance, 
-                    current_focus, 
-                    str(materiel_user)
-                )
-                
-                # 4. INSERTION DANS LE PLANNING (Le lien User <-> Séance se fait ici)
-                new_planning = PlanningSeance(
-                    id_utilisateur=user_id,
-                    id_seance=nouvelle_seance.id_seance, # On récupère l'ID de la séance créée
-                    jour=current_day_date,
-                    est_realise=False,
-                    notes=f"Objectif: {current_focus}"
-                )
-                db.add(new_planning)
-                
-        plan_summary.append(f"Sport planifié : {freq} séances ({', '.join(pattern)}).")
-        db.flush()
-
     try:
+        # =====================================================================
+        # A. REPAS (12h / 19h)
+        # =====================================================================
+        if include_meals:
+            db.query(PlanningRepas).filter(
+                PlanningRepas.id_utilisateur == user_id, 
+                PlanningRepas.jour >= start_date_only, 
+                PlanningRepas.jour < end_date_only
+            ).delete(synchronize_session=False)
+
+            # Tirage des 14 recettes en base (+/- 300kcal), sans charger toute la table
+            nb_repas = 7 * len(HORAIRES_REPAS)
+            window = RecetteFilters(cal_min=int(target_meal_cal - 300), cal_max=int(target_meal_cal + 300))
+            tirage = rc.sample_recette_ids(db, nb_repas, window, replace=True) or rc.sample_recette_ids(db, nb_repas, replace=True)
+
+            if tirage:
+                bulk_insert(db, PlanningRepas, compute_meal_rows(user_id, start_date_only, tirage))
+                plan_summary.append("Repas générés avec horaires (12h/19h).")
+            else:
+                plan_summary.append("Aucune recette en base.")
+
+        # =====================================================================
+        # B. SPORT (LOGIQUE SPLIT/PATTERN)
+        # =====================================================================
+        if include_sport:
+            db.query(PlanningSeance).filter(
+                PlanningSeance.id_utilisateur == user_id, 
+                PlanningSeance.jour >= start_date_only, 
+                PlanningSeance.jour < end_date_only
+            ).delete(synchronize_session=False)
+
+            # Fréquence -> pattern ; les séances sont génériques, le lien User <-> Séance est PlanningSeance
+            freq = getattr(user, 'nb_jours_entrainement', 3) or 3
+            materiel_user = str(getattr(user, 'equipements', "poids_du_corps"))
+            seances = compute_seances(start_date_only, freq, ec.get_catalog(db), ec.allowed_materials(materiel_user))
+
+            # Modèles déjà en base réutilisés (une requête) ; seuls les nouveaux sont insérés
+            seance_ids = ec.get_or_create_seances(db, [template for _, _, template in seances])
+            bulk_insert(db, PlanningSeance, [
+                {
+                    "id_utilisateur": user_id,
+                    "id_seance": id_seance,
+                    "jour": jour,
+                    "est_realise": False,
+                    "notes": f"Objectif: {focus}",
+                }
+                for id_seance, (jour, focus, _) in zip(seance_ids, seances)
+            ])
+            plan_summary.append(f"Sport planifié : {freq} séances ({', '.join(determine_split(freq))}).")
+
         db.commit()
+        data_versions.bump(f"planning:{user_id}")
         return {"status": "succes", "message": "Planning généré.", "details": plan_summary}
     except Exception as e:
         db.rollback()
@@ -198,7 +200,9 @@ def update_meal_planning(db: Session, id_planning: int, new_recette_id: int):
     entry = db.query(PlanningRepas).filter(PlanningRepas.id_planning_repas == id_planning).first()
     if entry:
         entry.id_recette = new_recette_id
+        user_id = entry.id_utilisateur
         db.commit()
+        data_versions.bump(f"planning:{user_id}")
         return True
     return False
 
@@ -206,6 +210,200 @@ def update_seance_planning(db: Session, id_planning: int, new_seance_id: int):
     entry = db.query(PlanningSeance).filter(PlanningSeance.id_planning_seance == id_planning).first()
     if entry:
         entry.id_seance = new_seance_id
+        user_id = entry.id_utilisateur
         db.commit()
+        data_versions.bump(f"planning:{user_id}")
         return True
-    return False
\ No newline at end of file
+    return False
+# =============================================================================
+# 3. GÉNÉRATION EN MASSE (RAFRAÎCHISSEMENT HEBDOMADAIRE)
+# =============================================================================
+# Catalogues (recettes, exercices) et profils chargés une fois ; cibles, repas et séances
+# calculés en mémoire ; écriture par lots d'utilisateurs (une transaction par lot, un
+# DELETE + un INSERT à valeurs multiples par table). workers > 1 : lots répartis sur des
+# processus, chacun avec ses propres connexions.
+
+PLANNING_BATCH_CHUNK_SIZE = int(os.getenv("PLANNING_BATCH_CHUNK_SIZE", "500"))
+PLANNING_BATCH_WORKERS = int(os.getenv("PLANNING_BATCH_WORKERS", "1"))
+
+_PlanUser = namedtuple("_PlanUser", "id_utilisateur poids_kg taille_cm age sexe objectif equipements nb_jours_entrainement")
+
+_batch_catalogs = None  # catalogues d'un processus du pool
+_last_batch_stats = None
+
+
+def next_monday(today: date) -> date:
+    return today + timedelta(days=(7 - today.weekday()) % 7)
+
+
+def load_plan_catalogs(db: Session) -> dict:
+    """Recettes triées par calories (tirage par fenêtre avec bisect) et catalogue d'exercices rechargé."""
+    recettes = db.execute(select(Recette.id_recette, Recette.calories)).all()
+    par_calories = sorted((r.calories, r.id_recette) for r in recettes if r.calories is not None)
+    return {
+        "calories": [c for c, _ in par_calories],
+        "recettes_par_calories": [i for _, i in par_calories],
+        "recettes": [r.id_recette for r in recettes],
+        "exercices": ec.get_catalog(db, refresh=True),
+    }
+
+
+def load_plan_users(db: Session, user_ids: list = None) -> list:
+    stmt = select(
+        Utilisateur.id_utilisateur, Utilisateur.poids_kg, Utilisateur.taille_cm, Utilisateur.age,
+        Utilisateur.sexe, Utilisateur.objectif, Utilisateur.equipements, Utilisateur.nb_jours_entrainement,
+    ).order_by(Utilisateur.id_utilisateur)
+    if user_ids is not None:
+        stmt = stmt.where(Utilisateur.id_utilisateur.in_(user_ids))
+    return [_PlanUser(*row) for row in db.execute(stmt)]
+
+
+def compute_meal_targets(users: list) -> list:
+    """Cibles par repas de toute la cohorte, en une passe (mêmes règles que generate_weekly_plan)."""
+    return [meal_target_calories(u.poids_kg, u.taille_cm, u.age, u.sexe, u.objectif) for u in users]
+
+
+def _draw_recettes(catalogs: dict, target: float, n: int, rng) -> list:
+    """Équivalent en mémoire de sample_recette_ids(cal_min, cal_max, replace=True) avec repli sans filtre."""
+    calories = catalogs["calories"]
+    lo = bisect_left(calories, int(target - 300))
+    hi = bisect_right(calories, int(target + 300))
+    ids = catalogs["recettes_par_calories"][lo:hi] or catalogs["recettes"]
+    if not ids:
+        return []
+    return rng.sample(ids, n) if len(ids) >= n else rng.choices(ids, k=n)
+
+
+def _compute_chunk(users: list, catalogs: dict, start_date_only, include_meals: bool, include_sport: bool, rng):
+    meal_rows, seances = [], []  # seances : [(id_utilisateur, jour, focus, modèle)]
+    targets = compute_meal_targets(users) if include_meals else [None] * len(users)
+    for user, target in zip(users, targets):
+        if include_meals:
+            tirage = _draw_recettes(catalogs, target, 7 * len(HORAIRES_REPAS), rng)
+            if tirage:
+                meal_rows.extend(compute_meal_rows(user.id_utilisateur, start_date_only, tirage))
+        if include_sport:
+            materials = ec.allowed_materials(str(user.equipements))
+            freq = user.nb_jours_entrainement or 3
+            for jour, focus, template in compute_seances(start_date_only, freq, catalogs["exercices"], materials, rng):
+                seances.append((user.id_utilisateur, jour, focus, template))
+    return meal_rows, seances
+
+
+def _write_chunk(db: Session, user_ids: list, start_date_only, meal_rows: list, seances: list,
+                 include_meals: bool, include_sport: bool):
+    end_date_only = start_date_only + timedelta(days=7)
+    try:
+        if include_meals:
+            db.query(PlanningRepas).filter(
+                PlanningRepas.id_utilisateur.in_(user_ids),
+                PlanningRepas.jour >= start_date_only,
+                PlanningRepas.jour < end_date_only
+            ).delete(synchronize_session=False)
+            bulk_insert(db, PlanningRepas, meal_rows)
+        if include_sport:
+            db.query(PlanningSeance).filter(
+                PlanningSeance.id_utilisateur.in_(user_ids),
+                PlanningSeance.jour >= start_date_only,
+                PlanningSeance.jour < end_date_only
+            ).delete(synchronize_session=False)
+            seance_ids = ec.get_or_create_seances(db, [template for _, _, _, template in seances])
+            bulk_insert(db, PlanningSeance, [
+                {"id_utilisateur": uid, "id_seance": id_seance, "jour": jour, "est_realise": False, "notes": f"Objectif: {focus}"}
+                for id_seance, (uid, jour, focus, _) in zip(seance_ids, seances)
+            ])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+
+def _run_chunk(db: Session, users: list, catalogs: dict, start_date_only, include_meals: bool,
+               include_sport: bool, seed) -> dict:
+    rng = random.Random(seed)
+    started = perf_counter()
+    meal_rows, seances = _compute_chunk(users, catalogs, start_date_only, include_meals, include_sport, rng)
+    computed = perf_counter()
+    _write_chunk(db, [u.id_utilisateur for u in users], start_date_only, meal_rows, seances, include_meals, include_sport)
+    return {
+        "users": len(users),
+        "meals": len(meal_rows),
+        "seances": len(seances),
+        "compute_s": computed - started,
+        "write_s": perf_counter() - computed,
+    }
+
+
+def _init_batch_process(catalogs: dict):
+    global _batch_catalogs
+    _batch_catalogs = catalogs
+    # Processus forké : ne pas réutiliser les connexions ouvertes par le parent
+    get_engine().dispose(close=False)
+
+
+def _run_chunk_in_process(users: list, start_date_only, include_meals: bool, include_sport: bool, seed) -> dict:
+    db = SessionLocal()
+    try:
+        return _run_chunk(db, users, _batch_catalogs, start_date_only, include_meals, include_sport, seed)
+    finally:
+        db.close()
+
+
+def generate_weekly_plans_batch(db: Session, start_date: date = None, user_ids: list = None,
+                                include_meals: bool = True, include_sport: bool = True,
+                                chunk_size: int = PLANNING_BATCH_CHUNK_SIZE,
+                                workers: int = PLANNING_BATCH_WORKERS, seed: int = None) -> dict:
+    """
+    Planning de la semaine de `start_date` (par défaut : lundi prochain, ou aujourd'hui si lundi)
+    pour `user_ids` ou tous les utilisateurs. Retourne les métriques du lot.
+    seed : tirages reproductibles (un générateur par lot, dérivé de seed).
+    """
+    global _last_batch_stats
+    started = perf_counter()
+    start_date_only = start_date or next_monday(datetime.now().date())
+
+    catalogs = load_plan_catalogs(db)
+    users = load_plan_users(db, user_ids)
+    db.rollback()  # fin de la lecture : pas de transaction tenue pendant le calcul
+    loaded = perf_counter()
+
+    chunks = [users[i:i + chunk_size] for i in range(0, len(users), chunk_size)]
+    seeds = [None if seed is None else seed + n for n in range(len(chunks))]
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_process, initargs=(catalogs,)) as pool:
+            results = list(pool.map(
+                _run_chunk_in_process, chunks, repeat(start_date_only), repeat(include_meals),
+                repeat(include_sport), seeds,
+            ))
+    else:
+        workers = 1
+        results = [
+            _run_chunk(db, chunk, catalogs, start_date_only, include_meals, include_sport, chunk_seed)
+            for chunk, chunk_seed in zip(chunks, seeds)
+        ]
+
+    for user in users:
+        data_versions.bump(f"planning:{user.id_utilisateur}")
+
+    elapsed = perf_counter() - started
+    stats = {
+        "start_date": start_date_only.isoformat(),
+        "users": len(users),
+        "chunks": len(chunks),
+        "workers": workers,
+        "meals": sum(r["meals"] for r in results),
+        "seances": sum(r["seances"] for r in results),
+        "load_s": round(loaded - started, 3),
+        # Cumulés sur les lots (donc sur tous les processus si workers > 1)
+        "compute_s": round(sum(r["compute_s"] for r in results), 3),
+        "write_s": round(sum(r["write_s"] for r in results), 3),
+        "elapsed_s": round(elapsed, 3),
+        "users_per_second": round(len(users) / elapsed, 1) if elapsed else None,
+    }
+    _last_batch_stats = stats
+    return stats
+
+
+def get_batch_stats() -> dict:
+    """Métriques du dernier lot exécuté par ce processus (None si aucun)."""
+    return _last_batch_stats
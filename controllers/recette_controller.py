@@ -1,50 +1,157 @@
 from sqlalchemy.orm import Session
-from models import Recette
-from schemas import RecetteCreate
-from sqlalchemy import or_
-import json
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Recette, RecetteIngredient, RecetteTag, Tag
+from schemas import RecetteCreate, RecetteFilters
+from sqlalchemy import delete, func, insert, select
+from utils.cache import TTLCache
+from utils.catalog_cache import CatalogCache, Record, catalog_changes
+from utils.data_version import data_versions
+from utils.search_index import SearchIndex
+from utils.pagination import decode_cursor, keyset, next_cursor, parse_sort
+from database import SessionLocal
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+# Les requêtes de lecture sont construites une seule fois (select) puis
+# exécutées soit par une Session classique, soit par une AsyncSession.
+
+# Tris autorisés pour la pagination par curseur (préfixe "-" = décroissant)
+RECETTE_SORTS = {
+    "id": None,
+    "calories": Recette.calories,
+    "proteines": Recette.proteines,
+    "nom": Recette.nom_recette,
+}
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _with_ingredient(stmt, ingredient: str):
+    """Recettes contenant un ingrédient dont le nom commence par `ingredient` (index sur food)."""
+    pattern = _escape_like(ingredient.strip()) + "%"
+    matching = select(RecetteIngredient.id_recette).where(RecetteIngredient.food.like(pattern, escape="\\"))
+    return stmt.where(Recette.id_recette.in_(matching))
+
+# paramètre -> (colonne, opérateur) ; les bornes sont incluses
+_RANGE_FILTERS = {
+    "cal_min": (Recette.calories, "ge"), "cal_max": (Recette.calories, "le"),
+    "prot_min": (Recette.proteines, "ge"), "prot_max": (Recette.proteines, "le"),
+    "gluc_min": (Recette.glucides, "ge"), "gluc_max": (Recette.glucides, "le"),
+    "lip_min": (Recette.lipides, "ge"), "lip_max": (Recette.lipides, "le"),
+}
+
+def _apply_filters(stmt, filters: RecetteFilters = None):
+    """Traduit les filtres en WHERE (une recette sans valeur pour une macro filtrée est exclue)."""
+    if filters is None:
+        return stmt
+    for name, (column, op) in _RANGE_FILTERS.items():
+        value = getattr(filters, name)
+        if value is not None:
+            stmt = stmt.where(column >= value if op == "ge" else column <= value)
+    if filters.categorie:
+        stmt = stmt.where(Recette.categorie == filters.categorie)
+    if filters.tags:
+        for tag in split_tags(filters.tags):
+            tagged = select(RecetteTag.id_recette).join(Tag, Tag.id_tag == RecetteTag.id_tag).where(Tag.nom == tag)
+            stmt = stmt.where(Recette.id_recette.in_(tagged))
+    if filters.ingredient:
+        stmt = _with_ingredient(stmt, filters.ingredient)
+    return stmt
+
+def _recettes_stmt(skip: int = 0, limit: int = 100, cursor: str = None, sort: str = "id",
+                   filters: RecetteFilters = None):
+    """
+    Pagination par curseur (keyset) si `cursor` est fourni, sinon OFFSET `skip`
+    (mode compatibilité). L'ordre est toujours déterministe : (colonne de tri, id_recette).
+    """
+    sort_column, descending = parse_sort(sort, RECETTE_SORTS)
+    after = decode_cursor(cursor, sort) if cursor else None
+    stmt = _apply_filters(select(Recette), filters)
+    stmt = keyset(stmt, Recette.id_recette, sort_column, descending, after)
+    if after is None and skip:
+        stmt = stmt.offset(skip)
+    return stmt.limit(limit), sort_column
 
 def get_all_recettes(db: Session, skip: int = 0, limit: int = 100, search: str = None):
     """
-    Récupère les recettes, avec une option de recherche textuelle.
+    Récupère les recettes, avec une option de recherche textuelle (index plein texte).
     """
-    query = db.query(Recette)
-    
-    # Si un terme de recherche est fourni, on filtre
     if search:
-        # On cherche dans le nom OU la description OU les ingrédients
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                Recette.nom_recette.ilike(search_term),
-                Recette.description.ilike(search_term),
-                Recette.ingredients.ilike(search_term),
-                Recette.tags.ilike(search_term)
-            )
-        )
-    
-    return query.offset(skip).limit(limit).all()
+        return [r for r, _ in search_recettes(db, search, limit=limit, offset=skip)]
+    stmt, _ = _recettes_stmt(skip, limit)
+    return db.scalars(stmt).all()
+
+async def get_recettes_page_async(db: AsyncSession, limit: int = 100, skip: int = 0, cursor: str = None,
+                                  sort: str = "id", filters: RecetteFilters = None):
+    """Retourne (recettes, curseur_suivant). Lève InvalidCursor si le curseur / tri est invalide."""
+    stmt, sort_column = _recettes_stmt(skip, limit, cursor, sort, filters)
+    rows = (await db.scalars(stmt)).all()
+    return rows, next_cursor(rows, limit, sort, Recette.id_recette, sort_column)
+
+def sample_recette_ids(db: Session, n: int, filters: RecetteFilters = None, among: list = None,
+                       replace: bool = False) -> list:
+    """
+    Tire au hasard `n` id de recettes vérifiant les filtres (et parmi `among` si fourni).
+    Seuls les id filtrés remontent de la base (index ix_Recette_macros), jamais les lignes complètes.
+    replace=True : tirage avec remise si moins de `n` recettes conviennent (toujours `n` résultats).
+    """
+    stmt = _apply_filters(select(Recette.id_recette), filters)
+    if among is not None:
+        if not among:
+            return []
+        stmt = stmt.where(Recette.id_recette.in_(among))
+    ids = db.scalars(stmt).all()
+    if not ids:
+        return []
+    if len(ids) >= n:
+        return random.sample(ids, n)
+    return random.choices(ids, k=n) if replace else random.sample(ids, len(ids))
+
+def sample_recettes(db: Session, n: int, filters: RecetteFilters = None, among: list = None) -> list:
+    """Comme sample_recette_ids (sans remise), mais retourne les recettes tirées (cache du catalogue)."""
+    return get_recettes_cached(db, sample_recette_ids(db, n, filters, among))
 
 def get_recette_by_id(db: Session, recette_id: int):
-    return db.query(Recette).filter(Recette.id_recette == recette_id).first()
+    return db.get(Recette, recette_id)
+
+async def get_recette_by_id_async(db: AsyncSession, recette_id: int):
+    return await db.get(Recette, recette_id)
+
+def _ingredient_rows(ingredients) -> list:
+    return [RecetteIngredient(position=i, **ing.model_dump()) for i, ing in enumerate(ingredients)]
 
 def create_recette(db: Session, recette: RecetteCreate):
-    recette_data = recette.model_dump()
-    # Serialize ingredients to JSON string
-    if 'ingredients' in recette_data:
-        recette_data['ingredients'] = json.dumps(recette_data['ingredients'])
-        
+    recette_data = recette.model_dump(exclude={"ingredients"})
     db_recette = Recette(**recette_data)
+    db_recette.ingredients = _ingredient_rows(recette.ingredients)
     db.add(db_recette)
+    db.flush()
+    _sync_tags(db, db_recette.id_recette, db_recette.tags)
+    catalog_changes.record(db, "recettes", [db_recette.id_recette])
     db.commit()
+    data_versions.bump("recettes")
     db.refresh(db_recette)
+    _index_recette(db_recette)
     return db_recette
 
 def delete_recette(db: Session, recette_id: int):
     db_recette = get_recette_by_id(db, recette_id)
     if db_recette:
+        db.execute(delete(RecetteTag).where(RecetteTag.id_recette == recette_id))
         db.delete(db_recette)
+        catalog_changes.record(db, "recettes", [recette_id])
         db.commit()
+        data_versions.bump("recettes")
+        _recette_cache.invalidate([recette_id])
+        _tags_cache.clear()
+        _note_local_write(recette_id)
+        if _search_index is not None:
+            _search_index.remove(recette_id)
         return True
     return False
 
@@ -60,31 +167,391 @@ def update_recette(db: Session, recette_id: int, recette_data: RecetteCreate):
         db_recette.glucides = recette_data.glucides
         db_recette.lipides = recette_data.lipides
         
-        # Serialize ingredients
-        db_recette.ingredients = json.dumps([i.model_dump() for i in recette_data.ingredients])
+        # Remplace les lignes d'ingrédients (les anciennes sont supprimées par delete-orphan)
+        db_recette.ingredients = _ingredient_rows(recette_data.ingredients)
         
         db_recette.tags = recette_data.tags
         db_recette.image_url = recette_data.image_url
         db_recette.cautions = recette_data.cautions
+        # Les ingrédients sont dans une autre table : la ligne Recette n'est pas forcément
+        # modifiée, sa version (ETag) doit changer quand même
+        db_recette.updated_at = datetime.utcnow()
+        _sync_tags(db, recette_id, db_recette.tags)
+        catalog_changes.record(db, "recettes", [recette_id])
         
         db.commit()
+        data_versions.bump("recettes")
+        _recette_cache.invalidate([recette_id])
         db.refresh(db_recette)
+        _index_recette(db_recette)
         return db_recette
     return None
 
+# =============================================================================
+# TAGS (tables Tag / RecetteTag, tenues à jour à chaque écriture de recette)
+# =============================================================================
+# Recette.tags reste la chaîne "Vegan, Facile" exposée par l'API ; RecetteTag en est
+# la forme normalisée, utilisée par les filtres et par le dictionnaire de tags.
+
+TAGS_CACHE_TTL = float(os.getenv("TAGS_CACHE_TTL_SECONDS", "300"))
+
+# Une seule entrée : la liste complète [(nom, nb_recettes)], vidée à chaque écriture
+_tags_cache = TTLCache(max_size=1, ttl=TAGS_CACHE_TTL)
+
+
+def split_tags(tags_str: str) -> list:
+    """"Vegan, Facile, vegan" -> ["Vegan", "Facile"] (doublons ignorés sans tenir compte de la casse)."""
+    seen = {}
+    for t in (tags_str or "").split(","):
+        clean = t.strip()[:100]
+        if clean and clean.lower() not in seen:
+            seen[clean.lower()] = clean
+    return list(seen.values())
+
+
+def _tag_ids(db: Session, names: list) -> list:
+    """id des tags `names`, en créant ceux qui n'existent pas encore."""
+    if not names:
+        return []
+    existing = {nom.lower(): id_tag for id_tag, nom in db.execute(select(Tag.id_tag, Tag.nom).where(Tag.nom.in_(names)))}
+    missing = [n for n in names if n.lower() not in existing]
+    if missing:
+        db.execute(insert(Tag), [{"nom": n} for n in missing])
+        for id_tag, nom in db.execute(select(Tag.id_tag, Tag.nom).where(Tag.nom.in_(missing))):
+            existing[nom.lower()] = id_tag
+    return list(dict.fromkeys(existing[n.lower()] for n in names if n.lower() in existing))
+
+
+def _sync_tags(db: Session, recette_id: int, tags_str: str):
+    """Remplace les liens RecetteTag de la recette (dans la transaction en cours)."""
+    db.execute(delete(RecetteTag).where(RecetteTag.id_recette == recette_id))
+    ids = _tag_ids(db, split_tags(tags_str))
+    if ids:
+        db.execute(insert(RecetteTag), [{"id_recette": recette_id, "id_tag": i} for i in ids])
+    _tags_cache.clear()
+
+
+def _tag_counts_stmt():
+    nb = func.count(RecetteTag.id_recette)
+    return (
+        select(Tag.nom, nb.label("nb_recettes"))
+        .join(RecetteTag, RecetteTag.id_tag == Tag.id_tag)
+        .group_by(Tag.id_tag, Tag.nom)
+        .order_by(nb.desc(), Tag.nom)
+    )
+
+
+def get_tag_counts(db: Session) -> list:
+    """[(nom, nb_recettes)] du plus fréquent au plus rare, en cache TAGS_CACHE_TTL secondes."""
+    counts = _tags_cache.get("all")
+    if counts is None:
+        counts = [tuple(row) for row in db.execute(_tag_counts_stmt())]
+        _tags_cache.set("all", counts)
+    return counts
+
+
+async def get_tag_counts_async(db: AsyncSession) -> list:
+    counts = _tags_cache.get("all")
+    if counts is None:
+        counts = [tuple(row) for row in await db.execute(_tag_counts_stmt())]
+        _tags_cache.set("all", counts)
+    return counts
+
+
 def get_available_tags(db: Session):
-    """Récupère la liste unique des tags présents dans la base."""
-    # On récupère tous les champs 'tags' non nuls
-    results = db.query(Recette.tags).filter(Recette.tags != None).all()
-    
-    unique_tags = set()
-    for row in results:
-        tags_str = row[0] # row est un tuple (ex: "Vegan, Facile",)
-        if tags_str:
-            # On découpe par virgule et on nettoie les espaces
-            for t in tags_str.split(','):
-                clean = t.strip()
-                if clean:
-                    unique_tags.add(clean)
-    
-    return list(unique_tags)
\ No newline at end of file
+    """Liste des tags présents dans la base, du plus utilisé au moins utilisé."""
+    return [nom for nom, _ in get_tag_counts(db)]
+
+
+def get_tags_cache_stats() -> dict:
+    return _tags_cache.stats()
+
+# =============================================================================
+# RECHERCHE PLEIN TEXTE (index inversé en mémoire, par worker)
+# =============================================================================
+# Remplace les ILIKE '%terme%' sur 4 colonnes TEXT (scan complet de la table).
+# Cycle de vie commun aux structures du catalogue : voir utils/catalog_cache.py.
+# Ici, la reconstruction (après SEARCH_INDEX_TTL_SECONDS, ou si le journal a été élagué) se
+# fait en tâche de fond ; l'ancien index reste servi pendant ce temps.
+
+SEARCH_INDEX_TTL = float(os.getenv("SEARCH_INDEX_TTL_SECONDS", "3600"))
+RECETTE_SEARCH_FIELDS = {"nom_recette": 3.0, "tags": 2.0, "ingredients": 1.5, "description": 1.0}
+
+_search_index = None
+_search_stale = False  # journal élagué : reconstruction complète demandée
+_search_pending = set()  # recettes modifiées par un autre worker (ou pendant une reconstruction), à réindexer
+_search_pending_lock = threading.Lock()
+_search_rebuilding = False  # protégé par _search_pending_lock
+_search_rebuild_lock = threading.Lock()  # une seule reconstruction à la fois
+
+
+def _ingredients_text(items) -> str:
+    """Ne garde que les noms / libellés des ingrédients (pas les quantités). items : [(food, text)]"""
+    return " ".join(part for item in items for part in item if part)
+
+
+def _index_fields(nom_recette, description, ingredients, tags) -> dict:
+    return {
+        "nom_recette": nom_recette,
+        "description": description,
+        "ingredients": _ingredients_text(ingredients),
+        "tags": tags,
+    }
+
+
+def _index_rows_stmt(ids=None):
+    stmt = select(Recette.id_recette, Recette.nom_recette, Recette.description, Recette.tags)
+    return stmt if ids is None else stmt.where(Recette.id_recette.in_(ids))
+
+
+def _index_ingredients_stmt(ids=None):
+    stmt = select(RecetteIngredient.id_recette, RecetteIngredient.food, RecetteIngredient.text)
+    return stmt if ids is None else stmt.where(RecetteIngredient.id_recette.in_(ids))
+
+
+def _fill_index(index: SearchIndex, rows, ingredient_rows) -> set:
+    """Ajoute (ou remplace) les recettes `rows` ; retourne leurs ids."""
+    ingredients = defaultdict(list)
+    for id_recette, food, text in ingredient_rows:
+        ingredients[id_recette].append((food, text))
+    indexed = set()
+    for id_recette, nom, description, tags in rows:
+        index.add(id_recette, _index_fields(nom, description, ingredients.get(id_recette, ()), tags))
+        indexed.add(id_recette)
+    return indexed
+
+
+def _build_index(rows, ingredient_rows) -> SearchIndex:
+    index = SearchIndex(RECETTE_SEARCH_FIELDS)
+    _fill_index(index, rows, ingredient_rows)
+    return index
+
+
+def _take_pending(rebuild: bool = False) -> list:
+    # Pendant une reconstruction, les ids sont réservés au nouvel index (rejoués avant l'échange)
+    with _search_pending_lock:
+        if _search_rebuilding and not rebuild:
+            return []
+        ids = list(_search_pending)
+        _search_pending.clear()
+    return ids
+
+
+def _reindex(index: SearchIndex, ids: list, rows, ingredient_rows):
+    """Réindexe les recettes `ids` modifiées ailleurs (absentes de `rows` : supprimées)."""
+    for id_recette in set(ids) - _fill_index(index, rows, ingredient_rows):
+        index.remove(id_recette)
+
+
+def _index_is_stale() -> bool:
+    return _search_index is None or _search_stale or time.monotonic() - _search_index.built_at > SEARCH_INDEX_TTL
+
+
+def _note_local_write(recette_id: int):
+    # Une reconstruction en cours a pu lire la recette avant cette écriture : elle la rejouera
+    with _search_pending_lock:
+        if _search_rebuilding:
+            _search_pending.add(recette_id)
+
+
+def _index_recette(db_recette):
+    _note_local_write(db_recette.id_recette)
+    if _search_index is not None:
+        _search_index.add(
+            db_recette.id_recette,
+            _index_fields(
+                db_recette.nom_recette,
+                db_recette.description,
+                [(i.food, i.text) for i in db_recette.ingredients],
+                db_recette.tags,
+            ),
+        )
+
+
+def _rebuild_index():
+    """
+    Reconstruction complète sur une session dédiée, une à la fois (les appels concurrents
+    attendent puis trouvent l'index à jour). Les recettes modifiées pendant la lecture
+    sont rejouées sur le nouvel index avant qu'il remplace l'ancien.
+    """
+    global _search_index, _search_stale, _search_rebuilding
+    with _search_rebuild_lock:
+        with _search_pending_lock:
+            _search_rebuilding = True
+        try:
+            if not _index_is_stale():  # reconstruit pendant l'attente du verrou
+                return
+            _search_stale = False
+            with SessionLocal() as db:
+                index = _build_index(db.execute(_index_rows_stmt()), db.execute(_index_ingredients_stmt()))
+                ids = _take_pending(rebuild=True)
+                if ids:
+                    _reindex(index, ids, db.execute(_index_rows_stmt(ids)), db.execute(_index_ingredients_stmt(ids)))
+            _search_index = index
+        except Exception:
+            _search_stale = True
+            raise
+        finally:
+            # Les ids arrivés après le rejeu restent en attente : appliqués au nouvel index
+            with _search_pending_lock:
+                _search_rebuilding = False
+
+
+def _rebuild_in_background():
+    try:
+        _rebuild_index()
+    except Exception as e:
+        print(f"⚠️ Reconstruction de l'index de recherche impossible : {e}")
+
+
+def _schedule_rebuild():
+    """Index périmé : reconstruit dans un thread, l'ancien reste servi en attendant."""
+    global _search_rebuilding
+    with _search_pending_lock:
+        if _search_rebuilding:
+            return
+        _search_rebuilding = True
+    threading.Thread(target=_rebuild_in_background, name="search-index", daemon=True).start()
+
+
+def get_search_index(db: Session) -> SearchIndex:
+    catalog_changes.sync(db)
+    if _search_index is None:
+        _rebuild_index()  # premier appel : seul cas où une requête attend la construction
+    elif _index_is_stale():
+        _schedule_rebuild()
+    ids = _take_pending()
+    if ids:
+        _reindex(_search_index, ids, db.execute(_index_rows_stmt(ids)), db.execute(_index_ingredients_stmt(ids)))
+    return _search_index
+
+
+async def get_search_index_async(db: AsyncSession) -> SearchIndex:
+    await catalog_changes.sync_async(db)
+    if _search_index is None:
+        # Construction CPU (plusieurs secondes à 100k recettes) : hors de la boucle asyncio
+        await asyncio.to_thread(_rebuild_index)
+    elif _index_is_stale():
+        _schedule_rebuild()
+    ids = _take_pending()
+    if ids:
+        rows = (await db.execute(_index_rows_stmt(ids))).all()
+        ingredient_rows = (await db.execute(_index_ingredients_stmt(ids))).all()
+        _reindex(_search_index, ids, rows, ingredient_rows)
+    return _search_index
+
+
+def _ordered(recettes, hits):
+    by_id = {r.id_recette: r for r in recettes}
+    return [(by_id[doc_id], score) for doc_id, score in hits if doc_id in by_id]
+
+
+def search_recettes(db: Session, query: str, limit: int = 20, offset: int = 0):
+    """Retourne [(Recette, score)] classées par pertinence."""
+    hits = get_search_index(db).search(query, limit=limit, offset=offset)
+    if not hits:
+        return []
+    recettes = db.scalars(select(Recette).where(Recette.id_recette.in_([h[0] for h in hits]))).all()
+    return _ordered(recettes, hits)
+
+
+async def search_recettes_async(db: AsyncSession, query: str, limit: int = 20, offset: int = 0):
+    index = await get_search_index_async(db)
+    hits = index.search(query, limit=limit, offset=offset)
+    if not hits:
+        return []
+    recettes = (await db.scalars(select(Recette).where(Recette.id_recette.in_([h[0] for h in hits])))).all()
+    return _ordered(recettes, hits)
+
+
+def get_search_index_stats() -> dict:
+    if _search_index is None:
+        return {"loaded": False}
+    return {
+        "loaded": True,
+        "documents": len(_search_index),
+        "age_seconds": round(time.monotonic() - _search_index.built_at, 1),
+        "ttl_seconds": SEARCH_INDEX_TTL,
+        "rebuilding": _search_rebuilding,
+    }
+
+
+# =============================================================================
+# CACHE DU CATALOGUE (recettes en lecture seule, par worker)
+# =============================================================================
+# Lectures par id (GET /recettes/{id}, favoris, outils du coach) servies depuis la mémoire ;
+# seules les recettes absentes sont lues, en une requête. Invalidé par le journal CatalogChange.
+
+class IngredientRecord(Record):
+    __slots__ = ("food", "text", "weight", "measure", "quantity")
+
+
+class RecetteRecord(Record):
+    __slots__ = (
+        "id_recette", "nom_recette", "description", "categorie", "calories", "proteines",
+        "glucides", "lipides", "ingredients", "tags", "image_url", "cautions", "updated_at",
+    )
+
+
+_recette_cache = CatalogCache("recettes")
+
+
+def _recette_record(db_recette) -> RecetteRecord:
+    return RecetteRecord.from_row(
+        db_recette, ingredients=tuple(IngredientRecord.from_row(i) for i in db_recette.ingredients)
+    )
+
+
+def _records_stmt(ids: list):
+    return select(Recette).where(Recette.id_recette.in_(ids))
+
+
+def get_recettes_cached(db: Session, ids: list) -> list:
+    """Recettes `ids` dans l'ordre (les inexistantes sont ignorées), en lecture seule."""
+    catalog_changes.sync(db)
+    found, missing, token = _recette_cache.lookup(ids)
+    if missing:
+        loaded = {r.id_recette: _recette_record(r) for r in db.scalars(_records_stmt(missing))}
+        _recette_cache.put(loaded, token)
+        found.update(loaded)
+    return [found[i] for i in ids if i in found]
+
+
+async def get_recettes_cached_async(db: AsyncSession, ids: list) -> list:
+    await catalog_changes.sync_async(db)
+    found, missing, token = _recette_cache.lookup(ids)
+    if missing:
+        loaded = {r.id_recette: _recette_record(r) for r in (await db.scalars(_records_stmt(missing)))}
+        _recette_cache.put(loaded, token)
+        found.update(loaded)
+    return [found[i] for i in ids if i in found]
+
+
+def get_recette_cached(db: Session, recette_id: int):
+    recettes = get_recettes_cached(db, [recette_id])
+    return recettes[0] if recettes else None
+
+
+async def get_recette_cached_async(db: AsyncSession, recette_id: int):
+    recettes = await get_recettes_cached_async(db, [recette_id])
+    return recettes[0] if recettes else None
+
+
+def get_recette_cache_stats() -> dict:
+    return _recette_cache.stats()
+
+
+def _on_recettes_changed(ids):
+    """Recettes modifiées par un autre worker (ids=None : toutes)."""
+    global _search_stale
+    _recette_cache.invalidate(ids)
+    _tags_cache.clear()
+    data_versions.bump("recettes")
+    if ids is None:
+        _search_stale = True  # reconstruit en tâche de fond à la prochaine recherche
+    else:
+        with _search_pending_lock:
+            _search_pending.update(ids)
+
+
+catalog_changes.subscribe("recettes", _on_recettes_changed)
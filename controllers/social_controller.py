@@ -1,22 +1,27 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from models import Utilisateur, Friendship, SharedRecipe, Recette
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, select
+from models import Utilisateur, Friendship, SharedRecipe
 from fastapi import HTTPException
+from controllers import recette_controller as rc
+
+def _friends_stmt(user_id: int):
+    # Une seule requête : les amis sont l'autre extrémité des amitiés acceptées
+    sent = select(Friendship.receiver_id).where(
+        Friendship.requester_id == user_id, Friendship.status == 'accepted'
+    )
+    received = select(Friendship.requester_id).where(
+        Friendship.receiver_id == user_id, Friendship.status == 'accepted'
+    )
+    return select(Utilisateur).where(
+        or_(Utilisateur.id_utilisateur.in_(sent), Utilisateur.id_utilisateur.in_(received))
+    )
 
 def get_friends(db: Session, user_id: int):
-    friendships = db.query(Friendship).filter(
-        or_(Friendship.requester_id == user_id, Friendship.receiver_id == user_id),
-        Friendship.status == 'accepted'
-    ).all()
-    
-    friend_ids = []
-    for f in friendships:
-        if f.requester_id == user_id:
-            friend_ids.append(f.receiver_id)
-        else:
-            friend_ids.append(f.requester_id)
-            
-    return db.query(Utilisateur).filter(Utilisateur.id_utilisateur.in_(friend_ids)).all()
+    return db.scalars(_friends_stmt(user_id)).all()
+
+async def get_friends_async(db: AsyncSession, user_id: int):
+    return (await db.scalars(_friends_stmt(user_id))).all()
 
 def get_friend_requests(db: Session, user_id: int):
     requests = db.query(Friendship).filter(
@@ -161,12 +166,13 @@ def share_recipe(db: Session, sender_id: int, receiver_ids: list[int], recipe_id
 def get_shared_recipes_with_me(db: Session, user_id: int):
     shared = db.query(SharedRecipe).filter(SharedRecipe.receiver_id == user_id).order_by(SharedRecipe.created_at.desc()).all()
     
+    # Recettes servies par le cache du catalogue (une requête au plus pour toutes les absentes)
+    recettes = {r.id_recette: r for r in rc.get_recettes_cached(db, list({share.recipe_id for share in shared}))}
     results = []
     for share in shared:
-        recette = db.query(Recette).filter(Recette.id_recette == share.recipe_id).first()
         sender = db.query(Utilisateur).filter(Utilisateur.id_utilisateur == share.sender_id).first()
         
-        setattr(share, "recette", recette)
+        setattr(share, "recette", recettes.get(share.recipe_id))
         setattr(share, "sender", sender)
         
         results.append(share)
@@ -1,16 +1,14 @@
 from datetime import datetime, timedelta
 from fastapi import HTTPException
 import random
-from database import SessionLocal
 from models import Utilisateur
 from utils.security import hash_password, verify_password
 from utils.token import create_access_token
 from utils.email_utils import send_confirmation_email  # ✅ import ajouté
+import auth
 
 
-def signup_user(nom, prenom, email, mot_de_passe):
-    db = SessionLocal()
-
+def signup_user(db, nom, prenom, email, mot_de_passe):
     # Vérifier si l'email existe déjà
     existing = db.query(Utilisateur).filter_by(email=email).first()
     if existing:
@@ -36,7 +34,6 @@ def signup_user(nom, prenom, email, mot_de_passe):
 
     db.add(user)
     db.commit()
-    db.close()
 
     
     # Envoi du mail avec le code
@@ -44,8 +41,7 @@ def signup_user(nom, prenom, email, mot_de_passe):
 
     return {"message": "Inscription réussie. Un code vous a été envoyé par e-mail."}
 
-def verify_code(email, code):
-    db = SessionLocal()
+def verify_code(db, email, code):
     user = db.query(Utilisateur).filter_by(email=email).first()
 
     if not user:
@@ -64,13 +60,11 @@ def verify_code(email, code):
     user.token_verification = None
     user.token_expiration = None
     db.commit()
-    db.close()
 
     return {"message": "Compte vérifié avec succès ! Vous pouvez maintenant vous connecter."}
 
 
-def login_user(email, mot_de_passe):
-    db = SessionLocal()
+def login_user(db, email, mot_de_passe):
     user = db.query(Utilisateur).filter_by(email=email).first()
 
     if not user:
@@ -90,8 +84,9 @@ def update_user_profile(db, current_user, user_update):
     """
     Met à jour les informations du profil utilisateur.
     """
-    # On récupère l'instance attachée à la session actuelle
-    user_to_update = db.query(Utilisateur).filter(Utilisateur.id_utilisateur == current_user.id_utilisateur).first()
+    # current_user est déjà attaché à la session de la requête (auth.get_current_user) :
+    # db.get le retrouve dans l'identity map sans aller-retour BDD.
+    user_to_update = db.get(Utilisateur, current_user.id_utilisateur)
     
     if not user_to_update:
         # Should not happen as current_user is validated
@@ -123,4 +118,5 @@ def update_user_profile(db, current_user, user_update):
 
     db.commit()
     db.refresh(user_to_update)
+    auth.invalidate_user(user_to_update.id_utilisateur)
     return user_to_update
\ No newline at end of file
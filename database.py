@@ -1,9 +1,13 @@
 # nutrifit_api/database.py
 import os
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import certifi
+import threading
+import time
 from urllib.parse import quote_plus  
 
 
@@ -25,31 +29,278 @@ if DB_PASSWORD is None:
     
 encoded_password = quote_plus(DB_PASSWORD)
 
-DATABASE_URL = f"mysql+pymysql://{DB_USER}:{encoded_password}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-
-# Création de l'engine (ne connecte pas encore)
-try:
-    engine = create_engine(
-        DATABASE_URL,
-        echo=False,
-        pool_pre_ping=True
-    )
-except Exception as e:
-    print(f"❌ ERREUR CRITIQUE : Impossible de configurer l'engine SQLAlchemy. URL: {DATABASE_URL}")
-    print(f"Détail : {e}")
-    # Ici on peut exit car sans engine rien ne marche
-    exit(1)
-
-# Test de connexion (non bloquant pour éviter le crash immédiat du serveur)
-try:
-    with engine.connect() as connection:
-        print(f"✅ Connexion réussie à la base de données ({DB_HOST}) !")
-except Exception as e:
-    print(DB_HOST)
-    print("⚠️ AVERTISSEMENT : Impossible de se connecter à la base de données au démarrage.")
-    print(f"Détail : {e}")
-    # On n'exit PAS, pour laisser le serveur démarrer et remonter les erreurs HTTP 500
-
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
\ No newline at end of file
+# DATABASE_URL complet prioritaire (ex: sqlite pour la CI), sinon construit depuis DB_*
+DATABASE_URL = os.getenv("DATABASE_URL") or f"mysql+pymysql://{DB_USER}:{encoded_password}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+
+def _to_async_url(url: str) -> str:
+    """Même base, driver asyncio (aiomysql / aiosqlite)."""
+    for sync_prefix, async_prefix in (
+        ("mysql+pymysql://", "mysql+aiomysql://"),
+        ("mysql://", "mysql+aiomysql://"),
+        ("sqlite://", "sqlite+aiosqlite://"),
+    ):
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _to_async_url(DATABASE_URL)
+
+# --- Réglages du pool (par worker uvicorn/gunicorn) ---
+# Connexions max par worker = DB_POOL_SIZE + DB_MAX_OVERFLOW.
+# À dimensionner pour que (nb_workers x ce total) reste sous max_connections MySQL.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Recyclage avant le wait_timeout MySQL (8h par défaut, souvent moins chez les hébergeurs)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Stratégie de ping au checkout :
+#   "idle"   -> ping seulement si la connexion dort depuis > DB_PING_IDLE_SECONDS (défaut)
+#   "always" -> pool_pre_ping SQLAlchemy (1 aller-retour par checkout)
+#   "never"  -> aucun ping, on compte sur DB_POOL_RECYCLE
+DB_PRE_PING = os.getenv("DB_PRE_PING", "idle").lower()
+DB_PING_IDLE_SECONDS = float(os.getenv("DB_PING_IDLE_SECONDS", "60"))
+
+
+class _WaitTimeMixin:
+    """Mesure le temps passé à attendre une connexion libre dans le pool."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+
+class InstrumentedQueuePool(_WaitTimeMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_WaitTimeMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+_ping_stats = {"pings": 0, "ping_failures": 0}
+
+
+def _engine_kwargs(url: str, poolclass) -> dict:
+    kwargs = {"echo": False}
+    if not url.startswith("sqlite"):
+        kwargs.update(
+            poolclass=poolclass,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=(DB_PRE_PING == "always"),
+        )
+    return kwargs
+
+
+def _install_idle_ping(sync_engine):
+    if DB_PRE_PING != "idle":
+        return
+
+    @event.listens_for(sync_engine, "checkin")
+    def _mark_checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(sync_engine, "checkout")
+    def _ping_if_idle(dbapi_connection, connection_record, connection_proxy):
+        last = connection_record.info.get("checked_in_at")
+        if last is None or time.monotonic() - last < DB_PING_IDLE_SECONDS:
+            return
+        _ping_stats["pings"] += 1
+        try:
+            if hasattr(dbapi_connection, "ping"):
+                dbapi_connection.ping(reconnect=False)  # PyMySQL / aiomysql : COM_PING, pas de requête SQL
+            else:
+                cursor = dbapi_connection.cursor()
+                cursor.execute("SELECT 1")
+                cursor.close()
+        except Exception:
+            _ping_stats["ping_failures"] += 1
+            # Le pool jette cette connexion et en ouvre une nouvelle
+            raise exc.DisconnectionError()
+
+
+def _build_engine(url: str):
+    new_engine = create_engine(url, **_engine_kwargs(url, InstrumentedQueuePool))
+    _install_idle_ping(new_engine)
+    return new_engine
+
+
+def _build_async_engine(url: str):
+    new_engine = create_async_engine(url, **_engine_kwargs(url, InstrumentedAsyncQueuePool))
+    _install_idle_ping(new_engine.sync_engine)
+    return new_engine
+
+
+# =============================================================================
+# ENGINE PARESSEUX : aucun accès réseau à l'import
+# =============================================================================
+_engine = None
+_async_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Crée l'engine au premier usage (create_engine ne se connecte pas encore)."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                try:
+                    _engine = _build_engine(DATABASE_URL)
+                except Exception as e:
+                    print(f"❌ ERREUR CRITIQUE : Impossible de configurer l'engine SQLAlchemy. URL: {DATABASE_URL}")
+                    print(f"Détail : {e}")
+                    raise
+    return _engine
+
+
+def get_async_engine():
+    """Engine asyncio pour les routes `async def` (créé au premier usage, par worker)."""
+    global _async_engine
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                _async_engine = _build_async_engine(ASYNC_DATABASE_URL)
+    return _async_engine
+
+
+async def dispose_engines():
+    """Ferme proprement les pools (arrêt du worker)."""
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    if _engine is not None:
+        _engine.dispose()
+
+
+def check_connection() -> bool:
+    """Test de connexion explicite (manage_db.py, diagnostic). Jamais appelé à l'import."""
+    try:
+        with get_engine().connect():
+            print(f"✅ Connexion réussie à la base de données ({DB_HOST}) !")
+        return True
+    except Exception as e:
+        print("⚠️ AVERTISSEMENT : Impossible de se connecter à la base de données.")
+        print(f"Détail : {e}")
+        return False
+
+
+def __getattr__(name):
+    # Compatibilité : `from database import engine` crée l'engine à la demande
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class _LazyBindSession(Session):
+    """Session qui résout l'engine au moment de sa première requête."""
+
+    def get_bind(self, *args, **kwargs):
+        if self.bind is None:
+            self.bind = get_engine()
+        return super().get_bind(*args, **kwargs)
+
+
+SessionLocal = sessionmaker(class_=_LazyBindSession, autocommit=False, autoflush=False)
+
+
+# expire_on_commit=False : en async, un attribut expiré ne peut pas être rechargé implicitement
+_async_session_factory = async_sessionmaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+def _pool_stats(pool) -> dict:
+    stats = {
+        "pool_class": type(pool).__name__,
+        "pre_ping": DB_PRE_PING,
+        "pings": _ping_stats["pings"],
+        "ping_failures": _ping_stats["ping_failures"],
+    }
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            max_overflow=DB_MAX_OVERFLOW,
+            max_connections=pool.size() + DB_MAX_OVERFLOW,
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            timeout_seconds=DB_POOL_TIMEOUT,
+            recycle_seconds=DB_POOL_RECYCLE,
+        )
+    if isinstance(pool, _WaitTimeMixin):
+        with pool._stats_lock:
+            stats.update(
+                checkouts=pool.checkouts,
+                wait_avg_ms=round(pool.wait_total / pool.checkouts * 1000, 3) if pool.checkouts else 0.0,
+                wait_max_ms=round(pool.wait_max * 1000, 3),
+                timeouts=pool.timeouts,
+            )
+    return stats
+
+
+def get_pool_stats() -> dict:
+    """Snapshot du pool de connexions (pour /metrics et le dimensionnement des workers)."""
+    return _pool_stats(get_engine().pool)
+
+
+def get_async_pool_stats():
+    """Idem pour l'engine asyncio, None s'il n'a pas encore servi."""
+    if _async_engine is None:
+        return None
+    return _pool_stats(_async_engine.pool)
+Base = declarative_base()
+
+
+def get_db():
+    """
+    Session de BDD unique par requête (unit of work).
+    FastAPI met en cache les dépendances par requête : auth et la route
+    partagent donc la même session et la même connexion du pool.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    """Équivalent asyncio de get_db, partagé par get_current_user_async et la route."""
+    async with _async_session_factory(bind=get_async_engine()) as db:
+        try:
+            yield db
+        except Exception:
+            await db.rollback()
+            raise
+
+
+def async_session() -> AsyncSession:
+    """
+    Session asyncio hors dépendance FastAPI, à ouvrir avec `async with` : pour les corps de
+    réponse en streaming, produits après la fermeture de la session de get_async_db.
+    """
+    return _async_session_factory(bind=get_async_engine())
@@ -1,38 +1,82 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+import time
+_IMPORT_STARTED_AT = time.perf_counter()
+
+from contextlib import asynccontextmanager
+from datetime import date
+import json
+import os
+
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, EmailStr
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 import logging
 
 
-from database import Base, engine, SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import Base, get_engine, get_db, get_async_db, async_session, dispose_engines, get_pool_stats, get_async_pool_stats
 from models import Utilisateur, Recette, PlanningRepas, PlanningSeance
 import models
 import schemas
 import auth 
+from utils.pagination import InvalidCursor
+from utils.llm_limiter import LLMBusy, LLMTimeout
+from utils.catalog_cache import catalog_changes
+from utils import http_cache
 
 from controllers.user_controller import signup_user, login_user, verify_code, update_user_profile
 from controllers import recette_controller as rc
 from controllers import exercice_controller as ec
 from controllers import chat_controller as cc
+from controllers import chat_history_controller as hc
 from controllers import calendar_controller as cal_c
+from controllers import planning_controller as planning_c
 from controllers import favoris_controller as fc
 from controllers import social_controller as sc
 from controllers import payment_controller as pc
 
-try:
-    Base.metadata.create_all(bind=engine)
-except Exception as e:
-    print(f"⚠️ Erreur lors de la création des tables (vérifier la connexion BDD) : {e}")
-
 logger = logging.getLogger(__name__)
 
-from fastapi import FastAPI
+# Budget de démarrage à froid d'un worker (import + lifespan), en ms
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "3000"))
+# Opt-in : l'ancien create_all au boot. Préférer `python manage_db.py check|create`.
+DB_CREATE_ALL_ON_STARTUP = os.getenv("DB_CREATE_ALL_ON_STARTUP", "false").lower() == "true"
+
+startup_stats = {}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    lifespan_started_at = time.perf_counter()
+    get_engine()  # ne se connecte pas : la première connexion se fait à la première requête
+    if DB_CREATE_ALL_ON_STARTUP:
+        try:
+            Base.metadata.create_all(bind=get_engine())
+        except Exception as e:
+            print(f"⚠️ Erreur lors de la création des tables (vérifier la connexion BDD) : {e}")
+
+    now = time.perf_counter()
+    startup_stats.update(
+        import_ms=round((lifespan_started_at - _IMPORT_STARTED_AT) * 1000, 1),
+        lifespan_ms=round((now - lifespan_started_at) * 1000, 1),
+        total_ms=round((now - _IMPORT_STARTED_AT) * 1000, 1),
+        budget_ms=STARTUP_BUDGET_MS,
+    )
+    startup_stats["within_budget"] = startup_stats["total_ms"] <= STARTUP_BUDGET_MS
+    if not startup_stats["within_budget"]:
+        logger.warning(f"Démarrage lent : {startup_stats['total_ms']} ms (budget {STARTUP_BUDGET_MS} ms)")
+    yield
+    cc.shutdown()
+    await dispose_engines()
+
 
 app = FastAPI(
     title="NutriFit API",
     root_path="/nutrifit-api",
+    lifespan=lifespan,
 )
 
 from fastapi.middleware.cors import CORSMiddleware
@@ -43,15 +87,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Next-From", "ETag"],
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 class SignupModel(BaseModel):
     nom: str
     prenom: str
@@ -77,10 +115,11 @@ def home():
     return {"message": "Bienvenue sur l'API NutriFit "}
 
 @app.post("/signup")
-def signup(data: SignupModel):
+def signup(data: SignupModel, db: Session = Depends(get_db)):
     try:
         # appel normal de ton contrôleur
         return signup_user(
+            db,
             data.nom,
             data.prenom,
             data.email,
@@ -93,41 +132,101 @@ def signup(data: SignupModel):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/verify_code")
-def verify(data: VerifyCodeModel):
-    return verify_code(data.email, data.code)
+def verify(data: VerifyCodeModel, db: Session = Depends(get_db)):
+    return verify_code(db, data.email, data.code)
 
 @app.post("/login")
-def login(data: LoginModel):
-    return login_user(data.email, data.mot_de_passe)
+def login(data: LoginModel, db: Session = Depends(get_db)):
+    return login_user(db, data.email, data.mot_de_passe)
 
 @app.get("/recettes", response_model=List[schemas.Recette])
-def get_recettes(
+async def get_recettes(
+    request: Request,
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db),
-    current_user: Utilisateur = Depends(auth.get_current_user)
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    filters: schemas.RecetteFilters = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Utilisateur = Depends(auth.get_current_user_async)
 ):
     """
     Endpoint public pour voir toutes les recettes.
     (Nécessite d'être connecté)
+    Pagination : renvoyer l'en-tête X-Next-Cursor reçu dans ?cursor= pour la page suivante
+    (skip reste accepté en compatibilité). Tri : id, calories, proteines, nom (préfixe "-" = décroissant).
+    Filtres (combinables) : ?cal_min=&cal_max=, ?prot_min=&prot_max=, ?gluc_min=&gluc_max=,
+    ?lip_min=&lip_max=, ?categorie=, ?tags=Vegan,Facile, ?ingredient=poulet (préfixe).
+    Cache HTTP : renvoyer l'ETag reçu dans If-None-Match -> 304 si la page n'a pas changé.
     """
-    recettes = rc.get_all_recettes(db, skip=skip, limit=limit)
-    return recettes
+    try:
+        recettes, next_cursor = await rc.get_recettes_page_async(
+            db, limit=limit, skip=skip, cursor=cursor, sort=sort, filters=filters
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    etag = http_cache.make_etag("recettes", str(request.query_params), http_cache.rows_version(recettes, "id_recette"))
+    not_modified = http_cache.conditional(
+        request, response, etag, http_cache.last_modified(recettes),
+        cache_control=http_cache.CATALOG_CACHE_CONTROL, exact_date=False,
+    )
+    return not_modified or recettes
+
+@app.get("/recettes/search", response_model=List[schemas.RecetteSearchHit])
+async def search_recettes(
+    q: str,
+    limit: int = 20,
+    offset: int = 0,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Utilisateur = Depends(auth.get_current_user_async)
+):
+    """
+    Recherche plein texte (nom, tags, ingrédients, description), insensible aux accents,
+    résultats classés par pertinence.
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Le paramètre q est requis")
+    hits = await rc.search_recettes_async(db, q, limit=min(limit, 100), offset=offset)
+    return [
+        schemas.RecetteSearchHit(**schemas.Recette.model_validate(recette).model_dump(), score=round(score, 4))
+        for recette, score in hits
+    ]
+
+@app.get("/tags", response_model=List[schemas.TagCount])
+async def get_tags(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Utilisateur = Depends(auth.get_current_user_async)
+):
+    """
+    Dictionnaire des tags de recettes avec leur nombre de recettes (du plus fréquent au plus rare).
+    Les noms sont ceux à passer à GET /recettes?tags=.
+    """
+    counts = await rc.get_tag_counts_async(db)
+    return [schemas.TagCount(nom=nom, nb_recettes=nb) for nom, nb in counts]
 
 @app.get("/recettes/{recette_id}", response_model=schemas.Recette)
-def get_recette(
+async def get_recette(
     recette_id: int,
-    db: Session = Depends(get_db),
-    current_user: Utilisateur = Depends(auth.get_current_user)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Utilisateur = Depends(auth.get_current_user_async)
 ):
     """
     Endpoint public pour voir UNE recette par son ID.
     (Nécessite d'être connecté)
     """
-    db_recette = rc.get_recette_by_id(db, recette_id)
-    if db_recette is None:
+    recette = await rc.get_recette_cached_async(db, recette_id)
+    if recette is None:
         raise HTTPException(status_code=404, detail="Recette non trouvée")
-    return db_recette
+    etag = http_cache.make_etag("recette", recette_id, recette.updated_at)
+    not_modified = http_cache.conditional(
+        request, response, etag, recette.updated_at, cache_control=http_cache.CATALOG_CACHE_CONTROL
+    )
+    return not_modified or recette
 
 @app.post("/recettes", response_model=schemas.Recette, status_code=status.HTTP_201_CREATED)
 def create_new_recette(
@@ -170,25 +269,60 @@ def delete_existing_recette(
 
 
 @app.get("/exercices", response_model=List[schemas.Exercice])
-def get_exercices(
+async def get_exercices(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: Utilisateur = Depends(auth.get_current_user)
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Utilisateur = Depends(auth.get_current_user_async)
 ):
-    return ec.get_all_exercices(db, skip, limit)
+    """Pagination par curseur (X-Next-Cursor / ?cursor=) ou skip. Tri : id, nom."""
+    try:
+        exercices, next_cursor = await ec.get_exercices_page_async(db, limit=limit, skip=skip, cursor=cursor, sort=sort)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    etag = http_cache.make_etag("exercices", str(request.query_params), http_cache.rows_version(exercices, "id_exercice"))
+    not_modified = http_cache.conditional(
+        request, response, etag, http_cache.last_modified(exercices),
+        cache_control=http_cache.CATALOG_CACHE_CONTROL, exact_date=False,
+    )
+    return not_modified or exercices
 
 
 @app.get("/exercices/{exercice_id}", response_model=schemas.Exercice)
-def get_exercice(
+async def get_exercice(
     exercice_id: int,
-    db: Session = Depends(get_db),
-    current_user: Utilisateur = Depends(auth.get_current_user)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Utilisateur = Depends(auth.get_current_user_async)
 ):
-    ex = ec.get_exercice_by_id(db, exercice_id)
+    ex = await ec.get_exercice_cached_async(db, exercice_id)
     if not ex:
         raise HTTPException(404, "Exercice non trouvé")
-    return ex
+    etag = http_cache.make_etag("exercice", exercice_id, ex.updated_at)
+    not_modified = http_cache.conditional(
+        request, response, etag, ex.updated_at, cache_control=http_cache.CATALOG_CACHE_CONTROL
+    )
+    return not_modified or ex
+
+
+@app.get("/seances/{seance_id}", response_model=schemas.SeanceDetail)
+async def get_seance(
+    seance_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Utilisateur = Depends(auth.get_current_user_async)
+):
+    """Détail d'une séance du calendrier : exercices dans l'ordre, avec séries / répétitions / récupération."""
+    seance = await ec.get_seance_detail_async(db, seance_id)
+    if seance is None:
+        raise HTTPException(404, "Séance non trouvée")
+    return seance
 
 
 @app.post("/exercices", response_model=schemas.Exercice)
@@ -228,18 +362,121 @@ def delete_exercice(
     
 
 @app.post("/chat", response_model=ChatResponse)
-def chat_with_coach(
+async def chat_with_coach(
+    request: ChatRequest,
+    current_user: Utilisateur = Depends(auth.get_current_user_async)
+):
+    """
+    Discuter avec le coach IA (nécessite d'être connecté).
+    Les appels au modèle passent par une file dédiée : 429 + Retry-After si elle est saturée
+    ou si une demande du même utilisateur est déjà en cours, 504 si le modèle ne répond pas à temps.
+    """
+    try:
+        ai_response = await cc.handle_chat_interaction_async(request.message, current_user)
+    except LLMBusy as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except LLMTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    return {"response": ai_response}
+
+@app.get("/chat/history", response_model=schemas.ChatHistory)
+async def get_chat_history(
+    limit: int = 50,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Utilisateur = Depends(auth.get_current_user_async)
+):
+    """Mémoire du coach pour l'utilisateur : résumé des anciens échanges + derniers messages."""
+    resume, messages = await hc.get_history_async(db, current_user.id_utilisateur, limit=min(limit, 200))
+    return {"resume": resume, "messages": messages}
+
+@app.delete("/chat/history", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_chat_history(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Utilisateur = Depends(auth.get_current_user_async)
+):
+    """Efface la mémoire du coach (la prochaine conversation repart de zéro)."""
+    await hc.clear_history_async(db, current_user.id_utilisateur)
+    return None
+
+def _sse(event: dict) -> str:
+    payload = {k: v for k, v in event.items() if k != "type"}
+    return f"event: {event['type']}\ndata: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_with_coach_stream(
     request: ChatRequest,
+    current_user: Utilisateur = Depends(auth.get_current_user_async)
+):
+    """
+    Comme /chat, mais en Server-Sent Events (text/event-stream) :
+    start, tool_call {name, args}, tool_result {name, ok}, token {text}..., puis done {response}
+    (ou error {detail} si le modèle dépasse le délai). 429 + Retry-After si la file est saturée.
+    """
+    events = cc.stream_chat_interaction(request.message, current_user)
+    try:
+        first = await events.__anext__()  # attend une place dans la file LLM
+    except LLMBusy as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except LLMTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+
+    async def body():
+        yield _sse(first)
+        try:
+            async for event in events:
+                yield _sse(event)
+        except LLMTimeout as e:
+            yield _sse({"type": "error", "detail": str(e)})
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/metrics")
+def get_metrics(current_admin: Utilisateur = Depends(auth.get_current_admin_user)):
+    """
+    [ADMIN SEULEMENT] Compteurs internes du worker (caches...) pour le monitoring.
+    """
+    return {
+        "auth_cache": auth.get_auth_cache_stats(),
+        "db_pool": get_pool_stats(),
+        "async_db_pool": get_async_pool_stats(),
+        "startup": startup_stats,
+        "search_index": rc.get_search_index_stats(),
+        "tags_cache": rc.get_tags_cache_stats(),
+        "exercice_catalog": ec.get_catalog_stats(),
+        "catalog_cache": {
+            **catalog_changes.stats(),
+            "recettes": rc.get_recette_cache_stats(),
+            "exercices": ec.get_exercice_cache_stats(),
+        },
+        "chat_model": cc.get_chat_model_stats(),
+        "llm_limiter": cc.llm_limiter.stats(),
+        "chat_tools": cc.get_tool_stats(),
+        "planning_batch": planning_c.get_batch_stats(),
+    }
+
+@app.post("/planning/batch", response_model=schemas.PlanningBatchStats)
+def generate_plans_batch(
+    request: schemas.PlanningBatchRequest,
     db: Session = Depends(get_db),
-    current_user: Utilisateur = Depends(auth.get_current_user)
+    current_admin: Utilisateur = Depends(auth.get_current_admin_user)
 ):
-    """Discuter avec le coach IA (nécessite d'être connecté)"""
-    ai_response = cc.handle_chat_interaction(
-        user_message=request.message,
-        db=db,
-        current_user=current_user
+    """
+    [ADMIN SEULEMENT] Génère le planning de la semaine pour tous les utilisateurs (ou `user_ids`),
+    par lots, dans le processus du worker. Pour une cohorte entière, préférer
+    `python manage_db.py plan-week --workers N` (pool de processus).
+    """
+    return planning_c.generate_weekly_plans_batch(
+        db,
+        start_date=request.start_date,
+        user_ids=request.user_ids,
+        include_meals=request.include_meals,
+        include_sport=request.include_sport,
+        workers=1,  # pas de processus forkés depuis un worker uvicorn
     )
-    return {"response": ai_response}
 
 @app.get("/users/me", response_model=schemas.UserResponse)
 def read_users_me(current_user: Utilisateur = Depends(auth.get_current_user)):
@@ -271,34 +508,88 @@ def update_my_profile(
 
 # ============ ROUTES CALENDRIER ============
 
-@app.get("/calendar", response_model=schemas.Calendar)
-def get_user_calendar(
-    db: Session = Depends(get_db),
-    current_user: Utilisateur = Depends(auth.get_current_user)
-):
-    """
-    Récupère le calendrier complet (repas + séances) de l'utilisateur.
-    """
-    calendar_data = cal_c.get_user_calendar(db, current_user.id_utilisateur)
-    return {
-        "id_utilisateur": current_user.id_utilisateur,
-        "repas": calendar_data["repas"],
-        "seances": calendar_data["seances"]
-    }
-
-
-@app.get("/calendar/{jour}", response_model=schemas.CalendarDay)
-def get_calendar_day(
-    jour: str,
-    db: Session = Depends(get_db),
-    current_user: Utilisateur = Depends(auth.get_current_user)
+# Sans response_model : la réponse est Calendar, ou CalendarDetail avec ?expand=
+@app.get("/calendar", response_model=None, responses={200: {"model": schemas.CalendarDetail}})
+async def get_user_calendar(
+    request: Request,
+    response: Response,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    expand: Optional[str] = None,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Utilisateur = Depends(auth.get_current_user_async)
+):
+    """
+    Récupère le calendrier (repas + séances) de l'utilisateur, du ?from= au ?to= inclus
+    (2026-01-22 ; bornes facultatives), trié par jour.
+    Au plus CALENDAR_MAX_ROWS lignes par type : si la plage en contient plus, la réponse s'arrête
+    avant un jour complet et l'en-tête X-Next-From donne le ?from= de la suite.
+    ?expand=recette,seance : chaque repas porte sa recette, chaque séance son détail (exercices
+    dans l'ordre), en un nombre fixe de requêtes.
+    ?stream=true : toute la plage sans limite, en NDJSON (une ligne {"type": "repas" | "seance", ...}).
+    Cache HTTP : avec If-None-Match à jour, 304 sans lire les lignes du calendrier.
+    """
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="from doit précéder to")
+    try:
+        expand = cal_c.parse_expand(expand)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if stream and expand:
+        raise HTTPException(status_code=400, detail="expand n'est pas disponible avec stream")
+    user_id = current_user.id_utilisateur
+
+    if stream:
+        async def body():
+            async with async_session() as stream_db:
+                async for kind, row in cal_c.stream_user_calendar(stream_db, user_id, date_from, date_to):
+                    schema = schemas.PlanningRepas if kind == "repas" else schemas.PlanningSeance
+                    payload = schema.model_validate(row).model_dump(mode="json")
+                    yield json.dumps({"type": kind, **payload}, ensure_ascii=False) + "\n"
+
+        return StreamingResponse(body(), media_type="application/x-ndjson")
+
+    version = await cal_c.get_calendar_version_async(db, user_id, date_from, date_to)
+    catalog_version = None
+    if expand:
+        # Les détails changent avec le catalogue : sa version (journal CatalogChange) entre dans l'ETag
+        await catalog_changes.sync_async(db)
+        catalog_version = catalog_changes.version
+    etag = http_cache.make_etag("calendar", user_id, str(request.query_params), tuple(version), catalog_version)
+    modified = max((d for d in (version.repas_modifie, version.seance_modifiee) if d is not None), default=None)
+    not_modified = http_cache.conditional(request, response, etag, modified, exact_date=False)
+    if not_modified:
+        return not_modified
+    calendar_data = await cal_c.get_user_calendar_async(db, user_id, date_from, date_to, expand=expand)
+    if calendar_data["next_from"]:
+        response.headers["X-Next-From"] = calendar_data["next_from"].isoformat()
+    if expand:
+        calendar_data = await cal_c.expand_calendar_async(db, calendar_data, expand)
+        return schemas.CalendarDetail(id_utilisateur=user_id, repas=calendar_data["repas"], seances=calendar_data["seances"])
+    return schemas.Calendar(id_utilisateur=user_id, repas=calendar_data["repas"], seances=calendar_data["seances"])
+
+
+@app.get("/calendar/{jour}", response_model=None, responses={200: {"model": schemas.CalendarDayDetail}})
+async def get_calendar_day(
+    jour: date,
+    expand: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Utilisateur = Depends(auth.get_current_user_async)
 ):
     """
     Récupère les repas et séances pour un jour spécifique.
     Jour format: 2026-01-22
+    ?expand=recette,seance : recettes et séances détaillées (comme GET /calendar).
     """
-    calendar_day = cal_c.get_calendar_by_day(db, current_user.id_utilisateur, jour)
-    return calendar_day
+    try:
+        expand = cal_c.parse_expand(expand)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    calendar_day = await cal_c.get_calendar_by_day_async(db, current_user.id_utilisateur, jour, expand=expand)
+    if expand:
+        return schemas.CalendarDayDetail(**await cal_c.expand_calendar_async(db, calendar_day, expand))
+    return schemas.CalendarDay(**calendar_day)
 
 
 @app.post("/calendar/meal", response_model=schemas.PlanningRepas, status_code=status.HTTP_201_CREATED)
@@ -347,23 +638,9 @@ def update_meal_planning(
     """
     Met à jour un repas du calendrier.
     """
-    from datetime import datetime as dt
-    
-    db_meal = db.query(models.PlanningRepas).filter(
-        models.PlanningRepas.id_planning_repas == planning_id,
-        models.PlanningRepas.id_utilisateur == current_user.id_utilisateur
-    ).first()
-    
+    db_meal = cal_c.update_meal_in_calendar(db, current_user.id_utilisateur, planning_id, meal_update)
     if not db_meal:
         raise HTTPException(status_code=404, detail="Repas non trouvé")
-    
-    db_meal.id_recette = meal_update.id_recette
-    db_meal.jour = meal_update.jour
-    db_meal.repas = meal_update.repas
-    db_meal.notes = meal_update.notes
-    
-    db.commit()
-    db.refresh(db_meal)
     return db_meal
 
 
@@ -377,23 +654,9 @@ def update_workout_planning(
     """
     Met à jour une séance du calendrier.
     """
-    from datetime import datetime as dt
-    
-    db_workout = db.query(models.PlanningSeance).filter(
-        models.PlanningSeance.id_planning_seance == planning_id,
-        models.PlanningSeance.id_utilisateur == current_user.id_utilisateur
-    ).first()
-    
+    db_workout = cal_c.update_workout_in_calendar(db, current_user.id_utilisateur, planning_id, workout_update)
     if not db_workout:
         raise HTTPException(status_code=404, detail="Séance non trouvée")
-    
-    db_workout.id_seance = workout_update.id_seance
-    db_workout.jour = workout_update.jour
-    db_workout.notes = workout_update.notes
-    db_workout.est_realise = workout_update.est_realise
-    
-    db.commit()
-    db.refresh(db_workout)
     return db_workout
 
 
@@ -458,25 +721,32 @@ def remove_favorite(
     return None
 
 @app.get("/favorites", response_model=List[schemas.Recette])
-def get_user_favorites(
-    db: Session = Depends(get_db),
-    current_user: Utilisateur = Depends(auth.get_current_user)
+async def get_user_favorites(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Utilisateur = Depends(auth.get_current_user_async)
 ):
     """
     Récupère toutes les recettes favorites de l'utilisateur connecté.
     """
-    return fc.get_user_favorites(db, current_user.id_utilisateur)
+    favorites = await fc.get_user_favorites_async(db, current_user.id_utilisateur)
+    etag = http_cache.make_etag("favorites", current_user.id_utilisateur, http_cache.rows_version(favorites, "id_recette"))
+    not_modified = http_cache.conditional(
+        request, response, etag, http_cache.last_modified(favorites), exact_date=False
+    )
+    return not_modified or favorites
 
 
 # ============ ROUTES SOCIAL (AMIS & PARTAGE) ============
 
 @app.get("/friends", response_model=List[schemas.FollowUserInfo])
-def get_my_friends(
-    db: Session = Depends(get_db),
-    current_user: Utilisateur = Depends(auth.get_current_user)
+async def get_my_friends(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Utilisateur = Depends(auth.get_current_user_async)
 ):
     """Obtenir la liste de mes amis actuels"""
-    return sc.get_friends(db, current_user.id_utilisateur)
+    return await sc.get_friends_async(db, current_user.id_utilisateur)
 
 @app.get("/friends/requests", response_model=List[schemas.FriendshipResponse])
 def get_my_friend_requests(
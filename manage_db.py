@@ -0,0 +1,148 @@
+"""
+Commandes d'administration de la base (jamais exécutées au démarrage de l'API).
+
+    python manage_db.py ping     # teste la connexion
+    python manage_db.py check    # compare les modèles SQLAlchemy au schéma réel
+    python manage_db.py create   # crée les tables manquantes (create_all)
+    python manage_db.py migrate  # applique les migrations en attente (dossier migrations/)
+    python manage_db.py status   # liste les migrations appliquées / en attente
+    python manage_db.py plan-week [--start 2026-01-19] [--workers 4] [--chunk-size 500]
+                                 # planning de la semaine pour tous les utilisateurs
+    python manage_db.py gc-seances   # supprime les modèles de séance qu'aucun planning n'utilise
+"""
+import argparse
+import sys
+from datetime import date, datetime
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, select
+
+from database import Base, get_engine, check_connection
+import models  # noqa: F401  (enregistre les tables dans Base.metadata)
+import migrations
+
+# Table de suivi, volontairement hors de Base.metadata
+_migrations_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _migrations_meta,
+    Column("version", String(100), primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def applied_migrations() -> set:
+    engine = get_engine()
+    _migrations_meta.create_all(bind=engine)
+    with engine.connect() as conn:
+        return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def migrate() -> list:
+    """Applique dans l'ordre les migrations pas encore enregistrées. Retourne celles appliquées."""
+    engine = get_engine()
+    done = applied_migrations()
+    applied = []
+    for name in migrations.list_migrations():
+        if name in done:
+            continue
+        print(f"➡️  Migration {name}...")
+        with engine.begin() as conn:
+            migrations.load_migration(name).upgrade(conn)
+            conn.execute(schema_migrations.insert().values(version=name, applied_at=datetime.utcnow()))
+        applied.append(name)
+    return applied
+
+
+def check_schema() -> list:
+    """Retourne la liste des écarts entre les modèles et la base."""
+    inspector = inspect(get_engine())
+    existing_tables = set(inspector.get_table_names())
+    problems = []
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            problems.append(f"Table manquante : {table.name}")
+            continue
+
+        db_columns = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in db_columns:
+                problems.append(f"Colonne manquante : {table.name}.{column.name}")
+
+        db_indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in db_indexes:
+                problems.append(f"Index manquant : {table.name}.{index.name}")
+
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Administration de la BDD NutriFit")
+    parser.add_argument("command", choices=["ping", "check", "create", "migrate", "status", "plan-week", "gc-seances"])
+    parser.add_argument("--start", type=date.fromisoformat, help="plan-week : premier jour (défaut : lundi prochain)")
+    parser.add_argument("--workers", type=int, help="plan-week : processus de génération (défaut : PLANNING_BATCH_WORKERS)")
+    parser.add_argument("--chunk-size", type=int, help="plan-week : utilisateurs par transaction (défaut : PLANNING_BATCH_CHUNK_SIZE)")
+    args = parser.parse_args(argv)
+
+    if args.command == "ping":
+        return 0 if check_connection() else 1
+
+    if args.command == "create":
+        Base.metadata.create_all(bind=get_engine())
+        print("✅ Tables créées (les tables existantes ne sont pas modifiées).")
+        return 0
+
+    if args.command == "migrate":
+        applied = migrate()
+        print(f"✅ {len(applied)} migration(s) appliquée(s)." if applied else "✅ Aucune migration en attente.")
+        return 0
+
+    if args.command == "plan-week":
+        from database import SessionLocal
+        from controllers import planning_controller
+
+        options = {"start_date": args.start}
+        if args.workers:
+            options["workers"] = args.workers
+        if args.chunk_size:
+            options["chunk_size"] = args.chunk_size
+        db = SessionLocal()
+        try:
+            stats = planning_controller.generate_weekly_plans_batch(db, **options)
+        finally:
+            db.close()
+        print(f"✅ {stats['users']} planning(s) du {stats['start_date']} : {stats['meals']} repas, "
+              f"{stats['seances']} séances en {stats['elapsed_s']} s ({stats['users_per_second']} utilisateurs/s)")
+        print(f"   chargement {stats['load_s']} s | calcul {stats['compute_s']} s | écriture {stats['write_s']} s "
+              f"| {stats['chunks']} lot(s), {stats['workers']} processus")
+        return 0
+
+    if args.command == "gc-seances":
+        from database import SessionLocal
+        from controllers import exercice_controller
+
+        db = SessionLocal()
+        try:
+            removed = exercice_controller.gc_orphan_seances(db)
+        finally:
+            db.close()
+        print(f"✅ {removed} séance(s) orpheline(s) supprimée(s).")
+        return 0
+
+    if args.command == "status":
+        done = applied_migrations()
+        for name in migrations.list_migrations():
+            print(f"{'✅' if name in done else '⏳'} {name}")
+        return 0
+
+    problems = check_schema()
+    if not problems:
+        print("✅ Schéma conforme aux modèles.")
+        return 0
+    for p in problems:
+        print(f"❌ {p}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
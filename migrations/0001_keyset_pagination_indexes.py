@@ -0,0 +1,9 @@
+"""Index des colonnes de tri de la pagination par curseur (/recettes, /exercices)."""
+from migrations import create_index
+
+
+def upgrade(conn):
+    # InnoDB ajoute la clé primaire à chaque index secondaire : (calories) couvre (calories, id_recette)
+    create_index(conn, "Recette", "ix_Recette_calories", ["calories"])
+    create_index(conn, "Recette", "ix_Recette_proteines", ["proteines"])
+    create_index(conn, "Exercice", "ix_Exercice_nom_exercice", ["nom_exercice"])
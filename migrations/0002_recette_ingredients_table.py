@@ -0,0 +1,79 @@
+"""
+Ingrédients normalisés : table RecetteIngredient, remplie depuis le JSON de Recette.ingredients.
+
+La colonne JSON est conservée (rendue nullable) pour pouvoir revenir en arrière ;
+elle n'est plus écrite par l'API et pourra être supprimée dans une migration ultérieure.
+"""
+import json
+
+from sqlalchemy import select, text
+
+from migrations import has_column
+from models import Recette, RecetteIngredient
+
+BATCH_SIZE = 1000
+
+
+def _to_float(value):
+    try:
+        return float(value) if value is not None and value != "" else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse(raw) -> list:
+    """JSON -> liste de dicts prêts à insérer (format d'origine : [{food, text, weight, measure, quantity}])."""
+    if not raw:
+        return []
+    try:
+        items = json.loads(raw)
+    except (TypeError, ValueError):
+        # Texte libre : un ingrédient par ligne
+        items = [line for line in str(raw).splitlines() if line.strip()]
+    if not isinstance(items, list):
+        items = [items]
+
+    rows = []
+    for item in items:
+        if isinstance(item, dict):
+            food, txt = item.get("food"), item.get("text")
+            rows.append({
+                "food": str(food)[:255] if food else None,
+                "text": str(txt) if txt else None,
+                "weight": _to_float(item.get("weight")),
+                "measure": str(item["measure"])[:100] if item.get("measure") else None,
+                "quantity": _to_float(item.get("quantity")),
+            })
+        elif item:
+            rows.append({"food": None, "text": str(item), "weight": None, "measure": None, "quantity": None})
+    return rows
+
+
+def upgrade(conn):
+    RecetteIngredient.__table__.create(conn, checkfirst=True)
+
+    # Rejouable : on ne traite que les recettes qui n'ont encore aucune ligne
+    already = select(RecetteIngredient.id_recette)
+    legacy = Recette.__table__.c.ingredients
+    result = conn.execute(
+        select(Recette.id_recette, legacy)
+        .where(legacy.isnot(None), Recette.id_recette.notin_(already))
+        .order_by(Recette.id_recette)
+    ).all()
+
+    batch, total = [], 0
+    for id_recette, raw in result:
+        for position, row in enumerate(_parse(raw)):
+            batch.append({"id_recette": id_recette, "position": position, **row})
+        if len(batch) >= BATCH_SIZE:
+            conn.execute(RecetteIngredient.__table__.insert(), batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        conn.execute(RecetteIngredient.__table__.insert(), batch)
+        total += len(batch)
+    print(f"   {total} ingrédient(s) repris depuis {len(result)} recette(s)")
+
+    # Les nouvelles recettes n'écrivent plus la colonne JSON
+    if conn.dialect.name == "mysql" and has_column(conn, "Recette", "ingredients"):
+        conn.execute(text("ALTER TABLE Recette MODIFY ingredients TEXT NULL"))
@@ -0,0 +1,9 @@
+"""Index composites des filtres nutritionnels de GET /recettes (calories, macros, catégorie)."""
+from migrations import create_index, drop_index
+
+
+def upgrade(conn):
+    create_index(conn, "Recette", "ix_Recette_categorie_calories", ["categorie", "calories"])
+    create_index(conn, "Recette", "ix_Recette_macros", ["calories", "proteines", "glucides", "lipides"])
+    # (calories) est le préfixe de ix_Recette_macros : index redondant, maintenu à chaque écriture
+    drop_index(conn, "Recette", "ix_Recette_calories")
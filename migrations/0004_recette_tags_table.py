@@ -0,0 +1,42 @@
+"""
+Tags normalisés : tables Tag / RecetteTag, remplies depuis la chaîne Recette.tags ("Vegan, Facile").
+Recette.tags est conservée : c'est toujours le format exposé par l'API.
+"""
+from sqlalchemy import select
+
+from controllers.recette_controller import split_tags
+from models import Recette, RecetteTag, Tag
+
+BATCH_SIZE = 1000
+
+
+def upgrade(conn):
+    Tag.__table__.create(conn, checkfirst=True)
+    RecetteTag.__table__.create(conn, checkfirst=True)
+
+    # Rejouable : on ne traite que les recettes sans aucun lien
+    already = select(RecetteTag.id_recette)
+    rows = conn.execute(
+        select(Recette.id_recette, Recette.tags)
+        .where(Recette.tags.isnot(None), Recette.id_recette.notin_(already))
+    ).all()
+
+    per_recette = {id_recette: split_tags(tags) for id_recette, tags in rows}
+    tag_ids = {nom.lower(): id_tag for id_tag, nom in conn.execute(select(Tag.id_tag, Tag.nom))}
+    new_names = {}
+    for names in per_recette.values():
+        for n in names:
+            if n.lower() not in tag_ids:
+                new_names.setdefault(n.lower(), n)
+    if new_names:
+        conn.execute(Tag.__table__.insert(), [{"nom": n} for n in new_names.values()])
+        tag_ids = {nom.lower(): id_tag for id_tag, nom in conn.execute(select(Tag.id_tag, Tag.nom))}
+
+    links = [
+        {"id_recette": id_recette, "id_tag": id_tag}
+        for id_recette, names in per_recette.items()
+        for id_tag in dict.fromkeys(tag_ids[n.lower()] for n in names)
+    ]
+    for i in range(0, len(links), BATCH_SIZE):
+        conn.execute(RecetteTag.__table__.insert(), links[i:i + BATCH_SIZE])
+    print(f"   {len(new_names)} tag(s), {len(links)} lien(s) recette-tag")
@@ -0,0 +1,7 @@
+"""Mémoire persistante du coach : tables ChatMessage et ChatSummary."""
+from models import ChatMessage, ChatSummary
+
+
+def upgrade(conn):
+    ChatMessage.__table__.create(conn, checkfirst=True)
+    ChatSummary.__table__.create(conn, checkfirst=True)
@@ -0,0 +1,81 @@
+"""
+Modèles de séance adressés par contenu : colonne Seance.signature + index unique.
+
+Les séances générées existantes (id_calendrier NULL) reçoivent leur signature ; les doublons
+(même nom, durée et exercices) sont fusionnés sur la plus ancienne : PlanningSeance est
+redirigé, les copies et leurs SeanceExercice supprimées. Les séances devenues orphelines
+sont ensuite supprimables avec `python manage_db.py gc-seances`.
+"""
+from collections import defaultdict
+
+from sqlalchemy import case, delete, select, update
+
+from controllers.exercice_controller import seance_signature
+from migrations import add_column, create_index
+from models import PlanningSeance, Seance, SeanceExercice
+
+BATCH_SIZE = 1000
+
+
+def _apply(conn, canonical: dict, duplicates: dict):
+    """canonical : {id_seance: signature} à écrire ; duplicates : {id_doublon: id_conservé}."""
+    if duplicates:
+        ids = list(duplicates)
+        conn.execute(
+            update(PlanningSeance)
+            .where(PlanningSeance.id_seance.in_(ids))
+            .values(id_seance=case(duplicates, value=PlanningSeance.id_seance))
+        )
+        conn.execute(delete(SeanceExercice).where(SeanceExercice.id_seance.in_(ids)))
+        conn.execute(delete(Seance).where(Seance.id_seance.in_(ids)))
+    if canonical:
+        conn.execute(
+            update(Seance)
+            .where(Seance.id_seance.in_(list(canonical)))
+            .values(signature=case(canonical, value=Seance.id_seance))
+        )
+
+
+def upgrade(conn):
+    add_column(conn, "Seance", "signature", "VARCHAR(64) NULL")
+
+    # Rejouable : les signatures déjà posées servent de référence
+    by_signature = dict(conn.execute(
+        select(Seance.signature, Seance.id_seance).where(Seance.signature.isnot(None))
+    ).all())
+
+    last_id, signed, merged = 0, 0, 0
+    while True:
+        seances = conn.execute(
+            select(Seance.id_seance, Seance.nom, Seance.duree)
+            .where(Seance.signature.is_(None), Seance.id_calendrier.is_(None), Seance.id_seance > last_id)
+            .order_by(Seance.id_seance)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not seances:
+            break
+        last_id = seances[-1].id_seance
+
+        exercices = defaultdict(list)
+        for row in conn.execute(
+            select(
+                SeanceExercice.id_seance, SeanceExercice.id_exercice, SeanceExercice.series,
+                SeanceExercice.repetitions, SeanceExercice.temps_recuperation,
+            ).where(SeanceExercice.id_seance.in_([s.id_seance for s in seances]))
+        ):
+            exercices[row.id_seance].append((row.id_exercice, row.series, row.repetitions, row.temps_recuperation))
+
+        canonical, duplicates = {}, {}
+        for s in seances:
+            signature = seance_signature(s.nom, s.duree, exercices[s.id_seance])
+            if signature in by_signature:
+                duplicates[s.id_seance] = by_signature[signature]
+            else:
+                by_signature[signature] = s.id_seance
+                canonical[s.id_seance] = signature
+        _apply(conn, canonical, duplicates)
+        signed += len(canonical)
+        merged += len(duplicates)
+
+    print(f"   {signed} séance(s) signée(s), {merged} doublon(s) fusionné(s)")
+    create_index(conn, "Seance", "ix_Seance_signature", ["signature"], unique=True)
@@ -0,0 +1,57 @@
+"""
+Muscles normalisés : tables Muscle / ExerciceMuscle, remplies depuis Exercice.muscle_cible
+("pectoraux, triceps", ou la liste Python "['pectoraux', 'triceps']" écrite par l'ancien seed,
+réécrite au passage en "pectoraux, triceps"). Index (materiel, type_exercice) sur Exercice.
+"""
+from sqlalchemy import case, select, update
+
+from migrations import create_index
+from models import Exercice, ExerciceMuscle, Muscle
+from utils.exercice_catalog import parse_muscles
+
+BATCH_SIZE = 1000
+
+
+def upgrade(conn):
+    Muscle.__table__.create(conn, checkfirst=True)
+    ExerciceMuscle.__table__.create(conn, checkfirst=True)
+    create_index(conn, "Exercice", "ix_Exercice_materiel_type", ["materiel", "type_exercice"])
+
+    # Rejouable : on ne traite que les exercices sans aucun lien
+    already = select(ExerciceMuscle.id_exercice)
+    rows = conn.execute(
+        select(Exercice.id_exercice, Exercice.muscle_cible)
+        .where(Exercice.muscle_cible.isnot(None), Exercice.id_exercice.notin_(already))
+    ).all()
+
+    per_exercice = {id_exercice: parse_muscles(muscle_cible) for id_exercice, muscle_cible in rows}
+    rewritten = {
+        id_exercice: ", ".join(per_exercice[id_exercice])
+        for id_exercice, muscle_cible in rows
+        if muscle_cible.lstrip()[:1] in "[(" and per_exercice[id_exercice]
+    }
+    ids = list(rewritten)
+    for i in range(0, len(ids), BATCH_SIZE):
+        chunk = {id_exercice: rewritten[id_exercice] for id_exercice in ids[i:i + BATCH_SIZE]}
+        conn.execute(
+            update(Exercice)
+            .where(Exercice.id_exercice.in_(list(chunk)))
+            .values(muscle_cible=case(chunk, value=Exercice.id_exercice))
+        )
+
+    muscle_ids = dict(conn.execute(select(Muscle.nom, Muscle.id_muscle)).all())
+    new_names = list(dict.fromkeys(
+        n for names in per_exercice.values() for n in names if n not in muscle_ids
+    ))
+    if new_names:
+        conn.execute(Muscle.__table__.insert(), [{"nom": n} for n in new_names])
+        muscle_ids = dict(conn.execute(select(Muscle.nom, Muscle.id_muscle)).all())
+
+    links = [
+        {"id_exercice": id_exercice, "id_muscle": muscle_ids[n]}
+        for id_exercice, names in per_exercice.items()
+        for n in names
+    ]
+    for i in range(0, len(links), BATCH_SIZE):
+        conn.execute(ExerciceMuscle.__table__.insert(), links[i:i + BATCH_SIZE])
+    print(f"   {len(new_names)} muscle(s), {len(links)} lien(s) exercice-muscle, {len(rewritten)} liste(s) réécrite(s)")
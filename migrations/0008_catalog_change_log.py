@@ -0,0 +1,6 @@
+"""Journal CatalogChange : invalidation des caches du catalogue entre workers."""
+from models import CatalogChange
+
+
+def upgrade(conn):
+    CatalogChange.__table__.create(conn, checkfirst=True)
@@ -0,0 +1,22 @@
+"""
+Colonne updated_at (version de ligne pour les ETag / Last-Modified des GET) sur Recette,
+Exercice, PlanningRepas et PlanningSeance. Les lignes existantes reçoivent leur date de
+création (planning) ou la date de la migration (catalogue).
+"""
+from datetime import datetime
+
+from sqlalchemy import func, update
+
+from migrations import add_column
+from models import Exercice, PlanningRepas, PlanningSeance, Recette
+
+
+def upgrade(conn):
+    ddl = "DATETIME(6) NULL" if conn.dialect.name == "mysql" else "DATETIME NULL"
+    now = datetime.utcnow()
+    for model in (Recette, Exercice, PlanningRepas, PlanningSeance):
+        add_column(conn, model.__tablename__, "updated_at", ddl)
+        value = func.coalesce(model.date_creation, now) if hasattr(model, "date_creation") else now
+        # Rejouable : seules les lignes encore sans date sont complétées
+        result = conn.execute(update(model).where(model.updated_at.is_(None)).values(updated_at=value))
+        print(f"   {model.__tablename__} : {result.rowcount} ligne(s) datée(s)")
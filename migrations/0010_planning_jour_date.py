@@ -0,0 +1,78 @@
+"""
+PlanningRepas.jour : VARCHAR(20) -> DATE (comme PlanningSeance.jour), et index
+(id_utilisateur, jour) sur les deux tables pour GET /calendar?from=&to=.
+
+Les valeurs "2026-01-22" sont gardées ; les autres formats reconnus ("22/01/2026",
+"2026-01-22T12:00:00") sont réécrits ; une valeur illisible est remplacée par le jour de
+date_creation (à défaut, celui de la migration), avec un avertissement par ligne.
+"""
+from datetime import date, datetime
+
+from sqlalchemy import Date, String, case, inspect, select, text, type_coerce, update
+
+from migrations import create_index
+from models import PlanningRepas
+
+BATCH_SIZE = 1000
+_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d")
+
+
+def parse_jour(value):
+    """"2026-01-22" (ou l'un des _FORMATS, suivi éventuellement d'une heure) -> date, sinon None."""
+    text_value = str(value or "").strip()
+    for candidate in (text_value, text_value[:10]):
+        for fmt in _FORMATS:
+            try:
+                return datetime.strptime(candidate, fmt).date()
+            except ValueError:
+                continue
+    return None
+
+
+def _normalize(conn) -> tuple:
+    """Réécrit en "AAAA-MM-JJ" les jours qui ne le sont pas : (réécrits, remplacés)."""
+    jour = type_coerce(PlanningRepas.jour, String)  # lu tel quel, sans conversion en date
+    last_id, rewritten, replaced = 0, 0, 0
+    while True:
+        rows = conn.execute(
+            select(PlanningRepas.id_planning_repas, jour.label("jour"), PlanningRepas.date_creation)
+            .where(PlanningRepas.id_planning_repas > last_id)
+            .order_by(PlanningRepas.id_planning_repas)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id_planning_repas
+
+        fixed = {}
+        for row in rows:
+            value = parse_jour(row.jour)
+            if value is not None and value.isoformat() == str(row.jour):
+                continue
+            if value is None:
+                value = row.date_creation.date() if row.date_creation else date.today()
+                print(f"   ⚠️ PlanningRepas {row.id_planning_repas} : jour illisible {row.jour!r}, remplacé par {value}")
+                replaced += 1
+            else:
+                rewritten += 1
+            fixed[row.id_planning_repas] = value.isoformat()
+        if fixed:
+            conn.execute(
+                update(PlanningRepas)
+                .where(PlanningRepas.id_planning_repas.in_(list(fixed)))
+                .values(jour=type_coerce(case(fixed, value=PlanningRepas.id_planning_repas), String))
+            )
+    return rewritten, replaced
+
+
+def upgrade(conn):
+    column = next(c for c in inspect(conn).get_columns("PlanningRepas") if c["name"] == "jour")
+    if not isinstance(column["type"], Date):
+        rewritten, replaced = _normalize(conn)
+        print(f"   {rewritten} jour(s) réécrit(s), {replaced} remplacé(s) par la date de création")
+        if conn.dialect.name == "mysql":
+            conn.execute(text("ALTER TABLE PlanningRepas MODIFY jour DATE NOT NULL"))
+        # SQLite : pas de type strict, les valeurs "AAAA-MM-JJ" sont lues comme des dates
+
+    create_index(conn, "PlanningRepas", "ix_PlanningRepas_user_jour", ["id_utilisateur", "jour"])
+    create_index(conn, "PlanningSeance", "ix_PlanningSeance_user_jour", ["id_utilisateur", "jour"])
@@ -0,0 +1,9 @@
+"""
+Suppression de ix_Recette_calories (migration 0001), doublon du préfixe de ix_Recette_macros.
+Les nouvelles bases le suppriment dès 0003 ; celle-ci traite les bases où 0003 est déjà passée.
+"""
+from migrations import drop_index
+
+
+def upgrade(conn):
+    drop_index(conn, "Recette", "ix_Recette_calories")
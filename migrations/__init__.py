@@ -0,0 +1,60 @@
+"""
+Migrations de schéma, appliquées par `python manage_db.py migrate`.
+
+Chaque module `NNNN_description.py` expose `upgrade(conn)` (conn : Connection SQLAlchemy).
+Les migrations doivent être rejouables sans casse (vérifier avant de créer).
+Attention : sous MySQL, chaque ordre DDL fait un commit implicite.
+"""
+import importlib
+import pkgutil
+import re
+
+from sqlalchemy import inspect, text
+
+_MIGRATION_RE = re.compile(r"^\d{4}_\w+$")
+
+
+def list_migrations() -> list:
+    names = [m.name for m in pkgutil.iter_modules(__path__) if _MIGRATION_RE.match(m.name)]
+    return sorted(names)
+
+
+def load_migration(name: str):
+    return importlib.import_module(f"{__name__}.{name}")
+
+
+# --- Helpers idempotents ---
+
+def has_table(conn, table: str) -> bool:
+    return inspect(conn).has_table(table)
+
+
+def has_column(conn, table: str, column: str) -> bool:
+    return column in {c["name"] for c in inspect(conn).get_columns(table)}
+
+
+def has_index(conn, table: str, name: str) -> bool:
+    return name in {i["name"] for i in inspect(conn).get_indexes(table)}
+
+
+def create_index(conn, table: str, name: str, columns: list, unique: bool = False):
+    if has_index(conn, table, name):
+        return
+    cols = ", ".join(columns)
+    conn.execute(text(f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} ON {table} ({cols})"))
+
+
+def drop_index(conn, table: str, name: str):
+    if not has_index(conn, table, name):
+        return
+    if conn.dialect.name == "mysql":
+        conn.execute(text(f"DROP INDEX {name} ON {table}"))
+    else:
+        conn.execute(text(f"DROP INDEX {name}"))
+
+
+def add_column(conn, table: str, column: str, ddl: str):
+    """ddl : définition SQL de la colonne, ex. "DATETIME NULL"."""
+    if has_column(conn, table, column):
+        return
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
@@ -1,11 +1,16 @@
 from sqlalchemy import (
-    Column, Integer, String, Boolean, DateTime, Enum, Float, SmallInteger, Text, Date, Time, ForeignKey
+    Column, Integer, String, Boolean, DateTime, Enum, Float, SmallInteger, Text, Date, Time, ForeignKey, Index
 )
-from sqlalchemy.dialects.mysql import TINYINT
+from sqlalchemy.dialects.mysql import DATETIME, TINYINT
+from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
 from sqlalchemy import JSON
 
+# Date de dernière écriture, à la microseconde sous MySQL : sert de version de ligne
+# (ETag / Last-Modified des GET), deux écritures dans la même seconde doivent se distinguer
+UpdatedAt = DateTime().with_variant(DATETIME(fsp=6), "mysql")
+
 class Utilisateur(Base):
     __tablename__ = "Utilisateur"
     id_utilisateur = Column(Integer, primary_key=True, index=True)
@@ -30,42 +35,105 @@ class Utilisateur(Base):
 
 class Recette(Base):
     __tablename__ = "Recette"
+    __table_args__ = (
+        # Filtres de GET /recettes et tirages du planning : plage de calories (+ catégorie),
+        # les autres macros sont évaluées dans l'index sans lire la ligne
+        Index("ix_Recette_categorie_calories", "categorie", "calories"),
+        Index("ix_Recette_macros", "calories", "proteines", "glucides", "lipides"),
+    )
     id_recette = Column(Integer, primary_key=True, index=True)
     nom_recette = Column(String(255), nullable=False, index=True)
     description = Column(Text, nullable=True)
     categorie = Column(String(50), nullable=True)
-    calories = Column(Integer, nullable=True, default=0)
-    proteines = Column(Float, nullable=True)
+    calories = Column(Integer, nullable=True, default=0)  # indexé par ix_Recette_macros (1re colonne)
+    proteines = Column(Float, nullable=True, index=True)
     glucides = Column(Float, nullable=True)
     lipides = Column(Float, nullable=True)
-    ingredients = Column(Text, nullable=False) 
+    # Ancienne colonne JSON (TEXT), conservée le temps de la migration 0002 : ne plus l'écrire
+    ingredients_json = Column("ingredients", Text, nullable=True)
     tags = Column(Text, nullable=True)
     image_url = Column(String(255), nullable=True)
     cautions = Column(Text, nullable=True)
+    updated_at = Column(UpdatedAt, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Chargés en une requête IN (...) pour toute la page de recettes, sans json.loads
+    ingredients = relationship(
+        "RecetteIngredient",
+        order_by="RecetteIngredient.position",
+        lazy="selectin",
+        cascade="all, delete-orphan",
+    )
+
+class RecetteIngredient(Base):
+    __tablename__ = "RecetteIngredient"
+    id = Column(Integer, primary_key=True, index=True)
+    id_recette = Column(Integer, ForeignKey('Recette.id_recette', ondelete='CASCADE'), nullable=False, index=True)
+    position = Column(SmallInteger, nullable=False, default=0)
+    food = Column(String(255), nullable=True, index=True)
+    text = Column(Text, nullable=True)
+    weight = Column(Float, nullable=True)
+    measure = Column(String(100), nullable=True)
+    quantity = Column(Float, nullable=True)
+
+class Tag(Base):
+    __tablename__ = "Tag"
+    id_tag = Column(Integer, primary_key=True, index=True)
+    nom = Column(String(100), nullable=False, unique=True)
+
+class RecetteTag(Base):
+    # Tenue à jour à chaque écriture de Recette.tags (qui reste le format exposé par l'API)
+    __tablename__ = "RecetteTag"
+    id_recette = Column(Integer, ForeignKey('Recette.id_recette', ondelete='CASCADE'), primary_key=True)
+    id_tag = Column(Integer, ForeignKey('Tag.id_tag', ondelete='CASCADE'), primary_key=True, index=True)
 
 class Exercice(Base):
     __tablename__ = "Exercice"
+    __table_args__ = (
+        # Chargement du catalogue par matériel (puis type) sans parcourir la table
+        Index("ix_Exercice_materiel_type", "materiel", "type_exercice"),
+    )
     id_exercice = Column(Integer, primary_key=True, index=True)
-    nom_exercice = Column(String(100), nullable=False)
+    nom_exercice = Column(String(100), nullable=False, index=True)
     description_exercice = Column(Text, nullable=True)
     type_exercice = Column(String(50), nullable=True)
     image_path = Column(String(255), nullable=True)
     muscle_cible = Column(Text, nullable=True)
     materiel = Column(Enum('poids_du_corps','materiel_maison','salle_de_sport'), default='poids_du_corps')
+    updated_at = Column(UpdatedAt, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class Muscle(Base):
+    __tablename__ = "Muscle"
+    id_muscle = Column(Integer, primary_key=True, index=True)
+    # Nom normalisé (minuscules, sans accents) : "epaules", "lower dos"
+    nom = Column(String(100), nullable=False, unique=True)
+
+class ExerciceMuscle(Base):
+    # Tenue à jour à chaque écriture de Exercice.muscle_cible (qui reste le format exposé par l'API)
+    __tablename__ = "ExerciceMuscle"
+    id_exercice = Column(Integer, ForeignKey('Exercice.id_exercice', ondelete='CASCADE'), primary_key=True)
+    id_muscle = Column(Integer, ForeignKey('Muscle.id_muscle', ondelete='CASCADE'), primary_key=True, index=True)
 
 class PlanningRepas(Base):
     __tablename__ = "PlanningRepas"
+    __table_args__ = (
+        # GET /calendar?from=&to= et génération de la semaine : plage de jours d'un utilisateur
+        Index("ix_PlanningRepas_user_jour", "id_utilisateur", "jour"),
+    )
     id_planning_repas = Column(Integer, primary_key=True, index=True)
     id_utilisateur = Column(Integer, nullable=False, index=True)
     id_recette = Column(Integer, nullable=False, index=True)
-    jour = Column(String(20), nullable=False)
+    jour = Column(Date, nullable=False)  # ancien VARCHAR(20) "2026-01-22", converti par la migration 0010
     repas = Column(String(20), nullable=False) 
     date_creation = Column(DateTime, default=datetime.utcnow)
     heure_debut = Column(Time, nullable=True)
     notes = Column(Text, nullable=True)
+    updated_at = Column(UpdatedAt, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class PlanningSeance(Base):
     __tablename__ = "PlanningSeance"
+    __table_args__ = (
+        Index("ix_PlanningSeance_user_jour", "id_utilisateur", "jour"),
+    )
     id_planning_seance = Column(Integer, primary_key=True, index=True)
     id_utilisateur = Column(Integer, nullable=False, index=True)
     id_seance = Column(Integer, nullable=False, index=True) 
@@ -78,17 +146,41 @@ class PlanningSeance(Base):
     # Vous avez dit avoir 'date_creation' dans PlanningSeance, on le garde donc ici
     date_creation = Column(DateTime, default=datetime.utcnow)
     notes = Column(Text, nullable=True)
+    updated_at = Column(UpdatedAt, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Pas de clé étrangère en base : jointure déclarée ici, chargée seulement sur demande
+    # (selectinload, GET /calendar?expand=seance) ; un accès non préchargé lève une erreur
+    seance = relationship(
+        "Seance",
+        primaryjoin="foreign(PlanningSeance.id_seance) == Seance.id_seance",
+        viewonly=True,
+        lazy="raise",
+    )
     
     # SUPPRIMÉS DU MODÈLE : ordre, series, repetitions, poids_kg, repos_secondes
 
 class Seance(Base):
     __tablename__ = "Seance"
+    __table_args__ = (
+        # Modèles de séance générés : un contenu (nom, durée, exercices) = une ligne
+        Index("ix_Seance_signature", "signature", unique=True),
+    )
     id_seance = Column(Integer, primary_key=True, index=True)
     id_calendrier = Column(Integer, nullable=True)
     
     # STRICTEMENT VOS COLONNES
     nom = Column(String(100), nullable=False)
     duree = Column(Integer, nullable=True)
+    # sha256 du contenu (exercice_controller.seance_signature) ; NULL pour les séances non générées
+    signature = Column(String(64), nullable=True)
+
+    exercices = relationship(
+        "SeanceExercice",
+        primaryjoin="foreign(SeanceExercice.id_seance) == Seance.id_seance",
+        order_by="(SeanceExercice.ordre, SeanceExercice.id)",
+        viewonly=True,
+        lazy="raise",
+    )
 
 class SeanceExercice(Base):
     __tablename__ = "SeanceExercice"
@@ -102,6 +194,13 @@ class SeanceExercice(Base):
     repetitions = Column(Integer, default=12)
     temps_recuperation = Column(Integer, default=60)
 
+    exercice = relationship(
+        "Exercice",
+        primaryjoin="foreign(SeanceExercice.id_exercice) == Exercice.id_exercice",
+        viewonly=True,
+        lazy="raise",
+    )
+
 class Favoris(Base):
     __tablename__ = "Favoris"
     id_utilisateur = Column(Integer, ForeignKey('Utilisateur.id_utilisateur'), primary_key=True)
@@ -128,4 +227,33 @@ class SharedRecipe(Base):
     sender_id = Column(Integer, ForeignKey('Utilisateur.id_utilisateur', ondelete='CASCADE'), nullable=False)
     receiver_id = Column(Integer, ForeignKey('Utilisateur.id_utilisateur', ondelete='CASCADE'), nullable=False)
     recipe_id = Column(Integer, ForeignKey('Recette.id_recette', ondelete='CASCADE'), nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ChatMessage(Base):
+    # Mémoire du coach : questions / réponses finales (pas les appels d'outils), par paires user -> model
+    __tablename__ = "ChatMessage"
+    __table_args__ = (Index("ix_ChatMessage_user_id", "id_utilisateur", "id"),)
+    id = Column(Integer, primary_key=True, index=True)
+    id_utilisateur = Column(Integer, ForeignKey('Utilisateur.id_utilisateur', ondelete='CASCADE'), nullable=False)
+    role = Column(Enum('user', 'model', name='chat_role_enum'), nullable=False)
+    contenu = Column(Text, nullable=False)
+    nb_tokens = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ChatSummary(Base):
+    # Résumé glissant des messages les plus anciens (ceux d'id <= id_dernier_message, supprimés)
+    __tablename__ = "ChatSummary"
+    id_utilisateur = Column(Integer, ForeignKey('Utilisateur.id_utilisateur', ondelete='CASCADE'), primary_key=True)
+    resume = Column(Text, nullable=False)
+    nb_tokens = Column(Integer, nullable=False, default=0)
+    id_dernier_message = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class CatalogChange(Base):
+    # Journal des écritures sur le catalogue (recettes, exercices), relu par chaque worker pour
+    # invalider ses caches (utils.catalog_cache) ; l'id de la dernière ligne sert de version
+    __tablename__ = "CatalogChange"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    domaine = Column(String(20), nullable=False)
+    id_objet = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -68,6 +68,8 @@ class Ingredient(BaseModel):
     measure: Optional[str] = None
     quantity: Optional[float] = None
 
+    model_config = ConfigDict(from_attributes=True)
+
 class RecetteBase(BaseModel):
     nom_recette: str
     description: Optional[str] = None
@@ -86,6 +88,8 @@ class RecetteBase(BaseModel):
     @field_validator('ingredients', mode='before')
     @classmethod
     def parse_ingredients(cls, v):
+        # Ancien format (JSON dans une colonne TEXT) ; les recettes lues en base
+        # arrivent désormais sous forme de lignes RecetteIngredient
         if isinstance(v, str):
             try:
                 return json.loads(v)
@@ -101,6 +105,27 @@ class Recette(RecetteBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+class RecetteSearchHit(Recette):
+    score: float
+
+class RecetteFilters(BaseModel):
+    """Filtres de GET /recettes (paramètres de requête), appliqués en SQL."""
+    cal_min: Optional[int] = None
+    cal_max: Optional[int] = None
+    prot_min: Optional[float] = None
+    prot_max: Optional[float] = None
+    gluc_min: Optional[float] = None
+    gluc_max: Optional[float] = None
+    lip_min: Optional[float] = None
+    lip_max: Optional[float] = None
+    categorie: Optional[str] = None
+    tags: Optional[str] = None        # "Vegan,Facile" : la recette doit avoir tous ces tags (noms exacts)
+    ingredient: Optional[str] = None  # préfixe du nom d'un ingrédient
+
+class TagCount(BaseModel):
+    nom: str
+    nb_recettes: int
+
 
 # --- Schémas Exercices ---
 
@@ -125,7 +150,7 @@ class Exercice(ExerciceBase):
 
 class PlanningRepasBase(BaseModel):
     id_recette: int
-    jour: str  # Format: 2026-01-22
+    jour: date  # Format: 2026-01-22
     repas: str  # petit-dej, dejeuner, diner, collation
     notes: Optional[str] = None
     heure_debut: Optional[time] = None
@@ -143,7 +168,7 @@ class PlanningRepas(PlanningRepasBase):
 
 class PlanningSeanceBase(BaseModel):
     id_seance: int
-    jour: str  # Format: 2026-01-22
+    jour: date  # Format: 2026-01-22
     notes: Optional[str] = None
     est_realise: Optional[bool] = False
 
@@ -158,8 +183,38 @@ class PlanningSeance(PlanningSeanceBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+# --- Calendrier détaillé (?expand=recette,seance) ---
+
+class SeanceExerciceDetail(BaseModel):
+    id_exercice: int
+    ordre: Optional[int] = None
+    series: Optional[int] = None
+    repetitions: Optional[int] = None
+    temps_recuperation: Optional[int] = None
+    exercice: Optional[Exercice] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SeanceDetail(BaseModel):
+    id_seance: int
+    nom: str
+    duree: Optional[int] = None
+    exercices: List[SeanceExerciceDetail] = []  # dans l'ordre de la séance
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PlanningRepasDetail(PlanningRepas):
+    recette: Optional[Recette] = None  # avec ?expand=recette
+
+
+class PlanningSeanceDetail(PlanningSeance):
+    seance: Optional[SeanceDetail] = None  # avec ?expand=seance
+
+
 class CalendarDay(BaseModel):
-    jour: str
+    jour: date
     repas: List[PlanningRepas] = []
     seances: List[PlanningSeance] = []
 
@@ -174,6 +229,37 @@ class Calendar(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class CalendarDayDetail(CalendarDay):
+    repas: List[PlanningRepasDetail] = []
+    seances: List[PlanningSeanceDetail] = []
+
+
+class CalendarDetail(Calendar):
+    repas: List[PlanningRepasDetail] = []
+    seances: List[PlanningSeanceDetail] = []
+
+
+class PlanningBatchRequest(BaseModel):
+    start_date: Optional[date] = None  # défaut : lundi prochain (ou aujourd'hui si lundi)
+    user_ids: Optional[List[int]] = None  # défaut : tous les utilisateurs
+    include_meals: bool = True
+    include_sport: bool = True
+
+
+class PlanningBatchStats(BaseModel):
+    start_date: str
+    users: int
+    chunks: int
+    workers: int
+    meals: int
+    seances: int
+    load_s: float
+    compute_s: float
+    write_s: float
+    elapsed_s: float
+    users_per_second: Optional[float] = None
+
+
 # --- Schémas pour les Favoris ---
 
 class FavoriteBase(BaseModel):
@@ -255,3 +341,17 @@ class FriendProfileResponse(BaseModel):
     programmes_actifs: List[dict] = [] # on pourrait mettre PlanningSeance, etc.
 
     model_config = ConfigDict(from_attributes=True)
+
+
+# --- Schémas Chat (mémoire du coach) ---
+
+class ChatHistoryMessage(BaseModel):
+    role: str
+    contenu: str
+    created_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class ChatHistory(BaseModel):
+    resume: Optional[str] = None
+    messages: List[ChatHistoryMessage] = []
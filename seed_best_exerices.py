@@ -2,6 +2,7 @@ import requests
 import json
 from database import SessionLocal
 from models import Exercice
+from controllers.exercice_controller import sync_muscles
 
 # --- 1. CONFIGURATION ---
 DATASET_URL = "https://raw.githubusercontent.com/yuhonas/free-exercise-db/main/dist/exercises.json"
@@ -99,11 +100,13 @@ def run_seed():
                     nom_exercice=original_name,
                     description_exercice=f"Instructions : {', '.join(item.get('instructions', []))[:600]}",
                     type_exercice=map_type(item.get("mechanic")),
-                    muscle_cible=targets_fr,
+                    muscle_cible=", ".join(targets_fr),
                     materiel=map_materiel(item.get("equipment")),
                     image_path=full_image_url
                 )
                 db.add(new_exo)
+                db.flush()
+                sync_muscles(db, new_exo.id_exercice, new_exo.muscle_cible)
                 count += 1
                 print(f"✅ Ajouté : {original_name}")
 
@@ -0,0 +1,177 @@
+"""
+Tests du cache du catalogue (utils/catalog_cache.py) : journal CatalogChange vu par un worker
+et jetons de génération de CatalogCache. Base SQLite en mémoire, sans serveur MySQL.
+
+    python -m pytest -q test_catalog_cache.py
+"""
+from collections import namedtuple
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from models import CatalogChange
+from utils.catalog_cache import CatalogCache, ChangeFeed, Record
+
+Row = namedtuple("Row", "id domaine id_objet")
+
+
+class Handler:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, ids):
+        self.calls.append(ids)
+
+
+@pytest.fixture
+def feed():
+    feed = ChangeFeed(interval=0, keep=1000)
+    feed.version = 0
+    return feed
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    CatalogChange.__table__.create(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def _rows(*ids, domaine="recettes"):
+    return [Row(i, domaine, 100 + i) for i in ids]
+
+
+def test_apply_groups_ids_by_domain(feed):
+    recettes, exercices = Handler(), Handler()
+    feed.subscribe("recettes", recettes)
+    feed.subscribe("exercices", exercices)
+
+    feed._apply(_rows(1, 2) + _rows(3, domaine="exercices"))
+
+    assert recettes.calls == [{101, 102}]
+    assert exercices.calls == [{103}]
+    assert feed.version == 3
+
+
+def test_lookback_rows_are_delivered_once(feed):
+    handler = Handler()
+    feed.subscribe("recettes", handler)
+
+    feed._apply(_rows(1, 2, 3))
+    # Relecture des LOOKBACK dernières lignes : seules les nouvelles sont transmises
+    feed._apply(_rows(1, 2, 3, 4))
+
+    assert handler.calls == [{101, 102, 103}, {104}]
+    assert feed.changes == 4
+
+
+def test_late_commit_below_version_is_not_lost(feed):
+    handler = Handler()
+    feed.subscribe("recettes", handler)
+
+    # L'id 2 est attribué avant l'id 3 mais validé après : absent de la première lecture
+    feed._apply(_rows(1, 3))
+    feed._apply(_rows(1, 2, 3))
+
+    assert handler.calls == [{101, 103}, {102}]
+    assert feed.version == 3
+
+
+def test_seen_is_pruned_beyond_lookback(feed):
+    feed._apply(_rows(*range(1, ChangeFeed.LOOKBACK + 51)))
+
+    # Seuls les ids encore relus (LOOKBACK dernières lignes) restent en mémoire
+    assert feed._seen == set(range(feed.version - ChangeFeed.LOOKBACK + 1, feed.version + 1))
+
+
+def test_overflow_asks_every_handler_for_full_reload():
+    feed = ChangeFeed(interval=0, keep=3)
+    feed.version = 0
+    recettes, exercices = Handler(), Handler()
+    feed.subscribe("recettes", recettes)
+    feed.subscribe("exercices", exercices)
+
+    # Plus de `keep` lignes depuis la dernière lecture : le journal a pu être élagué
+    feed._apply(_rows(5, 6, 7))
+
+    assert recettes.calls == [None]
+    assert exercices.calls == [None]
+    assert feed.full_reloads == 1
+    assert feed.version == 7
+
+
+def test_record_marks_own_writes_as_seen(feed, db):
+    handler = Handler()
+    feed.subscribe("recettes", handler)
+
+    feed.record(db, "recettes", [42])
+    db.commit()
+    feed.sync(db)
+
+    # Écriture déjà appliquée localement : ignorée au sync, mais la version avance
+    assert handler.calls == []
+    assert feed.version == 1
+
+
+def test_sync_delivers_other_workers_writes(feed, db):
+    handler = Handler()
+    feed.subscribe("recettes", handler)
+
+    feed.record(db, "recettes", [1])
+    db.execute(insert(CatalogChange), [{"domaine": "recettes", "id_objet": 2}])
+    db.commit()
+    feed.sync(db)
+
+    assert handler.calls == [{2}]
+    assert feed.version == 2
+
+
+def test_record_prunes_journal_beyond_keep(db):
+    feed = ChangeFeed(interval=0, keep=2)
+    for i in range(5):
+        feed.record(db, "recettes", [i])
+    db.commit()
+
+    assert [c.id for c in db.query(CatalogChange).order_by(CatalogChange.id)] == [4, 5]
+
+
+class ItemRecord(Record):
+    __slots__ = ("id", "nom")
+
+
+def test_cache_keeps_load_started_after_invalidation():
+    cache = CatalogCache("test")
+    found, missing, token = cache.lookup([1])
+    assert (found, missing) == ({}, [1])
+
+    cache.put({1: ItemRecord(id=1, nom="a")}, token)
+
+    assert cache.lookup([1])[0][1].nom == "a"
+
+
+def test_cache_drops_load_racing_an_invalidation():
+    cache = CatalogCache("test")
+    _, _, token = cache.lookup([1])
+
+    # Écriture validée pendant la lecture : la ligne lue est peut-être déjà périmée
+    cache.invalidate([1])
+    cache.put({1: ItemRecord(id=1, nom="ancien")}, token)
+
+    assert cache.lookup([1])[1] == [1]
+
+
+def test_cache_expires_after_ttl():
+    cache = CatalogCache("test", ttl=-1)
+    _, _, token = cache.lookup([1])
+    cache.put({1: ItemRecord(id=1, nom="a")}, token)
+
+    assert cache.lookup([1])[1] == [1]
+
+
+def test_record_is_read_only():
+    record = ItemRecord(id=1, nom="a")
+    with pytest.raises(AttributeError):
+        record.nom = "b"
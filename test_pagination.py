@@ -0,0 +1,103 @@
+"""
+Tests de la pagination par curseur (utils/pagination.py) : parcours complet page par page,
+valeurs NULL en ASC et en DESC, curseurs invalides. Base SQLite en mémoire (même ordre des
+NULL que MySQL : en premier en ASC, en dernier en DESC).
+
+    python -m pytest -q test_pagination.py
+"""
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, select
+
+from utils.pagination import InvalidCursor, decode_cursor, encode_cursor, keyset, next_cursor, parse_sort
+
+metadata = MetaData()
+items = Table(
+    "items", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("calories", Integer, nullable=True),
+)
+SORTS = {"id": None, "calories": items.c.calories}
+
+# NULL et valeurs en double, pour que l'id départage les lignes
+CALORIES = [300, None, 100, 300, None, 200, 100, None, 300, 200, None]
+
+
+@pytest.fixture(scope="module")
+def conn():
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    with engine.connect() as conn:
+        conn.execute(items.insert(), [{"id": i, "calories": c} for i, c in enumerate(CALORIES, start=1)])
+        yield conn
+
+
+def _expected(sort: str) -> list:
+    rows = list(enumerate(CALORIES, start=1))
+    if sort == "id":
+        return [i for i, _ in rows]
+    if sort == "-id":
+        return [i for i, _ in reversed(rows)]
+    # NULL en premier en ASC ; l'ordre DESC est l'exact inverse
+    ordered = sorted(rows, key=lambda r: (r[1] is not None, r[1] or 0, r[0]))
+    ids = [i for i, _ in ordered]
+    return ids if sort == "calories" else ids[::-1]
+
+
+def _walk(conn, sort: str, limit: int) -> list:
+    sort_column, descending = parse_sort(sort, SORTS)
+    seen, cursor = [], None
+    while True:
+        after = decode_cursor(cursor, sort) if cursor else None
+        stmt = keyset(select(items), items.c.id, sort_column, descending, after).limit(limit)
+        rows = conn.execute(stmt).all()
+        seen += [row.id for row in rows]
+        cursor = next_cursor(rows, limit, sort, items.c.id, sort_column)
+        if cursor is None:
+            return seen
+
+
+@pytest.mark.parametrize("sort", ["id", "-id", "calories", "-calories"])
+@pytest.mark.parametrize("limit", [1, 2, 3, 4, 20])
+def test_pages_cover_every_row_once_in_order(conn, sort, limit):
+    assert _walk(conn, sort, limit) == _expected(sort)
+
+
+def test_null_rows_come_first_ascending(conn):
+    sort_column, descending = parse_sort("calories", SORTS)
+    first = conn.execute(keyset(select(items), items.c.id, sort_column, descending).limit(4)).all()
+
+    assert [row.calories for row in first] == [None] * 4
+
+
+def test_cursor_inside_null_rows_descending(conn):
+    sort_column, descending = parse_sort("-calories", SORTS)
+    after = decode_cursor(encode_cursor("-calories", [None, 8]), "-calories")
+    rows = conn.execute(keyset(select(items), items.c.id, sort_column, descending, after)).all()
+
+    # Après (NULL, 8) en DESC : seules les lignes NULL d'id inférieur restent
+    assert [row.id for row in rows] == [5, 2]
+
+
+def test_cursor_from_another_sort_is_rejected():
+    cursor = encode_cursor("calories", [100, 3])
+
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, "-calories")
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, "id")
+
+
+@pytest.mark.parametrize("cursor", ["", "pas-un-curseur", encode_cursor("calories", [])])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, "calories")
+
+
+def test_cursor_with_wrong_arity_is_rejected():
+    with pytest.raises(InvalidCursor):
+        keyset(select(items), items.c.id, items.c.calories, after=[3])
+
+
+def test_unknown_sort_is_rejected():
+    with pytest.raises(InvalidCursor):
+        parse_sort("-lipides", SORTS)
@@ -0,0 +1,20 @@
+from sqlalchemy import insert
+
+# =============================================================================
+# INSERTIONS EN MASSE (INSERT ... VALUES (...), (...) par lot)
+# =============================================================================
+# Les lignes sont passées en executemany : la requête n'est compilée qu'une fois et
+# PyMySQL la réécrit en INSERT à valeurs multiples (une requête réseau par lot).
+# insert().values([...]) compilerait un texte SQL différent à chaque appel, ce qui
+# devient plus coûteux que l'écriture elle-même au-delà de quelques centaines de lignes.
+
+BULK_CHUNK_SIZE = 1000
+
+
+def bulk_insert(db, model, rows: list, chunk_size: int = BULK_CHUNK_SIZE) -> int:
+    """Insère rows ([dict]) par lots de chunk_size lignes, dans la transaction de `db`."""
+    table = model.__table__
+    for start in range(0, len(rows), chunk_size):
+        db.execute(insert(table), rows[start:start + chunk_size])
+    return len(rows)
+
@@ -0,0 +1,259 @@
+import os
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import delete, func, select
+
+from models import CatalogChange
+
+# =============================================================================
+# CACHE DU CATALOGUE (recettes, exercices) PARTAGÉ ENTRE LES REQUÊTES D'UN WORKER
+# =============================================================================
+# Les recettes et exercices ne changent que par les routes admin. Chaque worker garde en
+# mémoire une copie en lecture seule des lignes déjà lues (Record), servie sans requête.
+# Invalidation entre workers : chaque écriture ajoute (domaine, id) au journal CatalogChange
+# dans sa transaction ; les workers relisent le journal au-delà de la dernière ligne vue
+# (sa clé primaire sert de numéro de version) et ne rechargent que les ids modifiés.
+#
+# Les structures dérivées du catalogue (index de recherche des recettes, catalogue indexé des
+# exercices) suivent le même cycle : construites au premier appel, tenues à jour par les
+# create/update/delete du worker, les ids signalés par le journal (ChangeFeed.subscribe) étant
+# rechargés un à un. Une reconstruction complète après leur TTL rattrape les écritures faites
+# hors de l'API (scripts d'import, migrations).
+
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "3600"))
+CATALOG_SYNC_INTERVAL = float(os.getenv("CATALOG_SYNC_INTERVAL_SECONDS", "1"))
+CATALOG_CHANGES_KEEP = int(os.getenv("CATALOG_CHANGES_KEEP", "10000"))
+
+
+class Record:
+    """
+    Copie immuable d'une ligne : __slots__ (pas de __dict__, pas d'état de session SQLAlchemy),
+    partagée entre threads. Une modification remplace l'enregistrement, elle ne le modifie pas.
+    Les sous-classes déclarent __slots__ = (noms des champs).
+    """
+
+    __slots__ = ()
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values.get(name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} est en lecture seule")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} est en lecture seule")
+
+    def __repr__(self):
+        return f"{type(self).__name__}({getattr(self, self.__slots__[0])!r})"
+
+    @classmethod
+    def from_row(cls, row, **values):
+        """Copie les attributs de `row` (objet ORM ou Row) ; `values` complète ou remplace."""
+        return cls(**{name: getattr(row, name) for name in cls.__slots__ if name not in values}, **values)
+
+
+class CatalogCache:
+    """
+    Cache read-through id -> Record, sans limite de taille (données de référence).
+
+    lookup() rend ce qui est en mémoire et les ids à charger ; l'appelant les lit en une
+    requête puis les ajoute avec put(). Un chargement commencé avant une invalidation n'est
+    pas conservé (jeton de génération). Tout est vidé après `ttl` secondes, pour les écritures
+    faites hors de l'API (scripts d'import, migrations).
+    """
+
+    def __init__(self, name: str, ttl: float = CATALOG_CACHE_TTL):
+        self.name = name
+        self.ttl = ttl
+        self._records = {}
+        self._generation = 0
+        self._loaded_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._records)
+
+    def lookup(self, ids) -> tuple:
+        """Retourne ({id: record} en mémoire, [ids manquants], jeton à passer à put())."""
+        found, missing = {}, []
+        with self._lock:
+            if time.monotonic() - self._loaded_at > self.ttl:
+                self._clear_unlocked()
+            for i in ids:
+                record = self._records.get(i)
+                if record is None:
+                    missing.append(i)
+                else:
+                    found[i] = record
+            self.hits += len(found)
+            self.misses += len(missing)
+            return found, missing, self._generation
+
+    def put(self, records: dict, token: int):
+        with self._lock:
+            if token == self._generation:
+                self._records.update(records)
+
+    def invalidate(self, ids=None):
+        """Retire `ids` (None : tout) ; les chargements en cours ne seront pas conservés."""
+        with self._lock:
+            self._generation += 1
+            if ids is None:
+                self._clear_unlocked()
+                return
+            for i in ids:
+                if self._records.pop(i, None) is not None:
+                    self.invalidations += 1
+
+    def _clear_unlocked(self):
+        self.invalidations += len(self._records)
+        self._records.clear()
+        self._generation += 1
+        self._loaded_at = time.monotonic()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._records),
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else None,
+                "invalidations": self.invalidations,
+            }
+
+
+class ChangeFeed:
+    """
+    Journal CatalogChange vu par un worker.
+
+    - record() : à appeler dans la transaction de l'écriture, avant le commit
+    - sync() : au plus toutes les `interval` secondes, une requête sur la clé primaire
+      (vide la plupart du temps) ; les abonnés du domaine reçoivent les ids modifiés, ou None
+      s'il faut tout recharger (journal élagué depuis la dernière lecture)
+    - version : id de la dernière ligne vue par ce worker
+    Les écritures faites par ce worker sont déjà appliquées localement : elles sont ignorées.
+    Les ids sont attribués avant le commit : une ligne peut apparaître après une ligne plus
+    récente. Les LOOKBACK dernières lignes sont donc relues, celles déjà vues sont ignorées.
+    """
+
+    LOOKBACK = 100
+
+    def __init__(self, interval: float = CATALOG_SYNC_INTERVAL, keep: int = CATALOG_CHANGES_KEEP):
+        self.interval = interval
+        self.keep = keep
+        self.version = None
+        self._checked_at = 0.0
+        self._handlers = defaultdict(list)
+        self._seen = set()  # ids des LOOKBACK dernières lignes déjà appliquées (ou écrites ici)
+        self._seen_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.changes = 0
+        self.full_reloads = 0
+        self.errors = 0
+
+    def subscribe(self, domain: str, handler):
+        """handler(ids | None), appelé sans accès à la base : invalider, marquer à recharger."""
+        self._handlers[domain].append(handler)
+
+    def record(self, db, domain: str, ids):
+        changes = [CatalogChange(domaine=domain, id_objet=i) for i in ids]
+        if not changes:
+            return
+        db.add_all(changes)
+        db.flush()
+        last = max(c.id for c in changes)
+        with self._seen_lock:
+            self._seen.update(c.id for c in changes)
+        # Prochain sync() sans attendre `interval` : version passe au-delà de cette écriture (ETag)
+        self._checked_at = 0.0
+        # Journal borné : un worker en retard de plus de `keep` lignes recharge tout
+        if last > self.keep:
+            db.execute(delete(CatalogChange).where(CatalogChange.id <= last - self.keep))
+
+    def _due(self) -> bool:
+        return time.monotonic() - self._checked_at >= self.interval
+
+    def _changes_stmt(self):
+        return (
+            select(CatalogChange.id, CatalogChange.domaine, CatalogChange.id_objet)
+            .where(CatalogChange.id > self.version - self.LOOKBACK)
+            .order_by(CatalogChange.id)
+            .limit(self.keep + self.LOOKBACK)
+        )
+
+    def sync(self, db):
+        # Une seule vérification à la fois : les autres requêtes ne l'attendent pas
+        if not self._due() or not self._lock.acquire(blocking=False):
+            return
+        try:
+            if self.version is None:
+                self.version = db.scalar(select(func.max(CatalogChange.id))) or 0
+            else:
+                self._apply(db.execute(self._changes_stmt()).all())
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ Journal du catalogue illisible (migration 0008 appliquée ?) : {e}")
+        finally:
+            self._checked_at = time.monotonic()
+            self._lock.release()
+
+    async def sync_async(self, db):
+        if not self._due() or not self._lock.acquire(blocking=False):
+            return
+        try:
+            if self.version is None:
+                self.version = (await db.scalar(select(func.max(CatalogChange.id)))) or 0
+            else:
+                self._apply((await db.execute(self._changes_stmt())).all())
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ Journal du catalogue illisible (migration 0008 appliquée ?) : {e}")
+        finally:
+            self._checked_at = time.monotonic()
+            self._lock.release()
+
+    def _apply(self, rows):
+        self.checks += 1
+        last = max(self.version, rows[-1].id) if rows else self.version
+        with self._seen_lock:
+            fresh = [row for row in rows if row.id not in self._seen]
+            self._seen.update(row.id for row in fresh)
+            self._seen = {i for i in self._seen if i > last - self.LOOKBACK}
+        # Lignes élaguées entre deux lectures, ou plus de `keep` changements en attente
+        overflow = len(rows) >= self.keep + self.LOOKBACK or last - self.keep > self.version
+        self.version = last
+        self.changes += len(fresh)
+        if overflow:
+            self.full_reloads += 1
+            for handlers in self._handlers.values():
+                for handler in handlers:
+                    handler(None)
+            return
+        per_domain = defaultdict(set)
+        for row in fresh:
+            per_domain[row.domaine].add(row.id_objet)
+        for domain, ids in per_domain.items():
+            for handler in self._handlers.get(domain, ()):
+                handler(ids)
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "sync_interval_seconds": self.interval,
+            "checks": self.checks,
+            "changes_seen": self.changes,
+            "full_reloads": self.full_reloads,
+            "errors": self.errors,
+        }
+
+
+catalog_changes = ChangeFeed()
@@ -0,0 +1,28 @@
+import threading
+from collections import defaultdict
+
+
+class DataVersions:
+    """
+    Compteurs de version par domaine de données, incrémentés à chaque écriture :
+    "exercices", "recettes" (catalogues partagés), "user:<id>", "planning:<id>" (par utilisateur).
+
+    Un cache dont la clé inclut ces versions est invalidé dès l'écriture suivante, sans être
+    parcouru (les anciennes entrées sortent par LRU / TTL). Compteurs propres au worker :
+    les écritures faites par un autre worker ne sont vues qu'à l'expiration de la TTL.
+    """
+
+    def __init__(self):
+        self._versions = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> int:
+        return self._versions.get(key, 0)
+
+    def bump(self, key: str) -> int:
+        with self._lock:
+            self._versions[key] += 1
+            return self._versions[key]
+
+
+data_versions = DataVersions()
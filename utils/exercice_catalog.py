@@ -0,0 +1,155 @@
+import ast
+import re
+import threading
+import time
+from collections import defaultdict, namedtuple
+
+from utils.search_index import fold
+
+# =============================================================================
+# MUSCLES CIBLÉS (Exercice.muscle_cible -> noms normalisés)
+# =============================================================================
+
+_SEPARATORS_RE = re.compile(r"[,;/|\n]")
+
+
+def _normalize(name) -> str:
+    """' Épaules ' -> 'epaules' (minuscules, sans accents, espaces réduits)."""
+    return " ".join(fold(str(name)).strip(" '\"").split())[:100]
+
+
+def parse_muscles(muscle_cible) -> list:
+    """
+    "Pectoraux, triceps" -> ["pectoraux", "triceps"] (doublons ignorés).
+    Accepte aussi une liste, ou sa représentation Python "['pectoraux', 'triceps']"
+    enregistrée telle quelle par l'ancien script d'import.
+    """
+    if not muscle_cible:
+        return []
+    items = None
+    if isinstance(muscle_cible, (list, tuple)):
+        items = muscle_cible
+    else:
+        text = str(muscle_cible).strip()
+        if text[:1] in "[(":
+            try:
+                value = ast.literal_eval(text)
+            except (ValueError, SyntaxError):
+                value = None
+            if isinstance(value, (list, tuple)):
+                items = value
+        if items is None:
+            items = _SEPARATORS_RE.split(text.strip("[]()"))
+    names = (_normalize(item) for item in items)
+    return list(dict.fromkeys(n for n in names if n))
+
+
+# =============================================================================
+# CATALOGUE EN MÉMOIRE (index par muscle, type et matériel)
+# =============================================================================
+
+CatalogExercice = namedtuple("CatalogExercice", "id_exercice nom_exercice type_exercice materiel muscle_cible muscles")
+
+
+class ExerciceCatalog:
+    """
+    Exercices indexés par muscle, type et matériel, mis à jour incrémentalement.
+
+    - select() part des ensembles d'ids des facettes demandées : le coût dépend du nombre
+      d'exercices retenus, pas de la taille du catalogue ; le résultat (trié par id) est
+      mémorisé jusqu'à la prochaine écriture
+    - un mot-clé de muscle désigne tous les muscles dont le nom le contient
+      ("dos" -> "dos", "lower dos") : seuls les noms de muscles (quelques dizaines) sont parcourus
+    """
+
+    def __init__(self, exercices=()):
+        self._by_id = {}
+        self._by_muscle = defaultdict(set)
+        self._by_type = defaultdict(set)
+        self._by_material = defaultdict(set)
+        self._selections = {}
+        self._lock = threading.RLock()
+        self.built_at = time.monotonic()
+        for exercice in exercices:
+            self.add(exercice)
+
+    def __len__(self):
+        return len(self._by_id)
+
+    # Transmis aux processus de génération en lot : le verrou n'est pas sérialisable
+    def __getstate__(self):
+        return {"exercices": list(self._by_id.values()), "built_at": self.built_at}
+
+    def __setstate__(self, state):
+        self.__init__(state["exercices"])
+        self.built_at = state["built_at"]
+
+    def get(self, id_exercice: int):
+        return self._by_id.get(id_exercice)
+
+    def all(self) -> list:
+        """Tous les exercices, par id."""
+        with self._lock:
+            return [self._by_id[i] for i in sorted(self._by_id)]
+
+    def add(self, exercice: CatalogExercice):
+        """Ajoute (ou remplace) un exercice."""
+        with self._lock:
+            self._remove_unlocked(exercice.id_exercice)
+            self._by_id[exercice.id_exercice] = exercice
+            for muscle in exercice.muscles:
+                self._by_muscle[muscle].add(exercice.id_exercice)
+            self._by_type[_normalize(exercice.type_exercice or "")].add(exercice.id_exercice)
+            self._by_material[exercice.materiel].add(exercice.id_exercice)
+            self._selections.clear()
+
+    def remove(self, id_exercice: int):
+        with self._lock:
+            self._remove_unlocked(id_exercice)
+            self._selections.clear()
+
+    def _remove_unlocked(self, id_exercice: int):
+        exercice = self._by_id.pop(id_exercice, None)
+        if exercice is None:
+            return
+        facets = [(self._by_muscle, m) for m in exercice.muscles]
+        facets.append((self._by_type, _normalize(exercice.type_exercice or "")))
+        facets.append((self._by_material, exercice.materiel))
+        for index, key in facets:
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(id_exercice)
+                if not ids:
+                    del index[key]
+
+    def muscles(self) -> list:
+        return sorted(self._by_muscle)
+
+    def _matching_muscles(self, keywords) -> list:
+        keys = [_normalize(k) for k in keywords]
+        return [m for m in self._by_muscle if any(k and k in m for k in keys)]
+
+    def select(self, materials, muscles=None, types=None) -> tuple:
+        """
+        Exercices réalisables avec `materials`, triés par id (à ne pas modifier : partagés).
+        muscles (mots-clés) / types : ne garde que ceux qui ciblent un de ces muscles OU sont
+        d'un de ces types ; None pour les deux = tout le matériel.
+        """
+        key = (tuple(materials), tuple(muscles) if muscles is not None else None, tuple(types) if types is not None else None)
+        with self._lock:
+            selected = self._selections.get(key)
+            if selected is not None:
+                return selected
+            if muscles is None and types is None:
+                ids = set().union(*(self._by_material.get(m, ()) for m in materials))
+            else:
+                wanted = set()
+                for muscle in self._matching_muscles(muscles or ()):
+                    wanted |= self._by_muscle[muscle]
+                for t in types or ():
+                    wanted |= self._by_type.get(_normalize(t), set())
+                allowed = set(materials)
+                ids = {i for i in wanted if self._by_id[i].materiel in allowed}
+            selected = tuple(self._by_id[i] for i in sorted(ids))
+            self._selections[key] = selected
+            return selected
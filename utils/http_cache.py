@@ -0,0 +1,91 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+
+# =============================================================================
+# REQUÊTES CONDITIONNELLES (ETag / Last-Modified -> 304 Not Modified)
+# =============================================================================
+# L'ETag est l'empreinte des versions des lignes qui composent la réponse (ids, updated_at,
+# nombre de lignes), pas du corps : une revalidation ne sérialise rien, et sur /calendar ne
+# lit même pas les lignes. Le client renvoie l'ETag dans If-None-Match ; s'il correspond,
+# la réponse est un 304 sans corps.
+
+# Catalogue (identique pour tous) : réutilisable une minute sans revalidation
+CATALOG_CACHE_CONTROL = os.getenv("HTTP_CATALOG_CACHE_CONTROL", "private, max-age=60")
+# Données d'un utilisateur (calendrier, favoris) : revalidées à chaque affichage
+USER_CACHE_CONTROL = os.getenv("HTTP_USER_CACHE_CONTROL", "private, no-cache")
+
+# À incrémenter quand le format d'une réponse change : les ETags déjà distribués expirent
+REPRESENTATION_VERSION = 1
+
+
+def make_etag(*parts) -> str:
+    """ETag fort à partir des valeurs qui déterminent la réponse (versions, paramètres)."""
+    digest = hashlib.blake2b(repr((REPRESENTATION_VERSION,) + parts).encode(), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def rows_version(rows, id_attr: str) -> tuple:
+    """Version d'une liste de lignes (ORM ou Record) : ((id, updated_at), ...) dans l'ordre."""
+    return tuple((getattr(row, id_attr), getattr(row, "updated_at", None)) for row in rows)
+
+
+def last_modified(rows):
+    """Plus récent updated_at de `rows` (None si aucun)."""
+    return max((row.updated_at for row in rows if getattr(row, "updated_at", None)), default=None)
+
+
+def _http_date(value: datetime) -> str:
+    # Les colonnes DateTime sont naïves, en UTC (datetime.utcnow)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # If-None-Match se compare en mode faible : W/"x" correspond à "x"
+    if header.strip() == "*":
+        return True
+    candidates = (c.strip() for c in header.split(","))
+    return any((c[2:] if c.startswith("W/") else c) == etag for c in candidates)
+
+
+def _not_modified_since(header: str, modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if modified.tzinfo is None:
+        modified = modified.replace(tzinfo=timezone.utc)
+    return modified.replace(microsecond=0) <= since
+
+
+def conditional(request: Request, response: Response, etag: str, modified: datetime = None,
+                cache_control: str = USER_CACHE_CONTROL, exact_date: bool = True):
+    """
+    Pose ETag / Last-Modified / Cache-Control sur `response` et retourne une réponse 304 à
+    renvoyer telle quelle si la copie du client est à jour, sinon None.
+
+    If-Modified-Since n'est évalué qu'en l'absence de If-None-Match, et seulement si
+    exact_date : pour une liste, le plus récent updated_at ne reflète pas une suppression.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Authorization"}
+    if modified is not None:
+        headers["Last-Modified"] = _http_date(modified)
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        fresh = bool(exact_date and modified is not None and if_modified_since
+                     and _not_modified_since(if_modified_since, modified))
+    if fresh:
+        return Response(status_code=304, headers=headers)
+    return None
@@ -0,0 +1,284 @@
+import os
+import threading
+import time
+from datetime import timedelta
+
+# =============================================================================
+# BACKENDS LLM DU COACH
+# =============================================================================
+# chat_controller ne dépend que de cette interface :
+#   backend.start_chat(history) -> session ; session.send(contenu) -> réponse
+#   réponse.stream() : texte en flux ; puis réponse.status / réponse.calls
+# `contenu` est le message de l'utilisateur (str) ou les résultats d'outils [(nom, résultat)].
+# `history` : [{"role": "user" | "model", "parts": [texte]}].
+
+
+class ModelReply:
+    """Un tour du modèle. status : "ok", "empty" (aucune partie), "blocked" (filtre) ou "error"."""
+
+    def __init__(self):
+        self.status = "ok"
+        self.calls = []  # [(nom_outil, args)], connus une fois stream() épuisé
+
+    def stream(self):
+        return iter(())
+
+
+class LLMBackend:
+    name = "base"
+
+    def start_chat(self, history: list):
+        raise NotImplementedError
+
+    def summarize(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    def on_error(self, error: Exception):
+        """Appelé quand un tour échoue (ex. reconstruire un cache distant expiré)."""
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+
+# -----------------------------------------------------------------------------
+# Gemini
+# -----------------------------------------------------------------------------
+
+class _GeminiReply(ModelReply):
+    def __init__(self, response):
+        super().__init__()
+        self._response = response
+
+    def stream(self):
+        for chunk in self._response:
+            if not chunk.candidates:
+                continue
+            for chunk_part in chunk.candidates[0].content.parts:
+                if chunk_part.text:
+                    yield chunk_part.text
+
+        response = self._response
+        if not response.candidates:
+            self.status = "error"
+            return
+        # Protection contre les réponses vides (bug connu Gemini ou Filtre de sécurité)
+        if not response.candidates[0].content.parts:
+            print(f"⚠️ [IA] Réponse vide reçue. Debug Candidate: {response.candidates[0]}")
+            self.status = "blocked" if response.candidates[0].finish_reason == 3 else "empty"  # 3 = SAFETY
+            return
+        for part in response.candidates[0].content.parts:
+            if part.function_call:
+                fc = part.function_call
+                self.calls.append((fc.name, {k: v for k, v in fc.args.items()}))
+
+
+class _GeminiChat:
+    def __init__(self, genai, chat, timeout: float):
+        self._genai = genai
+        self._chat = chat
+        self._request_options = {"timeout": timeout}
+
+    def send(self, content) -> ModelReply:
+        if not isinstance(content, str):
+            content = [
+                self._genai.protos.Part(function_response={"name": name, "response": res})
+                for name, res in content
+            ]
+        # Réponse en flux : le texte est transmis au fur et à mesure de la génération
+        return _GeminiReply(self._chat.send_message(content, stream=True, request_options=self._request_options))
+
+
+class GeminiBackend(LLMBackend):
+    """
+    Modèle Gemini construit une fois par worker.
+
+    Le préfixe statique (prompt système + outils) est identique pour tous les utilisateurs :
+    il peut être mis en cache côté Gemini (context_cache) pour ne plus être refacturé en entier
+    à chaque tour. Le SDK (~1s d'import) n'est chargé qu'au premier message.
+    """
+
+    name = "gemini"
+
+    def __init__(self, model_name: str, system_prompt: str, tools: list, safety_settings: list,
+                 context_cache: bool = False, context_cache_ttl: int = 3600, timeout: float = 60.0):
+        self.model_name = model_name
+        self.system_prompt = system_prompt
+        self.tools = tools
+        self.safety_settings = safety_settings
+        self.context_cache = context_cache
+        self.context_cache_ttl = context_cache_ttl
+        self.timeout = timeout
+        self._genai = None
+        self._model = None
+        self._model_expires_at = 0.0
+        self._summary_model = None
+        self._lock = threading.Lock()
+        self._stats = {"builds": 0, "context_cache": "disabled", "last_error": None}
+
+    def _get_genai(self):
+        if self._genai is None:
+            with self._lock:
+                if self._genai is None:
+                    api_key = os.getenv("GEMINI_API_KEY")
+                    if not api_key:
+                        raise ValueError("La clé API Gemini est manquante dans le fichier .env")
+                    import google.generativeai as genai
+                    genai.configure(api_key=api_key)
+                    self._genai = genai
+        return self._genai
+
+    def _build_model(self):
+        """Retourne (modèle, date d'expiration monotonic). Repli sur le modèle simple si le cache échoue."""
+        genai = self._get_genai()
+        now = time.monotonic()
+        self._stats["builds"] += 1
+
+        if self.context_cache:
+            try:
+                cached = genai.caching.CachedContent.create(
+                    model=self.model_name,
+                    display_name="nutrifit-fitbot",
+                    system_instruction=self.system_prompt,
+                    tools=self.tools,
+                    ttl=timedelta(seconds=self.context_cache_ttl),
+                )
+                model = genai.GenerativeModel.from_cached_content(cached, safety_settings=self.safety_settings)
+                self._stats["context_cache"] = "active"
+                # Renouvelé un peu avant l'expiration côté Gemini
+                return model, now + self.context_cache_ttl * 0.9
+            except Exception as e:
+                # Ex. préfixe sous le minimum de tokens du modèle, ou modèle sans cache : on continue sans
+                print(f"⚠️ Cache de contexte Gemini indisponible, repli sur le prompt complet : {e}")
+                self._stats["context_cache"] = "fallback"
+                self._stats["last_error"] = str(e)
+                retry_at = now + self.context_cache_ttl
+        else:
+            retry_at = float("inf")
+
+        model = genai.GenerativeModel(
+            model_name=self.model_name,
+            tools=self.tools,
+            system_instruction=self.system_prompt,
+            safety_settings=self.safety_settings
+        )
+        return model, retry_at
+
+    def _get_model(self):
+        if self._model is None or time.monotonic() >= self._model_expires_at:
+            genai = self._get_genai()  # hors du verrou du modèle (il prend le même verrou)
+            with self._lock:
+                if self._model is None or time.monotonic() >= self._model_expires_at:
+                    self._model, self._model_expires_at = self._build_model()
+        return self._model
+
+    def start_chat(self, history: list):
+        model = self._get_model()
+        chat = model.start_chat(history=history, enable_automatic_function_calling=False)
+        return _GeminiChat(self._genai, chat, self.timeout)
+
+    def summarize(self, prompt: str) -> str:
+        genai = self._get_genai()
+        if self._summary_model is None:
+            self._summary_model = genai.GenerativeModel(model_name=self.model_name, safety_settings=self.safety_settings)
+        response = self._summary_model.generate_content(prompt, request_options={"timeout": self.timeout})
+        return response.text.strip()
+
+    def on_error(self, error: Exception):
+        # Cache de contexte expiré / supprimé côté Gemini : reconstruit au prochain message
+        if self._stats["context_cache"] == "active" and type(error).__name__ in ("NotFound", "PermissionDenied"):
+            with self._lock:
+                self._model = None
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "model": self.model_name, "loaded": self._model is not None, **self._stats}
+
+
+# -----------------------------------------------------------------------------
+# Faux modèle scripté (tests, CI, benchmarks)
+# -----------------------------------------------------------------------------
+
+class _ScriptedReply(ModelReply):
+    def __init__(self, step, chunk_words: int):
+        super().__init__()
+        self._text = None
+        if isinstance(step, str):
+            self._text = step
+        elif step:
+            self.calls = [(name, dict(args)) for name, args in step]
+        else:
+            self.status = "empty"
+        self._chunk_words = chunk_words
+
+    def stream(self):
+        if not self._text:
+            return
+        words = self._text.split(" ")
+        for i in range(0, len(words), self._chunk_words):
+            yield " ".join(words[i:i + self._chunk_words]) + (" " if i + self._chunk_words < len(words) else "")
+
+
+class _ScriptedChat:
+    def __init__(self, backend, history: list):
+        self._backend = backend
+        self.history = list(history)
+        self._step = 0
+
+    def send(self, content) -> ModelReply:
+        backend = self._backend
+        if isinstance(content, str):
+            self._step = 0  # chaque message de l'utilisateur rejoue le script depuis le début
+            self.history.append({"role": "user", "parts": [content]})
+        else:
+            self.history.append({"role": "user", "parts": [{"function_response": name} for name, _ in content]})
+        step = backend.script[self._step] if self._step < len(backend.script) else None
+        self._step += 1
+        if backend.latency:
+            time.sleep(backend.latency)
+        with backend._lock:
+            backend.rounds += 1
+            backend.calls_emitted += len(step) if isinstance(step, list) else 0
+        return _ScriptedReply(step, backend.chunk_words)
+
+
+class ScriptedBackend(LLMBackend):
+    """
+    Faux modèle déterministe : rejoue un script, sans réseau.
+
+    script : liste des tours du modèle pour chaque message de l'utilisateur ; un tour est soit
+    une liste d'appels d'outils [(nom, args)], soit le texte final. Au-delà du script, le
+    modèle renvoie une réponse vide. latency : durée simulée (s) de chaque tour.
+    """
+
+    name = "scripted"
+
+    def __init__(self, script: list, latency: float = 0.0, chunk_words: int = 4):
+        self.script = script
+        self.latency = latency
+        self.chunk_words = chunk_words
+        self._lock = threading.Lock()
+        self.chats = 0
+        self.rounds = 0
+        self.calls_emitted = 0
+        self.summaries = 0
+
+    def start_chat(self, history: list):
+        with self._lock:
+            self.chats += 1
+        return _ScriptedChat(self, history)
+
+    def summarize(self, prompt: str) -> str:
+        with self._lock:
+            self.summaries += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return " ".join(prompt.split()[-60:])
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "latency_seconds": self.latency,
+            "chats": self.chats,
+            "rounds": self.rounds,
+            "tool_calls": self.calls_emitted,
+            "summaries": self.summaries,
+        }
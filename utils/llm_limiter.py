@@ -0,0 +1,147 @@
+import asyncio
+import functools
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LLMBusy(Exception):
+    """File d'attente pleine / quota utilisateur atteint : à traduire en 429 + Retry-After."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMTimeout(Exception):
+    pass
+
+
+class LLMLimiter:
+    """
+    Ordonnanceur des appels LLM d'un worker, isolé du threadpool des routes CRUD.
+
+    - max_concurrency appels simultanés, exécutés dans un pool de threads dédié
+    - au plus max_queue requêtes en attente ; au-delà, refus immédiat (LLMBusy)
+    - équité : au plus max_per_user requêtes (en attente + en cours) par utilisateur
+    - queue_timeout : attente max d'une place ; timeout : durée max d'une réponse (LLMTimeout)
+
+    Un thread dépassant `timeout` ne peut pas être interrompu : sa place n'est libérée
+    qu'à sa fin réelle, pour ne jamais dépasser max_concurrency appels en vol.
+    Toutes les méthodes s'exécutent dans la boucle asyncio (pas de verrou nécessaire), sauf
+    submit_threadsafe, qui y transmet la demande depuis un autre thread.
+    """
+
+    def __init__(self, max_concurrency: int = 4, max_queue: int = 32, max_per_user: int = 1,
+                 queue_timeout: float = 10.0, timeout: float = 60.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+        self._executor = None
+        self._slots = None
+        self._loop = None
+        self._per_user = defaultdict(int)
+        self._waiting = 0
+        self._running = 0
+        self._avg_duration = None  # moyenne glissante (s), pour estimer Retry-After
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        return self._slots
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="llm")
+        return self._executor
+
+    def retry_after(self) -> int:
+        """Estimation (s) du temps avant qu'une place se libère pour une nouvelle requête."""
+        duration = self._avg_duration or 5.0
+        rounds = (self._waiting + self._running) / self.max_concurrency
+        return max(1, int(duration * max(rounds, 1) + 0.999))
+
+    def _reject(self, message: str):
+        self.rejected += 1
+        raise LLMBusy(message, self.retry_after())
+
+    def _release_user(self, user_id):
+        self._per_user[user_id] -= 1
+        if self._per_user[user_id] <= 0:
+            del self._per_user[user_id]
+
+    def _finish(self, user_id, started: float, fut: asyncio.Future):
+        self._running -= 1
+        self._get_slots().release()
+        self._release_user(user_id)
+        duration = time.monotonic() - started
+        self._avg_duration = duration if self._avg_duration is None else 0.8 * self._avg_duration + 0.2 * duration
+        self.completed += 1
+        if not fut.cancelled():
+            fut.exception()  # marque l'exception comme lue si la requête a déjà abandonné
+
+    async def run(self, user_id, fn, *args, **kwargs):
+        """Exécute fn(*args, **kwargs) dans le pool LLM. Lève LLMBusy ou LLMTimeout."""
+        self._loop = asyncio.get_running_loop()
+        if self._per_user[user_id] >= self.max_per_user:
+            self._reject("Une demande au coach est déjà en cours pour ce compte.")
+        if self._waiting >= self.max_queue:
+            self._reject("Le coach est très sollicité, réessayez dans quelques instants.")
+
+        self._per_user[user_id] += 1
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._get_slots().acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._release_user(user_id)
+            self._reject("Le coach est très sollicité, réessayez dans quelques instants.")
+        except BaseException:
+            self._release_user(user_id)
+            raise
+        finally:
+            self._waiting -= 1
+
+        started = time.monotonic()
+        self._running += 1
+        loop = asyncio.get_running_loop()
+        fut = loop.run_in_executor(self._get_executor(), functools.partial(fn, *args, **kwargs))
+        fut.add_done_callback(functools.partial(self._finish, user_id, started))
+        try:
+            # shield : ni le timeout ni une déconnexion du client ne libèrent la place avant la fin du thread
+            return await asyncio.wait_for(asyncio.shield(fut), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise LLMTimeout(f"Pas de réponse du coach en {self.timeout:g} s")
+
+    def submit_threadsafe(self, user_id, fn, *args):
+        """
+        run() depuis un thread hors de la boucle (ex. un thread du pool LLM), sans attendre :
+        retourne un concurrent.futures.Future, ou None si la boucle de run() ne tourne pas.
+        """
+        loop = self._loop
+        if loop is None or not loop.is_running():
+            return None
+        return asyncio.run_coroutine_threadsafe(self.run(user_id, fn, *args), loop)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "max_per_user": self.max_per_user,
+            "running": self._running,
+            "waiting": self._waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "avg_duration_seconds": round(self._avg_duration, 3) if self._avg_duration is not None else None,
+        }
@@ -0,0 +1,86 @@
+import base64
+import json
+
+from sqlalchemy import and_, or_, tuple_
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(sort: str, values: list) -> str:
+    """Curseur opaque pour le client : base64url de {"s": tri, "v": [valeur_tri, id]}."""
+    raw = json.dumps({"s": sort, "v": values}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = data["v"]
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor("Curseur invalide")
+    if data.get("s") != sort:
+        raise InvalidCursor("Curseur créé pour un autre tri")
+    if not isinstance(values, list) or not values:
+        raise InvalidCursor("Curseur invalide")
+    return values
+
+
+def parse_sort(sort: str, allowed: dict):
+    """
+    "calories" -> (colonne, False) ; "-calories" -> (colonne, True).
+    allowed : nom -> colonne (None pour trier sur la clé primaire seule).
+    """
+    descending = sort.startswith("-")
+    name = sort[1:] if descending else sort
+    if name not in allowed:
+        raise InvalidCursor(f"Tri inconnu : {sort} (valeurs possibles : {', '.join(allowed)})")
+    return allowed[name], descending
+
+
+def keyset(stmt, id_column, sort_column=None, descending: bool = False, after: list = None):
+    """
+    Applique ORDER BY (sort_column, id) et, si `after` est fourni, la condition
+    "strictement après la dernière ligne vue". Ordre des NULL identique à MySQL :
+    en premier en ASC, en dernier en DESC.
+    """
+    if sort_column is None:
+        stmt = stmt.order_by(id_column.desc() if descending else id_column)
+        if after is not None:
+            last_id = after[-1]
+            stmt = stmt.where(id_column < last_id if descending else id_column > last_id)
+        return stmt
+
+    if descending:
+        stmt = stmt.order_by(sort_column.desc(), id_column.desc())
+    else:
+        stmt = stmt.order_by(sort_column, id_column)
+
+    if after is not None:
+        if len(after) != 2:
+            raise InvalidCursor("Curseur invalide")
+        value, last_id = after
+        if value is None:
+            if descending:
+                cond = and_(sort_column.is_(None), id_column < last_id)
+            else:
+                cond = or_(and_(sort_column.is_(None), id_column > last_id), sort_column.isnot(None))
+        elif descending:
+            cond = or_(tuple_(sort_column, id_column) < tuple_(value, last_id), sort_column.is_(None))
+        else:
+            cond = tuple_(sort_column, id_column) > tuple_(value, last_id)
+        stmt = stmt.where(cond)
+    return stmt
+
+
+def next_cursor(rows: list, limit: int, sort: str, id_column, sort_column=None):
+    """Curseur de la page suivante, ou None si la page n'est pas pleine (fin de liste)."""
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    values = [getattr(last, id_column.key)]
+    if sort_column is not None:
+        values.insert(0, getattr(last, sort_column.key))
+    return encode_cursor(sort, values)
@@ -0,0 +1,179 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+
+# =============================================================================
+# NORMALISATION DU TEXTE (minuscules + suppression des accents)
+# =============================================================================
+
+# Mots vides FR / EN les plus fréquents dans les recettes (déjà sans accents)
+STOPWORDS = {
+    "de", "du", "des", "la", "le", "les", "un", "une", "et", "ou", "a", "au", "aux",
+    "en", "pour", "avec", "sans", "sur", "dans", "par", "d", "l",
+    "the", "and", "or", "of", "with", "without", "in", "on", "for", "to", "an",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def fold(text: str) -> str:
+    """'Crème Brûlée' -> 'creme brulee'"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text: str) -> list:
+    if not text:
+        return []
+    return [t for t in _TOKEN_RE.findall(fold(text)) if len(t) > 1 and t not in STOPWORDS]
+
+
+# =============================================================================
+# INDEX INVERSÉ EN MÉMOIRE
+# =============================================================================
+
+class SearchIndex:
+    """
+    Index inversé pondéré par champ, mis à jour incrémentalement.
+
+    - postings : token -> {doc_id: poids (tf pondéré par champ)}
+    - classement : somme sur les termes de idf * tf saturé (type BM25 simplifié)
+    - sémantique : ET entre les termes ; si aucun document ne les contient tous, OU
+    - le dernier terme de la requête matche aussi en préfixe ("poul" -> "poulet")
+    """
+
+    K1 = 1.2
+    B = 0.5
+
+    def __init__(self, field_weights: dict):
+        self.field_weights = field_weights
+        self._postings = defaultdict(dict)
+        self._doc_terms = {}   # doc_id -> {token: poids}
+        self._doc_len = {}     # doc_id -> somme des poids
+        self._total_len = 0.0
+        self._vocabulary = []  # tokens triés, pour le matching par préfixe
+        self._lock = threading.RLock()
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def _weights(self, fields: dict) -> dict:
+        weights = defaultdict(float)
+        for field, weight in self.field_weights.items():
+            for token in tokenize(fields.get(field) or ""):
+                weights[token] += weight
+        return weights
+
+    def add(self, doc_id: int, fields: dict):
+        """Ajoute (ou remplace) un document."""
+        weights = self._weights(fields)
+        with self._lock:
+            self._remove_unlocked(doc_id)
+            for token, w in weights.items():
+                postings = self._postings[token]
+                if not postings:
+                    bisect.insort(self._vocabulary, token)
+                postings[doc_id] = w
+            self._doc_terms[doc_id] = weights
+            length = sum(weights.values())
+            self._doc_len[doc_id] = length
+            self._total_len += length
+
+    def remove(self, doc_id: int):
+        with self._lock:
+            self._remove_unlocked(doc_id)
+
+    def _remove_unlocked(self, doc_id: int):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for token in terms:
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[token]
+                i = bisect.bisect_left(self._vocabulary, token)
+                if i < len(self._vocabulary) and self._vocabulary[i] == token:
+                    self._vocabulary.pop(i)
+        self._total_len -= self._doc_len.pop(doc_id, 0.0)
+
+    def _expand_prefix(self, prefix: str, max_terms: int = 20) -> list:
+        i = bisect.bisect_left(self._vocabulary, prefix)
+        out = []
+        while i < len(self._vocabulary) and len(out) < max_terms and self._vocabulary[i].startswith(prefix):
+            out.append(self._vocabulary[i])
+            i += 1
+        return out
+
+    def _score_groups(self, groups, avg_len, restrict: bool) -> dict:
+        """
+        Cumule les scores de chaque groupe de tokens.
+        restrict=True : sémantique ET, on ne garde que les documents présents dans tous les groupes
+        (en partant du groupe le plus sélectif pour réduire le travail).
+        """
+        n_docs = len(self._doc_terms)
+        doc_len = self._doc_len
+        k1 = self.K1
+        base = k1 * (1 - self.B)
+        per_len = k1 * self.B / avg_len
+
+        scores = None
+        for expanded in sorted(groups, key=lambda g: sum(len(self._postings[t]) for t in g)):
+            contrib = defaultdict(float)
+            for token in expanded:
+                postings = self._postings[token]
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                c = idf * (k1 + 1)
+                for doc_id, tf in postings.items():
+                    if restrict and scores is not None and doc_id not in scores:
+                        continue
+                    contrib[doc_id] += c * tf / (tf + base + per_len * doc_len[doc_id])
+            if scores is None:
+                scores = contrib
+            elif restrict:
+                scores = {d: s + contrib[d] for d, s in scores.items() if d in contrib}
+            else:
+                for d, s in contrib.items():
+                    scores[d] = scores.get(d, 0.0) + s
+            if restrict and not scores:
+                break
+        return scores or {}
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> list:
+        """Retourne [(doc_id, score)] triés par pertinence décroissante."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        with self._lock:
+            n_docs = len(self._doc_terms)
+            if n_docs == 0:
+                return []
+            avg_len = self._total_len / n_docs
+
+            # Chaque terme de la requête -> liste de tokens de l'index (préfixe pour le dernier)
+            unique_terms = list(dict.fromkeys(terms))
+            groups = []
+            for i, term in enumerate(unique_terms):
+                if i == len(unique_terms) - 1 and len(term) >= 3:
+                    expanded = self._expand_prefix(term)
+                else:
+                    expanded = [term] if term in self._postings else []
+                groups.append(expanded)
+
+            scores = {}
+            if all(groups):
+                scores = self._score_groups(groups, avg_len, restrict=True)
+            if not scores:
+                scores = self._score_groups([g for g in groups if g], avg_len, restrict=False)
+
+        top = heapq.nsmallest(offset + limit, scores.items(), key=lambda h: (-h[1], h[0]))
+        return top[offset:]